@@ -0,0 +1,83 @@
+"""One-off backfill of engagement counters on BlogPosts created before they existed.
+
+Posts without counters are still served correctly (reads fall back to counting child
+rows), but only posts with counters get single-get_item reads. Run once after deploying:
+
+    python backfill_post_counters.py [--dry-run]
+
+Counters are written with attribute_not_exists, so posts created or backfilled in the
+meantime are never overwritten. A comment/reaction/share written while a post is being
+counted can be missed by one; re-running is safe but does not correct that.
+"""
+import argparse
+from collections import Counter
+from typing import Any, Dict
+
+from boto3.dynamodb.conditions import Key
+
+import post
+
+def count_post(post_id: str) -> Dict[str, Any]:
+    """Count a post's child rows the way update_post_counters would have maintained them."""
+    reaction_types: Counter = Counter()
+    query_params: Dict[str, Any] = {
+        'IndexName': 'PostReactionIndex',
+        'KeyConditionExpression': Key('postId').eq(post_id),
+        'ProjectionExpression': 'reactionType'
+    }
+    while True:
+        response = post.tables['post-reactions'].query(**query_params)
+        reaction_types.update(r.get('reactionType') for r in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    counters = post.initial_post_counters()
+    counters['commentCount'] = post.count_query(
+        post.tables['post-comments'], IndexName='PostCommentsIndex', KeyConditionExpression=Key('postId').eq(post_id)
+    )
+    counters['shareCount'] = post.count_query(
+        post.tables['post-shares'], IndexName='PostSharesIndex', KeyConditionExpression=Key('postId').eq(post_id)
+    )
+    counters['reactionCount'] = sum(reaction_types.values())
+    for reaction_type, count in reaction_types.items():
+        if isinstance(reaction_type, str) and post.REACTION_TYPE_PATTERN.fullmatch(reaction_type):
+            counters[post.reaction_counter_attribute(reaction_type)] = count
+    return counters
+
+def backfill(dry_run: bool = False) -> int:
+    """Set counters on every post that lacks them; returns the number of posts updated."""
+    updated = 0
+    scan_params: Dict[str, Any] = {'ProjectionExpression': 'postId, commentCount'}
+    while True:
+        response = post.tables['blog-posts'].scan(**scan_params)
+        for item in response.get('Items', []):
+            if 'commentCount' in item:
+                continue
+            counters = count_post(item['postId'])
+            print(f"{item['postId']}: {counters}")
+            if not dry_run:
+                names = {f"#c{i}": name for i, name in enumerate(counters)}
+                values = {f":c{i}": value for i, value in enumerate(counters.values())}
+                try:
+                    post.tables['blog-posts'].update_item(
+                        Key={'postId': item['postId']},
+                        UpdateExpression="SET " + ", ".join(f"#c{i} = :c{i}" for i in range(len(counters))),
+                        ConditionExpression="attribute_exists(postId) AND attribute_not_exists(commentCount)",
+                        ExpressionAttributeNames=names,
+                        ExpressionAttributeValues=values
+                    )
+                except post.ClientError as e:
+                    if e.response['Error'].get('Code') != 'ConditionalCheckFailedException':
+                        raise
+                    continue
+            updated += 1
+        if 'LastEvaluatedKey' not in response:
+            return updated
+        scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='print the counters without writing them')
+    args = parser.parse_args()
+    print(f"Backfilled {backfill(args.dry_run)} posts")
@@ -0,0 +1,72 @@
+"""One-off migration of PostReactions rows with random reactionIds to post.reaction_key.
+
+Reads and toggles only look a user's reaction up under reaction_key(postId, userId), so
+reactions stored under the old random IDs are invisible to them until moved. Run once
+after deploying:
+
+    python backfill_reaction_keys.py [--dry-run]
+
+Each row is copied with attribute_not_exists, then the old row is deleted. When the user
+already has a reaction under the new key (a newer toggle, or an older duplicate from when
+nothing stopped a user reacting twice), that one is kept and the old row is dropped along
+with its share of the post's counters. Re-running after an interruption is safe: a copy
+left behind is recognised and not counted as a duplicate.
+"""
+import argparse
+from typing import Any, Dict, Tuple
+
+import post
+
+def migrate(reaction: Dict[str, Any], dry_run: bool) -> str:
+    """Move one legacy reaction to its deterministic key; returns 'moved' or 'duplicate'."""
+    table = post.tables['post-reactions']
+    new_item = dict(reaction, reactionId=post.reaction_key(reaction['postId'], reaction['userId']))
+    if dry_run:
+        existing = table.get_item(Key={'reactionId': new_item['reactionId']}).get('Item')
+        return 'moved' if not existing or existing == new_item else 'duplicate'
+
+    outcome = 'moved'
+    try:
+        table.put_item(
+            Item=new_item,
+            ConditionExpression='attribute_not_exists(reactionId)'
+        )
+    except post.ClientError as e:
+        if e.response['Error'].get('Code') != 'ConditionalCheckFailedException':
+            raise
+        existing = table.get_item(Key={'reactionId': new_item['reactionId']}).get('Item')
+        if existing != new_item: # Not this row's own copy from an interrupted run
+            outcome = 'duplicate'
+    table.delete_item(Key={'reactionId': reaction['reactionId']})
+    if outcome == 'duplicate':
+        post.update_post_counters('PostReactions', reaction, -1)
+    return outcome
+
+def backfill(dry_run: bool = False) -> Tuple[int, int]:
+    """Move every legacy reaction; returns (moved, duplicates dropped)."""
+    moved = duplicates = 0
+    scan_params: Dict[str, Any] = {}
+    while True:
+        response = post.tables['post-reactions'].scan(**scan_params)
+        for reaction in response.get('Items', []):
+            if not reaction.get('postId') or not reaction.get('userId'):
+                print(f"{reaction['reactionId']}: skipped, no postId/userId")
+                continue
+            if reaction['reactionId'] == post.reaction_key(reaction['postId'], reaction['userId']):
+                continue
+            outcome = migrate(reaction, dry_run)
+            print(f"{reaction['reactionId']}: {outcome}")
+            if outcome == 'moved':
+                moved += 1
+            else:
+                duplicates += 1
+        if 'LastEvaluatedKey' not in response:
+            return moved, duplicates
+        scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='report what would change without writing')
+    args = parser.parse_args()
+    moved, duplicates = backfill(args.dry_run)
+    print(f"Moved {moved} reactions; dropped {duplicates} duplicates")
@@ -0,0 +1,36 @@
+"""Rebuild the search index base from BlogPosts and drop the deltas it covers.
+
+Post writes only append deltas (see search_index.py), which every container replays on
+top of the base. Run this on a schedule to fold them in and keep that replay short:
+
+    python build_search_index.py [--keep-seconds 3600]
+
+Safe to run while the API is serving; see SearchIndex.compact.
+"""
+import argparse
+from typing import Any, Dict, Iterator
+
+import post
+from search_index import FIELD_WEIGHTS
+
+def scan_posts() -> Iterator[Dict[str, Any]]:
+    """Every post, with only the attributes the index reads."""
+    attributes = ['postId', 'status', *FIELD_WEIGHTS]
+    scan_params: Dict[str, Any] = {
+        'ProjectionExpression': ', '.join(f"#a{i}" for i in range(len(attributes))),
+        'ExpressionAttributeNames': {f"#a{i}": name for i, name in enumerate(attributes)},
+    }
+    while True:
+        response = post.tables['blog-posts'].scan(**scan_params)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        scan_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--keep-seconds', type=float, default=3600,
+                        help='keep deltas younger than this (default 3600; at least SEARCH_REFRESH_SECONDS)')
+    args = parser.parse_args()
+    index, deleted = post.post_search.compact(scan_posts(), args.keep_seconds)
+    print(f"Indexed {len(index)} posts, {len(index.postings)} terms; deleted {deleted} deltas")
@@ -0,0 +1,76 @@
+"""Strong ETags and If-None-Match handling for GET routes.
+
+Two ways to get an ETag:
+
+    version_etag(schema, item)   from the item's version token (registry version_attribute),
+                                 so a handler can answer 304 before serializing anything
+    conditional_get              route middleware that hashes the serialized 200 body, for
+                                 responses assembled from several items (post detail, listings)
+
+A matching If-None-Match gets a 304 with the ETag and no body. Responses that are the
+same for every reader can also be marked for shared caches with public_cache_headers(). compression.py tags the
+ETag of a compressed response with its encoding ("abc-gzip"), as the bytes differ; the
+suffix is ignored when comparing.
+"""
+import hashlib
+from typing import Any, Dict, Optional, Set
+
+from compression import ENCODINGS, header
+
+ETAG_BYTES = 16
+
+# Per-viewer responses: the browser may keep them but must revalidate, and edges must not share them
+PRIVATE_CACHE_HEADERS = {'Cache-Control': 'private, no-cache'}
+
+def public_cache_headers(max_age: int, s_maxage: int, stale_while_revalidate: int = 0) -> Dict[str, str]:
+    """Headers for a response that is identical for every reader.
+
+    max_age applies to browsers, s_maxage to CDNs and other shared caches. Vary is set up
+    front so every cached copy is keyed the same way whether or not the body is compressed.
+    """
+    directives = [f"public, max-age={max_age}", f"s-maxage={s_maxage}"]
+    if stale_while_revalidate:
+        directives.append(f"stale-while-revalidate={stale_while_revalidate}")
+    return {'Cache-Control': ', '.join(directives), 'Vary': 'Accept-Encoding'}
+
+def body_etag(body: str) -> str:
+    return '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:ETAG_BYTES * 2] + '"'
+
+def version_etag(schema: Any, item: Dict) -> Optional[str]:
+    """ETag from item's version token, or None if the table or item isn't versioned."""
+    version = item.get(schema.version_attribute) if schema.version_attribute else None
+    return f'"v-{version}"' if version else None
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith('W/'): # If-None-Match uses weak comparison
+        tag = tag[2:]
+    for encoding in ENCODINGS:
+        suffix = f"-{encoding}\""
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+def request_etags(event: Dict) -> Set[str]:
+    value = header(event.get('headers'), 'If-None-Match')
+    return {_opaque(tag) for tag in value.split(',')} if value else set()
+
+def etag_matches(event: Dict, etag: str) -> bool:
+    """Whether the request's If-None-Match covers etag."""
+    tags = request_etags(event)
+    return '*' in tags or _opaque(etag) in tags
+
+def not_modified(response: Dict, etag: str) -> Dict:
+    """response turned into its 304: same headers, no body."""
+    headers = dict(response.get('headers') or {}, ETag=etag)
+    return {'statusCode': 304, 'headers': headers, 'body': ''}
+
+def conditional_get(event: Dict, params: Dict, call_next: Any) -> Dict:
+    """Route middleware: ETag every 200 response and answer If-None-Match with 304."""
+    response = call_next(event, params)
+    if response.get('statusCode') != 200 or not isinstance(response.get('body'), str):
+        return response
+    etag = header(response.get('headers'), 'ETag') or body_etag(response['body'])
+    if etag_matches(event, etag):
+        return not_modified(response, etag)
+    return dict(response, headers=dict(response.get('headers') or {}, ETag=etag))
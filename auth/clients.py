@@ -0,0 +1,153 @@
+"""Lazily created, memoized AWS clients shared by both Lambdas.
+
+Nothing here touches boto3 until a table or client is first used, so a cold container
+serving OPTIONS or a validation error never builds a DynamoDB resource, and only upload
+routes build an S3 client. Everything handed out is wrapped with tracing.traced(), and
+tables whose schema names a version_attribute with VersionedTable.
+
+Benchmarks and local tools can swap in other backends with use_backends().
+"""
+import re
+import threading
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from registry import TABLE_SCHEMAS
+from tracing import traced
+
+_lock = threading.Lock()
+_resource: Optional[Any] = None # Untraced, for creating Table objects
+_dynamodb: Optional[Any] = None
+_dynamodb_client: Optional[Any] = None
+_s3: Optional[Any] = None
+_tables: Dict[str, Any] = {}
+
+_dynamodb_factory: Optional[Callable[[], Any]] = None
+_s3_factory: Optional[Callable[[], Any]] = None
+
+def dynamodb() -> Any:
+    """The DynamoDB service resource, for calls that span tables (batch_get_item)."""
+    global _resource, _dynamodb
+    if _dynamodb is None:
+        with _lock:
+            if _dynamodb is None:
+                if _dynamodb_factory:
+                    resource = _dynamodb_factory()
+                else:
+                    import boto3
+                    resource = boto3.resource('dynamodb')
+                _resource = resource
+                _dynamodb = traced(resource, 'DynamoDB')
+    return _dynamodb
+
+def dynamodb_client() -> Any:
+    """The low-level DynamoDB client behind the resource, for transact_write_items."""
+    global _dynamodb_client
+    if _dynamodb_client is None:
+        dynamodb()
+        with _lock:
+            if _dynamodb_client is None:
+                _dynamodb_client = traced(_resource.meta.client, 'DynamoDB')
+    return _dynamodb_client
+
+def get_table(name: str) -> Any:
+    """The traced Table object for name, created on first use."""
+    table = _tables.get(name)
+    if table is None:
+        dynamodb()
+        with _lock:
+            table = _tables.get(name)
+            if table is None:
+                table = traced(_resource.Table(name), name)
+                schema = TABLE_SCHEMAS.get(name)
+                if schema and schema.version_attribute:
+                    table = VersionedTable(table, schema.version_attribute)
+                _tables[name] = table
+    return table
+
+def s3() -> Any:
+    """The S3 client, created on first use."""
+    global _s3
+    if _s3 is None:
+        with _lock:
+            if _s3 is None:
+                if _s3_factory:
+                    client = _s3_factory()
+                else:
+                    import boto3
+                    client = boto3.client('s3')
+                _s3 = traced(client, 'S3')
+    return _s3
+
+_SET_CLAUSE = re.compile(r'\bSET\b')
+
+class VersionedTable:
+    """Table wrapper that stamps a new version token on every put_item and update_item.
+
+    Writers never have to remember the version, so a counter bump in one handler can't
+    leave a stale ETag behind. Writes through batch_write_item or transact_write_items
+    bypass this and must set the attribute themselves.
+    """
+
+    def __init__(self, table: Any, attribute: str):
+        self._table = table
+        self._attribute = attribute
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._table, name)
+
+    def put_item(self, **kwargs: Any) -> Any:
+        kwargs['Item'] = dict(kwargs['Item'], **{self._attribute: uuid.uuid4().hex})
+        return self._table.put_item(**kwargs)
+
+    def update_item(self, **kwargs: Any) -> Any:
+        assignment = '#_version = :_version'
+        expression = kwargs.get('UpdateExpression', '')
+        if _SET_CLAUSE.search(expression):
+            expression = _SET_CLAUSE.sub(f"SET {assignment},", expression, count=1)
+        else:
+            expression = f"SET {assignment} {expression}".strip()
+        kwargs['UpdateExpression'] = expression
+        kwargs['ExpressionAttributeNames'] = dict(kwargs.get('ExpressionAttributeNames') or {}, **{'#_version': self._attribute})
+        kwargs['ExpressionAttributeValues'] = dict(kwargs.get('ExpressionAttributeValues') or {}, **{':_version': uuid.uuid4().hex})
+        return self._table.update_item(**kwargs)
+
+class LazyTable:
+    """Stand-in for a Table that resolves it on first attribute access.
+
+    name is known without any AWS call, so routing, logging and the key-schema registry
+    can use it on paths that never read the table.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(get_table(self.name), attribute)
+
+    def __repr__(self) -> str:
+        return f"LazyTable({self.name!r})"
+
+class LazyClient:
+    """Stand-in for a client returned by getter, resolved on first attribute access."""
+
+    def __init__(self, getter: Callable[[], Any]):
+        self._getter = getter
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._getter(), attribute)
+
+def use_backends(dynamodb_factory: Optional[Callable[[], Any]] = None, s3_factory: Optional[Callable[[], Any]] = None) -> None:
+    """Build clients from these factories instead of boto3, dropping any already created.
+
+    Passing no arguments restores boto3.
+    """
+    global _resource, _dynamodb, _dynamodb_client, _s3, _dynamodb_factory, _s3_factory
+    with _lock:
+        _dynamodb_factory = dynamodb_factory
+        _s3_factory = s3_factory
+        _resource = None
+        _dynamodb = None
+        _dynamodb_client = None
+        _s3 = None
+        _tables.clear()
@@ -0,0 +1,121 @@
+"""Content negotiation for Lambda proxy responses: gzip/brotli bodies, base64 for API Gateway.
+
+Decorate a lambda_handler with compress_responses (under trace_request, so the work shows
+up in the trace) and every response it returns is compressed when the client's
+Accept-Encoding allows it and the body is big enough to be worth it. Configured by:
+
+    COMPRESSION_ENABLED     "false" turns compression off
+    COMPRESSION_MIN_BYTES   smallest body that is compressed (default 1024)
+    COMPRESSION_LEVEL       gzip level 1-9 (default 6)
+    BROTLI_QUALITY          brotli quality 0-11 (default 5); brotli is used only when installed
+
+API Gateway only passes base64 bodies through as binary for media types listed in the
+API's binaryMediaTypes, which apigateway.yaml sets to */*. That also makes API Gateway
+base64-encode request bodies, so text bodies are decoded back before the handler runs.
+"""
+import base64
+import functools
+import gzip
+import os
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import brotli
+except ImportError: # Optional; gzip covers every client
+    brotli = None
+
+from tracing import record_response_bytes, serialization
+
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() != 'false'
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '5'))
+
+# In order of preference when the client weighs them equally
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+TEXT_CONTENT_TYPES = ('application/json', 'text/')
+
+def header(headers: Optional[Dict[str, str]], name: str) -> Optional[str]:
+    """Case-insensitive header lookup; API Gateway passes headers as the client sent them."""
+    if not headers:
+        return None
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported encoding for an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for entry in accept_encoding.split(','):
+        coding, _, params = entry.strip().partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    wildcard = weights.get('*', 0.0)
+    ranked = [(weights.get(coding, wildcard), -i, coding) for i, coding in enumerate(ENCODINGS)]
+    weight, _, coding = max(ranked)
+    return coding if weight > 0 else None
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESSION_LEVEL, mtime=0) # mtime=0: same bytes for the same body
+
+def compress_response(event: Dict, response: Dict) -> Dict:
+    """Compress a proxy response for the request it answers, if the client accepts it."""
+    body = response.get('body')
+    if (not COMPRESSION_ENABLED or not isinstance(body, str) or response.get('isBase64Encoded')
+            or header(response.get('headers'), 'Content-Encoding')):
+        return response
+    data = body.encode('utf-8')
+    if len(data) < COMPRESSION_MIN_BYTES:
+        record_response_bytes(len(data), len(data))
+        return response
+    headers = dict(response.get('headers') or {})
+    vary = header(headers, 'Vary')
+    if 'accept-encoding' not in (vary or '').lower():
+        headers['Vary'] = ', '.join(filter(None, [vary, 'Accept-Encoding']))
+    encoding = negotiate(header(event.get('headers'), 'Accept-Encoding'))
+    if encoding is None:
+        record_response_bytes(len(data), len(data))
+        return dict(response, headers=headers)
+    with serialization():
+        compressed = compress(data, encoding)
+        encoded = base64.b64encode(compressed).decode('ascii')
+    record_response_bytes(len(data), len(compressed))
+    headers['Content-Encoding'] = encoding
+    etag = header(headers, 'ETag')
+    if etag and etag.endswith('"'):
+        headers['ETag'] = f"{etag[:-1]}-{encoding}\"" # A strong ETag names one representation
+    return dict(response, headers=headers, body=encoded, isBase64Encoded=True)
+
+def decode_request_body(event: Dict) -> Dict:
+    """Undo API Gateway's base64 encoding of text request bodies (see binaryMediaTypes above)."""
+    if not event.get('isBase64Encoded') or not isinstance(event.get('body'), str):
+        return event
+    content_type = (header(event.get('headers'), 'Content-Type') or 'application/json').lower()
+    if not content_type.startswith(TEXT_CONTENT_TYPES):
+        return event # Uploads stay base64; upload_media_handler decodes them itself
+    try:
+        body = base64.b64decode(event['body']).decode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        return event
+    return dict(event, body=body, isBase64Encoded=False)
+
+def compress_responses(handler: Callable) -> Callable:
+    """Decorate a Lambda handler: decode text request bodies, compress responses."""
+    @functools.wraps(handler)
+    def wrapper(event: Dict, context: Any) -> Any:
+        event = decode_request_body(event)
+        response = handler(event, context)
+        return compress_response(event, response) if isinstance(response, dict) else response
+    return wrapper
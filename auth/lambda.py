@@ -1,59 +1,77 @@
 import json
-import boto3
 import uuid
 import datetime
 import os
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal # Import Decimal
-
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return json.JSONEncoder.default(self, obj)
-
-dynamodb = boto3.resource('dynamodb')
-users_table = dynamodb.Table(os.environ.get('USERS_TABLE', 'Users'))
-user_profiles_table = dynamodb.Table(os.environ.get('USER_PROFILES_TABLE', 'UserProfiles'))
-blog_posts_table = dynamodb.Table(os.environ.get('BLOG_POSTS_TABLE', 'BlogPosts'))
-s3 = boto3.client('s3') # Initialize S3 client globally again
-
-def respond(status_code, body):
+from pagination import encode_cursor, decode_cursor, read_page
+from logger import get_logger
+from tracing import trace_request, serialization
+from serializer import dumps
+from compression import compress_responses
+from caching import conditional_get, etag_matches, not_modified, version_etag
+from registry import TABLE_SCHEMAS
+import clients
+from clients import LazyTable
+from router import Router, RouteNotFound, MethodNotAllowed
+
+log = get_logger('users')
+
+# Tables are created on first use; OPTIONS and validation errors never touch boto3 clients
+users_table = LazyTable(os.environ.get('USERS_TABLE', 'Users'))
+user_profiles_table = LazyTable(os.environ.get('USER_PROFILES_TABLE', 'UserProfiles'))
+blog_posts_table = LazyTable(os.environ.get('BLOG_POSTS_TABLE', 'BlogPosts'))
+bookmarks_table = LazyTable(os.environ.get('POST_BOOKMARKS_TABLE', 'PostBookmarks'))
+
+# Table names above can be overridden per stage, so schemas are looked up by their canonical names
+USERS_SCHEMA = TABLE_SCHEMAS['Users']
+USER_PROFILES_SCHEMA = TABLE_SCHEMAS['UserProfiles']
+BLOG_POSTS_SCHEMA = TABLE_SCHEMAS['BlogPosts']
+BOOKMARKS_SCHEMA = TABLE_SCHEMAS['PostBookmarks']
+
+# Never returned by the user listing
+PRIVATE_USER_ATTRIBUTES = ('password', 'passwordResetToken', 'passwordResetTokenExpiry')
+USERS_PAGE_LIMIT = 20
+USERS_PAGE_MAX_LIMIT = 100
+
+def respond(status_code, body, headers=None):
+    with serialization():
+        serialized = dumps(body)
     response = {
         'statusCode': status_code,
         'headers': {
             'Content-Type': 'application/json',
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+            'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+            **(headers or {})
         },
-        'body': json.dumps(body, cls=DecimalEncoder) # Use custom encoder
+        'body': serialized
     }
     return response
 
+def respond_with_profile(event, profile):
+    """200 with the profile, or 304 if the client's copy has the same version (nothing serialized)."""
+    etag = version_etag(USER_PROFILES_SCHEMA, profile)
+    if etag and etag_matches(event, etag):
+        return not_modified(respond(304, {}), etag)
+    return respond(200, profile, {'ETag': etag} if etag else None)
+
 def get_user_by_email(email):
     try:
-        resp = users_table.query(
-            IndexName='EmailIndex',
-            KeyConditionExpression=Key('email').eq(email)
-        )
+        resp = users_table.query(**USERS_SCHEMA.query_params('email', email))
         items = resp.get('Items', [])
         return items[0] if items else None
     except ClientError as e:
-        print(f"Error querying by email: {e}")
+        log.error("Error querying by email", error=str(e))
         return None
 
 def get_user_by_username(username):
     try:
-        resp = users_table.query(
-            IndexName='UsernameIndex',
-            KeyConditionExpression=Key('username').eq(username)
-        )
+        resp = users_table.query(**USERS_SCHEMA.query_params('username', username))
         items = resp.get('Items', [])
         return items[0] if items else None
     except ClientError as e:
-        print(f"Error querying by username: {e}")
+        log.error("Error querying by username", error=str(e))
         return None
 
 # --- Handler Functions for Endpoints ---
@@ -126,13 +144,12 @@ def handle_register(event, body):
         'status': '',
         'address': ''
     }
-    print(f"Attempting to create user profile for userId: {new_user_id}, username: {username}")
-    print(f"Profile item: {json.dumps(profile_item)}")
+    log.debug("Creating user profile", userId=new_user_id, profile=profile_item)
     try:
         user_profiles_table.put_item(Item=profile_item)
-        print(f"Successfully created user profile for userId: {new_user_id}")
+        log.info("Created user profile", userId=new_user_id)
     except ClientError as e:
-        print(f"Error creating user profile for userId {new_user_id}: {e}")
+        log.error("Error creating user profile", userId=new_user_id, error=str(e))
         users_table.delete_item(Key={'userId': new_user_id})
         return respond(500, {'error': 'Failed to create user profile. Please try again.'})
 
@@ -202,25 +219,44 @@ def handle_get_user(event, user_id):
     if not user_id:
         # If no user_id is provided, it might be a request for all users.
         # Assuming 'Users' table holds core user data for listing.
-        # If user profiles are meant to be listed, this should use user_profiles_table.scan()
-        response = users_table.scan() # 'users_table' refers to 'Users' table
-        users = response.get('Items', [])
+        # One ?limit= page per request, resumed with the signed ?cursor= from the last one,
+        # so the response stays far below Lambda's 6 MB cap however many users there are.
+        query = event.get('queryStringParameters') or {}
+        try:
+            limit = int(query.get('limit') or USERS_PAGE_LIMIT)
+        except ValueError:
+            return respond(400, {'error': f"Invalid limit parameter: {query['limit']}"})
+        if limit <= 0 or limit > USERS_PAGE_MAX_LIMIT:
+            return respond(400, {'error': f"Limit must be between 1 and {USERS_PAGE_MAX_LIMIT}"})
+        params = {}
+        try:
+            start_key = decode_cursor(query.get('cursor'), USERS_SCHEMA.name)
+        except ValueError as e:
+            return respond(400, {'error': str(e)})
+        if start_key:
+            params['ExclusiveStartKey'] = start_key
+        page = read_page(users_table.scan, params, limit) # 'users_table' refers to 'Users' table
+        users = page['items']
         for user in users:
-            user.pop('password', None) # Remove sensitive data
-        return respond(200, users)
+            for name in PRIVATE_USER_ATTRIBUTES: # Remove sensitive data
+                user.pop(name, None)
+        result = {'items': users, 'count': len(users)}
+        if page['last_evaluated_key']:
+            result['cursor'] = encode_cursor(page['last_evaluated_key'], USERS_SCHEMA.name)
+        return respond(200, result)
     else:
         # Fetch single user profile from 'UserProfiles' table
         response = user_profiles_table.get_item(Key={'userId': user_id})
         user_profile = response.get('Item')
         if not user_profile:
-            print(f"User profile not found in UserProfiles table for userId: {user_id}")
+            log.info("User profile not found", userId=user_id)
             return respond(404, {'error': 'User profile not found'})
         
         # The frontend expects 'username' field. Ensure it's present.
         # If 'username' is not directly in UserProfiles, you might need to fetch from 'Users' table too.
         # For now, assuming 'username' is part of UserProfiles.
-        print(f"Successfully retrieved user profile for userId: {user_id}")
-        return respond(200, user_profile)
+        log.debug("Retrieved user profile", userId=user_id)
+        return respond_with_profile(event, user_profile)
 
 def handle_put_user(event, body, user_id):
     if not user_id:
@@ -255,35 +291,34 @@ def handle_delete_user(event, user_id):
     return respond(200, {'message': 'User deleted successfully'})
 
 def handle_get_profile(event, user_id):
-    print(f"handle_get_profile received event: {json.dumps(event)}") # Log the full event
     if not user_id:
-        print("Error: User ID is missing for profile lookup.")
+        log.warning("User ID is missing for profile lookup")
         return respond(400, {'error': 'User ID is required for profile lookup'})
     
-    print(f"Attempting to retrieve user profile for userId: {user_id}")
     try:
         response = user_profiles_table.get_item(Key={'userId': user_id})
-        print(f"DynamoDB get_item response: {json.dumps(response, cls=DecimalEncoder)}") # Log DynamoDB response
+        log.debug("DynamoDB get_item response", userId=user_id, response=lambda: response)
         profile = response.get('Item')
         
         if not profile:
-            print(f"User profile not found for userId: {user_id}")
+            log.info("User profile not found", userId=user_id)
             return respond(404, {'error': 'User profile not found'})
         
-        print(f"Successfully retrieved user profile for userId: {user_id}")
-        return respond(200, profile)
+        return respond_with_profile(event, profile)
     except ClientError as e:
-        print(f"DynamoDB ClientError in handle_get_profile: {e}")
+        log.error("DynamoDB ClientError in handle_get_profile", userId=user_id, error=str(e))
         return respond(500, {'error': 'DynamoDB error fetching profile'})
     except Exception as e:
-        print(f"Unexpected error in handle_get_profile: {e}")
+        log.exception("Unexpected error in handle_get_profile", userId=user_id)
         return respond(500, {'error': 'Internal server error fetching profile'})
 
 def handle_put_profile(event, body, user_id):
     if not user_id:
         return respond(400, {'error': 'User ID is required for profile update'})
     
-    update_data = {k: v for k, v in body.items() if k != 'userId'}
+    # Keys can't change, and follower/post counters are only changed by the writes they count
+    protected = set(USER_PROFILES_SCHEMA.key_attributes) | set(USER_PROFILES_SCHEMA.counters) | {USER_PROFILES_SCHEMA.version_attribute}
+    update_data = {k: v for k, v in body.items() if k not in protected}
     if not update_data:
         return respond(400, {'error': 'No fields to update'})
 
@@ -306,14 +341,11 @@ def handle_get_user_posts(event, user_id):
         return respond(400, {'error': 'User ID is required to fetch posts'})
     
     try:
-        response = blog_posts_table.query(
-            IndexName='AuthorIdIndex', # Assuming an index on authorId
-            KeyConditionExpression=Key('authorId').eq(user_id)
-        )
+        response = blog_posts_table.query(**BLOG_POSTS_SCHEMA.query_params('authorId', user_id))
         posts = response.get('Items', [])
         return respond(200, posts)
     except ClientError as e:
-        print(f"Error fetching user posts for {user_id}: {e}")
+        log.error("Error fetching user posts", userId=user_id, error=str(e))
         return respond(500, {'error': 'Failed to fetch user posts'})
 
 def handle_get_bookmarked_posts(event, user_id):
@@ -321,28 +353,22 @@ def handle_get_bookmarked_posts(event, user_id):
         return respond(400, {'error': 'User ID is required to fetch bookmarked posts'})
     
     try:
-        # Assuming 'Bookmarks' is the table name for bookmarked posts
-        bookmarks_table = dynamodb.Table('Bookmarks') 
-        response = bookmarks_table.query(
-            IndexName='UserIdIndex', # Assuming an index on userId for bookmarks
-            KeyConditionExpression=Key('userId').eq(user_id)
-        )
+        response = bookmarks_table.query(**BOOKMARKS_SCHEMA.query_params('userId', user_id))
         bookmarks = response.get('Items', [])
         return respond(200, bookmarks)
     except ClientError as e:
-        print(f"Error fetching bookmarked posts for {user_id}: {e}")
+        log.error("Error fetching bookmarked posts", userId=user_id, error=str(e))
         return respond(500, {'error': 'Failed to fetch bookmarked posts'})
 
 def handle_upload_profile_picture(event, body):
-    # Reverted s3 client initialization to global scope as per debugging findings.
-    # The issue is likely environmental (Lambda runtime/layers/permissions).
-    print(f"handle_upload_profile_picture received body: {json.dumps(body)}")
+    # The S3 client is created on first upload (clients.s3), not at import
+    log.debug("Profile picture upload requested", body=body)
     user_id = body.get('userId') # Get userId from the request body
     file_name = body.get('fileName')
     file_type = body.get('fileType')
 
     if not user_id or not file_name or not file_type:
-        print(f"Error: Missing userId, fileName, or fileType in body: {body}")
+        log.warning("Missing userId, fileName, or fileType", fields=sorted(body))
         return respond(400, {'error': 'userId, fileName, and fileType are required'})
 
     if not file_type.startswith('image/'):
@@ -353,27 +379,22 @@ def handle_upload_profile_picture(event, body):
     s3_key = f"profile-picture/{unique_file_name}"
     bucket_name = os.environ.get('PROFILE_PICTURE_BUCKET', 'blogsphere-20') # Use environment variable or default
 
-    print(f"Attempting to generate pre-signed URL for file: {file_name}, type: {file_type}")
-    print(f"S3 Bucket: {bucket_name}, Key: {s3_key}")
-    print(f"S3 client object: {s3}") # Check the s3 object
-
     # Explicitly define params to ensure no None values
     s3_params = {
         'Bucket': bucket_name,
         'Key': s3_key,
         'ContentType': file_type
     }
-    print(f"S3 generate_presigned_url Params: {json.dumps(s3_params)}")
+    log.debug("Generating pre-signed URL", params=s3_params)
 
     try:
-        upload_url = s3.generate_presigned_url(
+        upload_url = clients.s3().generate_presigned_url(
             ClientMethod='put_object',
             Params=s3_params,
             ExpiresIn=300
         )
         
         file_url = f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
-        print(f"Successfully generated pre-signed URL. Upload URL: {upload_url}, File URL: {file_url}")
 
         # Update user profile with the new profile picture URL
         try:
@@ -382,9 +403,9 @@ def handle_upload_profile_picture(event, body):
                 UpdateExpression="SET profilePictureUrl = :url",
                 ExpressionAttributeValues={':url': file_url}
             )
-            print(f"Successfully updated profilePictureUrl for userId {user_id} to {file_url}")
+            log.info("Updated profilePictureUrl", userId=user_id, fileUrl=file_url)
         except ClientError as e:
-            print(f"Error updating profilePictureUrl for userId {user_id}: {e}")
+            log.error("Error updating profilePictureUrl", userId=user_id, error=str(e))
             return respond(500, {'error': 'Failed to update user profile with new picture URL'})
 
         return respond(200, {
@@ -393,80 +414,58 @@ def handle_upload_profile_picture(event, body):
             'fileUrl': file_url
         })
     except Exception as e: # Catch all exceptions
-        import traceback # Import traceback
-        print(f"An unexpected error occurred during pre-signed URL generation for {file_name}: {e}")
-        traceback.print_exc() # Print full traceback
+        log.exception("Unexpected error during pre-signed URL generation", fileName=file_name)
         return respond(500, {'error': 'Failed to generate upload URL due to internal error'})
 
+# --- Routes ---
+
+def json_body(event, params, call_next):
+    """Middleware for POST/PUT routes: parse the JSON body into params['body']."""
+    raw_body = event.get('body')
+    try:
+        params['body'] = json.loads(raw_body) if raw_body else {}
+    except json.JSONDecodeError:
+        return respond(400, {'error': 'Invalid JSON body'})
+    return call_next(event, params)
+
+router = Router()
+router.add('POST', '/login', lambda event, params: handle_login(event, params['body']), [json_body])
+router.add('POST', '/register', lambda event, params: handle_register(event, params['body']), [json_body])
+router.add('POST', '/forgot-password', lambda event, params: handle_forgot_password(event, params['body']), [json_body])
+router.add('POST', '/reset-password', lambda event, params: handle_reset_password(event, params['body']), [json_body])
+router.add('POST', '/profile/upload-url', lambda event, params: handle_upload_profile_picture(event, params['body']), [json_body])
+router.add('GET', '/users', lambda event, params: handle_get_user(event, None)) # None lists all users
+router.add('GET', '/users/{userId}', lambda event, params: handle_get_user(event, params.get('userId')), [conditional_get])
+router.add('PUT', '/users/{userId}', lambda event, params: handle_put_user(event, params['body'], params.get('userId')), [json_body])
+router.add('DELETE', '/users/{userId}', lambda event, params: handle_delete_user(event, params.get('userId')))
+router.add('GET', '/users/{userId}/posts', lambda event, params: handle_get_user_posts(event, params.get('userId')))
+router.add('GET', '/profile/{userId}', lambda event, params: handle_get_profile(event, params.get('userId')), [conditional_get])
+router.add('PUT', '/profile/{userId}', lambda event, params: handle_put_profile(event, params['body'], params.get('userId')), [json_body])
+router.add('GET', '/posts/user/{userId}', lambda event, params: handle_get_user_posts(event, params.get('userId')))
+router.add('GET', '/bookmarks/user/{userId}', lambda event, params: handle_get_bookmarked_posts(event, params.get('userId')))
+
 # --- Main Lambda Handler ---
 
+@trace_request('users')
+@compress_responses
 def lambda_handler(event, context):
     try:
-        print(f"Received event: {json.dumps(event)}")
         http_method = event.get('httpMethod')
         path = event.get('requestContext', {}).get('resourcePath', event.get('path', '')).strip()
-        print(f"Path (stripped): '{path}', HTTP Method: {http_method}")
+        log.start_request(f"{http_method} {path}", getattr(context, 'aws_request_id', None))
+        log.debug("Received event", event=lambda: {k: v for k, v in event.items() if k != 'body'}) # Bodies carry passwords
         
         if http_method == 'OPTIONS':
             return respond(200, {})
 
-        body = {}
-        if http_method in ['POST', 'PUT']:
-            raw_body = event.get('body')
-            if raw_body:
-                try:
-                    body = json.loads(raw_body)
-                except json.JSONDecodeError:
-                    return respond(400, {'error': 'Invalid JSON body'})
-
-        # Define routes
-        routes = {
-            ('/login', 'POST'): handle_login,
-            ('/register', 'POST'): handle_register,
-            ('/forgot-password', 'POST'): handle_forgot_password,
-            ('/reset-password', 'POST'): handle_reset_password,
-            ('/profile/upload-url', 'POST'): handle_upload_profile_picture,
-        }
-
-        # Dispatch based on exact path and method first
-        route_key = (path, http_method)
-        if route_key in routes:
-            return routes[route_key](event, body)
-
-        # Then handle /users and /profile with dynamic user_id
-        # Ensure pathParameters is a dictionary, even if it's null in the event
-        path_params = event.get('pathParameters') or {} 
-
-        if path.startswith('/users/'):
-            user_id = path_params.get('userId')
-            if http_method == 'GET':
-                return handle_get_user(event, user_id)
-            elif http_method == 'PUT':
-                return handle_put_user(event, body, user_id)
-            elif http_method == 'DELETE':
-                return handle_delete_user(event, user_id)
-        elif path == '/users' and http_method == 'GET': # For GET /users (list all)
-            return handle_get_user(event, None) # Pass None for user_id to get all users
-        elif path.startswith('/profile/'):
-            user_id = path_params.get('userId')
-            if http_method == 'GET':
-                return handle_get_profile(event, user_id)
-            elif http_method == 'PUT':
-                return handle_put_profile(event, body, user_id)
-        elif path.startswith('/posts/user/'):
-            user_id = path_params.get('userId')
-            if http_method == 'GET':
-                return handle_get_user_posts(event, user_id)
-        elif path.startswith('/bookmarks/user/'):
-            user_id = path_params.get('userId')
-            if http_method == 'GET':
-                return handle_get_bookmarked_posts(event, user_id)
-        
-        return respond(404, {'error': 'Endpoint not found'})
+        try:
+            return router.dispatch(event)
+        except (RouteNotFound, MethodNotAllowed):
+            return respond(404, {'error': 'Endpoint not found'})
 
     except ClientError as e:
-        print(f"DynamoDB or S3 Client error: {e}")
+        log.exception("DynamoDB or S3 Client error")
         return respond(500, {'error': 'Database or S3 client error'})
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        log.exception("Unexpected error")
         return respond(500, {'error': 'Internal server error'})
@@ -0,0 +1,116 @@
+"""Structured JSON logging shared by both Lambdas.
+
+One JSON object per line on stdout (CloudWatch adds the timestamp). Configured by:
+
+    LOG_LEVEL               DEBUG, INFO (default), WARNING or ERROR
+    LOG_FIELD_MAX_CHARS     cap on each serialized field (default 1024)
+    LOG_DEBUG_SAMPLE_RATE   fraction of requests that log DEBUG lines anyway (default 0)
+    LOG_DEBUG_SAMPLE_RATES  per-route overrides, e.g. "GET /blog-posts/{postId}=0.01,POST /login=0"
+
+Messages are %-formatted and callable field values are evaluated only when the line is
+actually written, so disabled debug payloads cost nothing to build.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import traceback
+from typing import Any, Dict, Optional
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for entry in spec.split(','):
+        route, _, rate = entry.rpartition('=')
+        if route.strip():
+            try:
+                rates[route.strip()] = float(rate)
+            except ValueError:
+                continue
+    return rates
+
+LOG_LEVEL = LEVELS.get(os.environ.get('LOG_LEVEL', 'INFO').upper(), LEVELS['INFO'])
+LOG_FIELD_MAX_CHARS = int(os.environ.get('LOG_FIELD_MAX_CHARS', '1024'))
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '0'))
+LOG_DEBUG_SAMPLE_RATES = _parse_sample_rates(os.environ.get('LOG_DEBUG_SAMPLE_RATES', ''))
+
+_write_lock = threading.Lock() # Fan-out threads log too; keep lines whole
+
+def _fragment(value: Any, max_chars: int) -> str:
+    """Serialize one field value to JSON, replacing it with a truncated string when too long."""
+    if callable(value):
+        value = value()
+    try:
+        text = json.dumps(value, default=str, separators=(',', ':'))
+    except (TypeError, ValueError):
+        text = json.dumps(repr(value))
+    if len(text) <= max_chars:
+        return text
+    raw = value if isinstance(value, str) else text
+    return json.dumps(f"{raw[:max_chars]}...(+{len(raw) - max_chars} chars)")
+
+class StructuredLogger:
+    """Leveled JSON logger with per-request context and per-route debug sampling."""
+
+    def __init__(self, service: str, level: int = LOG_LEVEL, max_field_chars: int = LOG_FIELD_MAX_CHARS):
+        self.service = service
+        self.level = level
+        self.max_field_chars = max_field_chars
+        self.context: Dict[str, Any] = {}
+        self.debug_sampled = False
+        self.stream = sys.stdout
+
+    def start_request(self, route: str, request_id: Optional[str] = None) -> None:
+        """Reset the per-request context and decide whether this request logs DEBUG lines."""
+        self.context = {'route': route}
+        if request_id:
+            self.context['requestId'] = request_id
+        rate = LOG_DEBUG_SAMPLE_RATES.get(route, LOG_DEBUG_SAMPLE_RATE)
+        self.debug_sampled = rate > 0 and random.random() < rate
+
+    def is_enabled(self, level: str) -> bool:
+        if level == 'DEBUG' and self.debug_sampled:
+            return True
+        return LEVELS[level] >= self.level
+
+    def log(self, level: str, message: str, *args: Any, **fields: Any) -> None:
+        if not self.is_enabled(level):
+            return
+        if args:
+            message = message % args
+        record = {'level': level, 'service': self.service, 'message': message}
+        record.update(self.context)
+        record.update(fields)
+        line = '{' + ','.join(
+            f"{json.dumps(name)}:{_fragment(value, self.max_field_chars)}" for name, value in record.items()
+        ) + '}'
+        with _write_lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def debug(self, message: str, *args: Any, **fields: Any) -> None:
+        self.log('DEBUG', message, *args, **fields)
+
+    def info(self, message: str, *args: Any, **fields: Any) -> None:
+        self.log('INFO', message, *args, **fields)
+
+    def warning(self, message: str, *args: Any, **fields: Any) -> None:
+        self.log('WARNING', message, *args, **fields)
+
+    def error(self, message: str, *args: Any, **fields: Any) -> None:
+        self.log('ERROR', message, *args, **fields)
+
+    def exception(self, message: str, *args: Any, **fields: Any) -> None:
+        """Log at ERROR with the current exception's traceback."""
+        fields.setdefault('traceback', traceback.format_exc)
+        self.log('ERROR', message, *args, **fields)
+
+_loggers: Dict[str, StructuredLogger] = {}
+
+def get_logger(service: str) -> StructuredLogger:
+    """Return the process-wide logger for a service, creating it on first use."""
+    if service not in _loggers:
+        _loggers[service] = StructuredLogger(service)
+    return _loggers[service]
@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import hmac
+import json
+import math
+import os
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+def _cursor_secret() -> Optional[bytes]:
+    """CURSOR_SECRET, set per stage so cursors can't be forged.
+
+    There is deliberately no default key. Without one, cursors fail closed, unless
+    CURSOR_SECRET_EPHEMERAL=true (local runs, benchmarks) asks for a random per-process key;
+    cursors signed with it only work in the container that issued them.
+    """
+    secret = os.environ.get('CURSOR_SECRET')
+    if secret:
+        return secret.encode('utf-8')
+    if os.environ.get('CURSOR_SECRET_EPHEMERAL', '').lower() == 'true':
+        return os.urandom(32)
+    return None
+
+CURSOR_SECRET = _cursor_secret()
+CURSOR_SIGNATURE_BYTES = 16
+
+# Budgets for page-fill mode, per request
+PAGE_FILL_MAX_READS = int(os.environ.get('PAGE_FILL_MAX_READS', '10'))
+PAGE_FILL_MAX_CAPACITY_UNITS = float(os.environ.get('PAGE_FILL_MAX_CAPACITY_UNITS', '50'))
+PAGE_FILL_TIME_BUDGET_SECONDS = float(os.environ.get('PAGE_FILL_TIME_BUDGET_SECONDS', '2'))
+PAGE_FILL_MAX_READ_LIMIT = 1000 # Largest Limit a single page-fill read asks for
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _signature(scope: str, payload: bytes) -> bytes:
+    if CURSOR_SECRET is None:
+        raise RuntimeError("CURSOR_SECRET is not set; cursors can be neither issued nor accepted")
+    return hmac.new(CURSOR_SECRET, scope.encode('utf-8') + b'\0' + payload, hashlib.sha256).digest()[:CURSOR_SIGNATURE_BYTES]
+
+def _encode_value(value: Any) -> Any:
+    # Key attributes are strings, numbers or binary; tag the non-string types so they round-trip
+    if isinstance(value, Decimal):
+        return {'N': str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': _b64encode(bytes(value))}
+    if hasattr(value, 'value') and isinstance(value.value, (bytes, bytearray)): # boto3 Binary
+        return {'B': _b64encode(bytes(value.value))}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if 'N' in value:
+            return Decimal(value['N'])
+        if 'B' in value:
+            return _b64decode(value['B'])
+    return value
+
+def encode_cursor(last_evaluated_key: Optional[Dict], scope: str = '') -> Optional[str]:
+    """Encode a full LastEvaluatedKey as an opaque, signed cursor bound to scope (the listing it came from)."""
+    if not last_evaluated_key:
+        return None
+    payload = json.dumps(
+        {name: _encode_value(value) for name, value in last_evaluated_key.items()},
+        separators=(',', ':'), sort_keys=True
+    ).encode('utf-8')
+    return f"{_b64encode(payload)}.{_b64encode(_signature(scope, payload))}"
+
+def decode_cursor(cursor: Optional[str], scope: str = '') -> Optional[Dict]:
+    """Verify and decode a cursor from encode_cursor into an ExclusiveStartKey."""
+    if not cursor:
+        return None
+    try:
+        payload_part, signature_part = cursor.split('.', 1)
+        payload = _b64decode(payload_part)
+        signature = _b64decode(signature_part)
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor parameter")
+    if not hmac.compare_digest(signature, _signature(scope, payload)):
+        raise ValueError("Invalid cursor parameter")
+    key = json.loads(payload)
+    return {name: _decode_value(value) for name, value in key.items()}
+
+def read_page(
+    read: Callable[..., Dict],
+    params: Dict[str, Any],
+    limit: int,
+    fill: bool = False,
+    transform: Optional[Callable[[List[Dict]], List[Dict]]] = None,
+    key_attributes: Optional[List[str]] = None,
+    max_reads: int = PAGE_FILL_MAX_READS,
+    max_capacity_units: float = PAGE_FILL_MAX_CAPACITY_UNITS,
+    time_budget_seconds: float = PAGE_FILL_TIME_BUDGET_SECONDS
+) -> Dict[str, Any]:
+    """Read one page from a query or scan.
+
+    With fill=True, keep reading until limit matching items are collected, the table is
+    exhausted, or the read/capacity/time budget runs out. transform post-processes each
+    read's items (hydration, extra filtering) before they count toward the page.
+
+    Reads normally ask for the number of items still missing, so the LastEvaluatedKey
+    sits right after the last item returned. When key_attributes (table plus index key
+    names) are given and there is no transform, later reads are scaled up by the filter
+    selectivity seen so far; any overshoot is trimmed and the key of the last item kept
+    becomes the LastEvaluatedKey.
+    """
+    params = dict(params)
+    if fill:
+        params['ReturnConsumedCapacity'] = 'TOTAL'
+    deadline = time.monotonic() + time_budget_seconds
+    items: List[Dict] = []
+    scanned_count = 0
+    reads = 0
+    capacity_units = 0.0
+    last_evaluated_key = None
+    while True:
+        remaining = limit - len(items)
+        params['Limit'] = remaining
+        if fill and reads and key_attributes and transform is None:
+            selectivity = scanned_count / max(len(items), 1)
+            params['Limit'] = min(PAGE_FILL_MAX_READ_LIMIT, max(remaining, math.ceil(remaining * selectivity)))
+        response = read(**params)
+        reads += 1
+        scanned_count += response.get('ScannedCount', 0)
+        capacity_units += float((response.get('ConsumedCapacity') or {}).get('CapacityUnits', 0))
+        page_items = response.get('Items', [])
+        items.extend(transform(page_items) if transform and page_items else page_items)
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if len(items) > limit:
+            items = items[:limit]
+            last_evaluated_key = {name: items[-1][name] for name in key_attributes if name in items[-1]}
+            break
+        if (not fill or not last_evaluated_key or len(items) >= limit or reads >= max_reads
+                or capacity_units >= max_capacity_units or time.monotonic() >= deadline):
+            break
+        params['ExclusiveStartKey'] = last_evaluated_key
+    return {
+        'items': items,
+        'scanned_count': scanned_count,
+        'reads': reads,
+        'capacity_units': capacity_units,
+        'last_evaluated_key': last_evaluated_key
+    }
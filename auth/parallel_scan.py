@@ -0,0 +1,100 @@
+"""Parallel segmented scan (Segment/TotalSegments) for listings and exports.
+
+Also usable from the command line to export a table as JSON lines:
+
+    python parallel_scan.py BlogPosts --segments 8 > blog-posts.jsonl
+"""
+import contextvars
+import os
+import queue
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+PARALLEL_SCAN_SEGMENTS = int(os.environ.get('PARALLEL_SCAN_SEGMENTS', '4'))
+PARALLEL_SCAN_QUEUE_PAGES = 8 # Pages buffered between the workers and the consumer
+
+_DONE = object()
+
+def parallel_scan(
+    table: Any,
+    total_segments: Optional[int] = None,
+    queue_pages: int = PARALLEL_SCAN_QUEUE_PAGES,
+    **scan_params: Any
+) -> Iterator[Dict]:
+    """Yield every item of table, scanning total_segments segments on worker threads.
+
+    Pages go through a bounded queue, so memory stays at a few pages whatever the table
+    size, and a slow consumer throttles the workers. Items from different segments are
+    interleaved in no particular order. Stopping iteration early stops the workers.
+    Errors raised by a worker are re-raised in the consumer.
+    """
+    total_segments = total_segments or PARALLEL_SCAN_SEGMENTS
+    pages: 'queue.Queue[Any]' = queue.Queue(maxsize=queue_pages)
+    stop = threading.Event()
+
+    def put(value: Any) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment: int) -> None:
+        params = dict(scan_params, Segment=segment, TotalSegments=total_segments)
+        try:
+            while not stop.is_set():
+                response = table.scan(**params)
+                if not put(response.get('Items', [])):
+                    return
+                if 'LastEvaluatedKey' not in response:
+                    return
+                params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except Exception as e: # Surface worker failures to the consumer
+            put(e)
+        finally:
+            put(_DONE)
+
+    workers: List[threading.Thread] = [
+        # Each worker runs in a copy of the caller's context, so its scans count towards the request's trace
+        threading.Thread(target=contextvars.copy_context().run, args=(scan_segment, segment), daemon=True)
+        for segment in range(total_segments)
+    ]
+    for worker in workers:
+        worker.start()
+
+    finished = 0
+    try:
+        while finished < total_segments:
+            page = pages.get()
+            if page is _DONE:
+                finished += 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        stop.set()
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    import boto3
+
+    from serializer import iter_json_lines
+
+    parser = argparse.ArgumentParser(description='Export a DynamoDB table as JSON lines using a parallel scan.')
+    parser.add_argument('table', help='table name, e.g. Users, UserProfiles or BlogPosts')
+    parser.add_argument('--segments', type=int, default=PARALLEL_SCAN_SEGMENTS)
+    args = parser.parse_args()
+
+    def without_credentials(items: Iterator[Dict]) -> Iterator[Dict]:
+        for exported in items:
+            for name in ('password', 'passwordResetToken', 'passwordResetTokenExpiry'): # Never export credentials
+                exported.pop(name, None)
+            yield exported
+
+    export_table = boto3.resource('dynamodb').Table(args.table)
+    sys.stdout.writelines(iter_json_lines(without_credentials(parallel_scan(export_table, args.segments))))
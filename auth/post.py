@@ -1,32 +1,107 @@
+import base64
 import json
-import boto3
 from botocore.exceptions import ClientError
 import uuid
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Iterator, Optional, List, Tuple, Union
 import datetime # Import datetime for ISO format
-from boto3.dynamodb.conditions import Key # Import Key for query
-
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
-
-# Table initialization with type hints (updated to match your API resources)
+import heapq
+import html
+import itertools
+import os
+import re
+import time
+from urllib.parse import quote
+from boto3.dynamodb.conditions import Attr, Key # Import Key for query
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from user_cache import username_cache, MISSING
+from pagination import encode_cursor, decode_cursor, read_page
+from logger import get_logger
+from tracing import trace_request, serialization, TracedExecutor
+from serializer import dumps
+from compression import compress_responses
+from caching import conditional_get, public_cache_headers, PRIVATE_CACHE_HEADERS
+from registry import schema_for, REACTION_TYPE_PATTERN
+import clients
+from clients import LazyTable
+from router import Router, RouteNotFound, MethodNotAllowed
+from search_index import SearchIndex, FIELD_WEIGHTS as SEARCH_FIELDS
+from trending import (TRENDING_INDEX, BUCKET_ATTRIBUTE, SCORE_ATTRIBUTE, WEIGHTS as TRENDING_WEIGHTS,
+                      epoch_of, bucket_of, rescale, initial_trending, record_engagement, without_trending)
+
+log = get_logger('posts')
+
+# Table initialization with type hints (updated to match your API resources).
+# Each Table is created on first use, so cold starts only pay for the tables a route reads.
 tables: Dict[str, Any] = {
-    'blog-posts': dynamodb.Table('BlogPosts'),
-    'categories': dynamodb.Table('Categories'),
-    'post-categories': dynamodb.Table('PostCategories'),
-    'post-comments': dynamodb.Table('PostComments'),
-    'post-reactions': dynamodb.Table('PostReactions'),
-    'post-shares': dynamodb.Table('PostShares'),
-    'tags': dynamodb.Table('Tags'),
-    'users': dynamodb.Table('Users'),
-    'user-follows': dynamodb.Table('UserFollows'), # NEW
-    'post-bookmarks': dynamodb.Table('PostBookmarks'), # NEW
-    'user-profiles': dynamodb.Table('UserProfiles') # NEW: For updating follower/following counts
+    'blog-posts': LazyTable('BlogPosts'),
+    'categories': LazyTable('Categories'),
+    'post-categories': LazyTable('PostCategories'),
+    'post-comments': LazyTable('PostComments'),
+    'post-reactions': LazyTable('PostReactions'),
+    'post-shares': LazyTable('PostShares'),
+    'tags': LazyTable('Tags'),
+    'post-tags': LazyTable('PostTags'),
+    'users': LazyTable('Users'),
+    'user-follows': LazyTable('UserFollows'), # NEW
+    'post-bookmarks': LazyTable('PostBookmarks'), # NEW
+    'user-profiles': LazyTable('UserProfiles') # NEW: For updating follower/following counts
 }
 
+# Bounded worker pool for independent DynamoDB lookups. Created at import time so
+# warm invocations reuse the same threads (and their pooled HTTP connections).
+# Lookups run in the submitting request's context, so they count towards its trace.
+FANOUT_WORKERS = int(os.environ.get('FANOUT_WORKERS', '8'))
+fanout_executor = TracedExecutor(max_workers=FANOUT_WORKERS)
+
+# Post detail without ?currentUserId is the same for every reader, so shared caches may keep it.
+# Browsers revalidate every time by default (cheap with the ETag); edges keep it for a minute.
+POST_CACHE_MAX_AGE = int(os.environ.get('POST_CACHE_MAX_AGE', '0'))
+POST_CACHE_S_MAXAGE = int(os.environ.get('POST_CACHE_S_MAXAGE', '60'))
+POST_CACHE_STALE_WHILE_REVALIDATE = int(os.environ.get('POST_CACHE_STALE_WHILE_REVALIDATE', '300'))
+PUBLIC_POST_HEADERS = public_cache_headers(POST_CACHE_MAX_AGE, POST_CACHE_S_MAXAGE, POST_CACHE_STALE_WHILE_REVALIDATE)
+
+BATCH_GET_MAX_KEYS = 100 # DynamoDB BatchGetItem limit per request
+BATCH_GET_MAX_ATTEMPTS = 5
+
+def batch_get_items(table: Any, keys: List[Dict], projection: Optional[List[str]] = None) -> List[Dict]:
+    """Fetch items by primary key with BatchGetItem, retrying unprocessed keys."""
+    unique_keys = []
+    seen = set()
+    for key in keys:
+        marker = tuple(sorted(key.items()))
+        if marker not in seen:
+            seen.add(marker)
+            unique_keys.append(key)
+
+    request_options: Dict[str, Any] = {}
+    if projection:
+        request_options['ProjectionExpression'] = ', '.join(f"#p{i}" for i in range(len(projection)))
+        request_options['ExpressionAttributeNames'] = {f"#p{i}": name for i, name in enumerate(projection)}
+
+    items: List[Dict] = []
+    for start in range(0, len(unique_keys), BATCH_GET_MAX_KEYS):
+        request_items = {table.name: dict(request_options, Keys=unique_keys[start:start + BATCH_GET_MAX_KEYS])}
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            response = clients.dynamodb().batch_get_item(RequestItems=request_items)
+            items.extend(response.get('Responses', {}).get(table.name, []))
+            request_items = response.get('UnprocessedKeys') or {}
+            if not request_items:
+                break
+            time.sleep(0.05 * (2 ** attempt)) # Back off before retrying throttled keys
+        else:
+            log.warning("Giving up on unprocessed keys", table=table.name, keys=len(request_items[table.name]['Keys']))
+    return items
+
 # Add a helper function to get username by userId
 def get_user_username(user_id: str) -> Optional[str]:
     """Fetches username for a given userId from the Users table, handling both UUID and email as userId."""
+    cached = username_cache.get(user_id)
+    if cached is not MISSING:
+        return cached
+    return fetch_user_username(user_id)
+
+def fetch_user_username(user_id: str) -> Optional[str]:
+    """Looks up a username in the Users table, bypassing and then refreshing the username cache."""
     try:
         user = None
         if "@" in user_id: # Check if it looks like an email
@@ -42,11 +117,40 @@ def get_user_username(user_id: str) -> Optional[str]:
             response = tables['users'].get_item(Key={'userId': user_id})
             user = response.get('Item')
 
-        return user.get('username') if user else None
+        username = user.get('username') if user else None
+        username_cache.put(user_id, username)
+        if user and "@" in user_id and user.get('userId'):
+            username_cache.put(user['userId'], username)
+        return username
     except ClientError as e:
-        print(f"Error fetching username for userId {user_id}: {e}")
+        log.error("Error fetching username", userId=user_id, error=str(e))
         return None
 
+def get_user_usernames(user_ids: List[str]) -> Dict[str, Optional[str]]:
+    """Resolves many userIds to usernames at once: one BatchGetItem for UUIDs, concurrent EmailIndex queries for emails."""
+    usernames: Dict[str, Optional[str]] = {}
+    for user_id in {user_id for user_id in user_ids if user_id}:
+        usernames[user_id] = username_cache.get(user_id)
+    unresolved = [user_id for user_id, username in usernames.items() if username is MISSING]
+    email_ids = [user_id for user_id in unresolved if "@" in user_id]
+    uuid_ids = [user_id for user_id in unresolved if "@" not in user_id]
+
+    email_futures = {user_id: fanout_executor.submit(fetch_user_username, user_id) for user_id in email_ids}
+    if uuid_ids:
+        for user_id in uuid_ids:
+            usernames[user_id] = None
+        try:
+            users = batch_get_items(tables['users'], [{'userId': user_id} for user_id in uuid_ids], ['userId', 'username'])
+            for user in users:
+                usernames[user['userId']] = user.get('username')
+            for user_id in uuid_ids:
+                username_cache.put(user_id, usernames[user_id])
+        except ClientError as e:
+            log.error("Error batch fetching usernames", users=len(uuid_ids), error=str(e))
+    for user_id, future in email_futures.items():
+        usernames[user_id] = future.result()
+    return usernames
+
 # =================== UTILS ===================
 
 def build_response(
@@ -64,12 +168,15 @@ def build_response(
     if headers:
         base_headers.update(headers)
     
+    with serialization():
+        serialized = dumps(body if body is not None else {})
     return {
         'statusCode': status_code,
         'headers': base_headers,
-        'body': json.dumps(body if body is not None else {})
+        'body': serialized
     }
 
+
 def get_path_parameter(event: Dict, name: str) -> Optional[str]:
     """Safely get path parameter."""
     return (event.get('pathParameters') or {}).get(name)
@@ -78,6 +185,19 @@ def get_query_parameter(event: Dict, name: str) -> Optional[str]:
     """Safely get query parameter."""
     return (event.get('queryStringParameters') or {}).get(name)
 
+def get_limit_parameter(event: Dict, default: int = 20, maximum: int = 100) -> int:
+    """Parse the ?limit= query parameter."""
+    limit_param = get_query_parameter(event, 'limit')
+    if not limit_param:
+        return default
+    try:
+        limit = int(limit_param)
+    except ValueError:
+        raise ValueError(f"Invalid limit parameter: {limit_param}")
+    if limit <= 0 or limit > maximum:
+        raise ValueError(f"Limit must be between 1 and {maximum}")
+    return limit
+
 def get_body(event: Dict) -> Optional[Dict]:
     """Safely parse request body."""
     try:
@@ -99,134 +219,508 @@ def handle_options_request() -> Dict:
     """Handle CORS preflight OPTIONS request."""
     return build_response(200, {'message': 'CORS preflight successful'})
 
-def get_table_key_attribute(table: Any) -> str:
-    """Get the primary key attribute name from table schema."""
+def get_item_key(table: Any, event: Dict, item_id: str) -> Dict:
+    """Primary key of the item a request addresses; item_id is the hash key value.
+
+    Composite keys take the sort key from the path parameter of the same name,
+    e.g. /post-categories/{postId}/{categoryId}.
+    """
+    schema = schema_for(table)
+    if not schema.sort_key:
+        return {schema.hash_key: item_id}
+    return schema.key_from(dict(event.get('pathParameters') or {}, **{schema.hash_key: item_id}))
+
+# =================== ENGAGEMENT COUNTERS ===================
+
+# Counter attribute on BlogPosts kept in step with each child table
+POST_COUNTER_ATTRIBUTES = {
+    'PostComments': 'commentCount',
+    'PostReactions': 'reactionCount',
+    'PostShares': 'shareCount',
+}
+
+def reaction_counter_attribute(reaction_type: str) -> str:
+    """Per-type reaction counter on BlogPosts, e.g. 'like' -> 'likeCount'."""
+    if not isinstance(reaction_type, str) or not REACTION_TYPE_PATTERN.fullmatch(reaction_type):
+        raise ValueError(f"Invalid reactionType: {reaction_type}")
+    return f"{reaction_type}Count"
+
+def initial_post_counters() -> Dict[str, int]:
+    """Counters every new post starts with; their presence marks the post as tracked."""
+    counters = {attribute: 0 for attribute in POST_COUNTER_ATTRIBUTES.values()}
+    counters[reaction_counter_attribute('like')] = 0
+    return counters
+
+def update_post_counters(table_name: str, child: Dict, delta: int) -> None:
+    """Atomically ADD delta to the parent post's counters for a created (+1) or deleted (-1) child row.
+
+    Posts created before counters existed have no counter attributes and are left alone
+    (reads fall back to counting child rows), so a single ADD never starts a legacy
+    post's count from zero.
+    """
+    post_id = child.get('postId')
+    if table_name not in POST_COUNTER_ATTRIBUTES or not post_id:
+        return
+    counters = [POST_COUNTER_ATTRIBUTES[table_name]]
+    reaction_type = child.get('reactionType')
+    if table_name == 'PostReactions' and isinstance(reaction_type, str) and REACTION_TYPE_PATTERN.fullmatch(reaction_type):
+        counters.append(reaction_counter_attribute(reaction_type))
+
+    names = {f"#c{i}": counter for i, counter in enumerate(counters)}
+    values: Dict[str, Any] = {':delta': delta}
+    condition = "attribute_exists(#c0)"
+    if delta < 0:
+        condition = " AND ".join(f"#c{i} >= :one" for i in range(len(counters)))
+        values[':one'] = 1
+    try:
+        tables['blog-posts'].update_item(
+            Key={'postId': post_id},
+            UpdateExpression="ADD " + ", ".join(f"#c{i} :delta" for i in range(len(counters))),
+            ConditionExpression=condition,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response['Error'].get('Code') != 'ConditionalCheckFailedException':
+            raise
+        log.info("Skipped counter update on untracked post", postId=post_id, counters=counters)
+
+# =================== REACTIONS ===================
+
+# A user has at most one reaction per post, stored under reaction_key(postId, userId): "did
+# they react" is a get_item, and a toggle is one transaction that conditionally writes the
+# reaction and ADDs to the post's counters, so the two can't drift apart.
+
+REACTION_WRITE_ATTEMPTS = 3
+
+_type_serializer = TypeSerializer()
+_type_deserializer = TypeDeserializer()
+
+def to_wire(values: Dict) -> Dict:
+    """Attribute values in the low-level client's typed format."""
+    return {name: _type_serializer.serialize(value) for name, value in values.items()}
+
+def from_wire(values: Dict) -> Dict:
+    return {name: _type_deserializer.deserialize(value) for name, value in values.items()}
+
+def reaction_key(post_id: str, user_id: str) -> str:
+    """reactionId of user_id's reaction to post_id. User IDs compare case-insensitively."""
+    return f"{post_id}#{user_id.lower()}"
+
+def reaction_counter_deltas(added: Optional[str], removed: Optional[str]) -> Dict[str, int]:
+    """Post counter changes for replacing a reaction of type removed with one of type added (either may be None)."""
+    deltas: Dict[str, int] = {POST_COUNTER_ATTRIBUTES['PostReactions']: (1 if added else 0) - (1 if removed else 0)}
+    for reaction_type, delta in ((removed, -1), (added, 1)):
+        if isinstance(reaction_type, str) and REACTION_TYPE_PATTERN.fullmatch(reaction_type):
+            counter = reaction_counter_attribute(reaction_type)
+            deltas[counter] = deltas.get(counter, 0) + delta
+    return {counter: delta for counter, delta in deltas.items() if delta}
+
+def write_reaction(reaction_id: str, post_id: str, new: Optional[Dict], expected_type: Optional[str]) -> Tuple[bool, Optional[Dict]]:
+    """Replace the reaction reaction_id, expected to be of expected_type (None: absent), with new (None: delete it).
+
+    One TransactWriteItems puts or deletes the reaction on that condition and moves the
+    post's counters to match. Returns (True, None) once written, or (False, the reaction
+    actually stored) when the condition failed, so callers can retry against it. Posts
+    without counters get the reaction write alone, as in update_post_counters.
+    """
+    key = {'reactionId': reaction_id}
+    names = {'#id': 'reactionId'}
+    values: Dict[str, Any] = {}
+    condition = 'attribute_not_exists(#id)'
+    if expected_type is not None:
+        names = {'#type': 'reactionType'}
+        values[':expected'] = expected_type
+        condition = '#type = :expected'
+    reaction_write: Dict[str, Any] = {
+        'TableName': tables['post-reactions'].name,
+        'ConditionExpression': condition,
+        'ExpressionAttributeNames': names,
+        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+    }
+    if values:
+        reaction_write['ExpressionAttributeValues'] = to_wire(values)
+    if new:
+        reaction_write['Item'] = to_wire(new)
+    else:
+        reaction_write['Key'] = to_wire(key)
+    transaction = [{'Put' if new else 'Delete': reaction_write}]
+
+    deltas = reaction_counter_deltas(new and new.get('reactionType'), expected_type)
+    if deltas:
+        counters = list(deltas)
+        conditions = ["attribute_exists(#c0)"] + [f"#c{i} >= :one" for i, counter in enumerate(counters) if deltas[counter] < 0]
+        counter_values = {f":d{i}": deltas[counter] for i, counter in enumerate(counters)}
+        if len(conditions) > 1:
+            counter_values[':one'] = 1
+        transaction.append({'Update': {
+            'TableName': tables['blog-posts'].name,
+            'Key': to_wire({'postId': post_id}),
+            'UpdateExpression': "ADD " + ", ".join(f"#c{i} :d{i}" for i in range(len(counters))),
+            'ConditionExpression': " AND ".join(conditions),
+            'ExpressionAttributeNames': {f"#c{i}": counter for i, counter in enumerate(counters)},
+            'ExpressionAttributeValues': to_wire(counter_values)
+        }})
+
+    try:
+        clients.dynamodb_client().transact_write_items(TransactItems=transaction)
+        return True, None
+    except ClientError as e:
+        if e.response['Error'].get('Code') != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons') or []
+        if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+            current = reasons[0].get('Item')
+            return False, from_wire(current) if current else None
+        if len(reasons) < 2 or reasons[1].get('Code') != 'ConditionalCheckFailed':
+            raise
+
+    log.info("Skipped counter update on untracked post", postId=post_id, counters=list(deltas))
+    params: Dict[str, Any] = {'ConditionExpression': condition, 'ExpressionAttributeNames': names}
+    if values:
+        params['ExpressionAttributeValues'] = values
+    try:
+        if new:
+            tables['post-reactions'].put_item(Item=new, **params)
+        else:
+            tables['post-reactions'].delete_item(Key=key, **params)
+        return True, None
+    except ClientError as e:
+        if e.response['Error'].get('Code') != 'ConditionalCheckFailedException':
+            raise
+        return False, tables['post-reactions'].get_item(Key=key).get('Item')
+
+def reaction_conflict() -> ClientError:
+    return ClientError({'Error': {'Code': 'ConditionalCheckFailedException',
+                                  'Message': 'The reaction kept changing; try again'}}, 'TransactWriteItems')
+
+def set_reaction(reaction: Dict) -> Tuple[Dict, Optional[Dict]]:
+    """Make reaction its user's only reaction to the post; returns (stored reaction, the one it replaced or None).
+
+    Re-sending the type already stored writes nothing. The first attempt assumes no
+    reaction exists, the common case for a toggle, so a like costs one write.
+    """
+    reaction = dict(reaction, reactionId=reaction_key(reaction['postId'], reaction['userId']))
+    previous = None
+    for _ in range(REACTION_WRITE_ATTEMPTS):
+        if previous and previous.get('reactionType') == reaction['reactionType']:
+            return previous, previous
+        written, current = write_reaction(reaction['reactionId'], reaction['postId'], reaction,
+                                          previous.get('reactionType') if previous else None)
+        if written:
+            return reaction, previous
+        previous = current
+    raise reaction_conflict()
+
+def remove_reaction(reaction_id: str, post_id: str, reaction_type: str) -> Optional[Dict]:
+    """Delete the reaction reaction_id, expected to be of reaction_type; returns what was deleted, None if nothing was."""
+    for _ in range(REACTION_WRITE_ATTEMPTS):
+        written, current = write_reaction(reaction_id, post_id, None, reaction_type)
+        if written:
+            return {'reactionId': reaction_id, 'postId': post_id, 'reactionType': reaction_type}
+        if not current:
+            return None
+        reaction_type = current.get('reactionType')
+    raise reaction_conflict()
+
+def get_viewer_like(post_id: str, user_id: str) -> Optional[Dict]:
+    """user_id's like of post_id, if any: one get_item on the reaction's key."""
+    reaction = tables['post-reactions'].get_item(Key={'reactionId': reaction_key(post_id, user_id)}).get('Item')
+    return reaction if reaction and reaction.get('reactionType') == 'like' else None
+
+def decrement_likes_received(post_id: str) -> None:
+    """Take one like off totalLikesReceived of the post's author, never below zero."""
+    post = tables['blog-posts'].get_item(Key={'postId': post_id}, ProjectionExpression='authorId').get('Item')
+    if not post or 'authorId' not in post:
+        return
+    try:
+        tables['user-profiles'].update_item(
+            Key={'userId': post['authorId']},
+            UpdateExpression="SET #totalLikesReceived = if_not_exists(#totalLikesReceived, :start) - :dec",
+            ExpressionAttributeNames={'#totalLikesReceived': 'totalLikesReceived'},
+            ExpressionAttributeValues={':dec': 1, ':start': 1},
+            ConditionExpression="attribute_exists(userId) AND #totalLikesReceived >= :dec"
+        )
+    except ClientError as e:
+        if e.response['Error'].get('Code') != 'ConditionalCheckFailedException':
+            raise
+        log.info("Skipped totalLikesReceived update", userId=post['authorId'])
+
+def save_reaction(reaction: Dict) -> Dict:
+    """Response for storing reaction with set_reaction: 201 when new, 200 when it replaced or repeated the user's reaction."""
+    reaction_counter_attribute(reaction['reactionType']) # Reject types that can't name a counter
+    if 'createdAt' not in reaction:
+        reaction['createdAt'] = datetime.datetime.now().isoformat()
+    stored, previous = set_reaction(reaction)
+    if previous is None:
+        record_trending(stored['postId'], TRENDING_WEIGHTS['PostReactions'])
+    elif previous.get('reactionType') == 'like' and stored['reactionType'] != 'like':
+        decrement_likes_received(stored['postId']) # A like replaced by another type, as if removed
+    return build_response(201 if previous is None else 200, {
+        'message': 'Reaction saved',
+        'id': stored['reactionId'],
+        'reactionType': stored['reactionType'],
+        'resource': f"/blog-posts/{quote(stored['postId'], safe='')}/reactions/{quote(stored['userId'], safe='')}"
+    })
+
+def record_trending(post_id: str, weight: float) -> None:
+    """record_engagement after a write that has already succeeded: a failure is logged, not raised."""
+    try:
+        record_engagement(tables['blog-posts'], post_id, weight)
+    except ClientError as e:
+        log.warning("Trending score update failed", postId=post_id, error=str(e))
+
+def trending_posts(limit: int) -> Dict[str, Any]:
+    """Top posts by decayed engagement score (see trending.py).
+
+    Reads the top of the current epoch's bucket and of the previous one, whose scores are
+    rescaled to the current epoch: right after a rollover, the current bucket only holds
+    the posts that have had an event since. Two bounded queries, run in parallel.
+    """
+    epoch = epoch_of(time.time())
+    futures = [
+        (bucket_epoch, fanout_executor.submit(
+            tables['blog-posts'].query,
+            IndexName=TRENDING_INDEX,
+            KeyConditionExpression=Key(BUCKET_ATTRIBUTE).eq(bucket_of(bucket_epoch)),
+            ScanIndexForward=False,
+            Limit=limit
+        ))
+        for bucket_epoch in (epoch, epoch - 1)
+    ]
+    ranked = []
+    for bucket_epoch, future in futures:
+        for item in future.result().get('Items', []):
+            ranked.append((rescale(item.get(SCORE_ATTRIBUTE, 0), bucket_epoch, epoch), item))
+    ranked.sort(key=lambda entry: entry[0], reverse=True)
+    items = [without_trending(item) for _, item in ranked[:limit]]
+    return {
+        'items': items,
+        'count': len(items),
+        'access_path': {
+            'operation': 'query', 'table': 'BlogPosts', 'index': TRENDING_INDEX,
+            'buckets': [bucket_of(epoch), bucket_of(epoch - 1)]
+        },
+    }
+
+def update_reply_count(comment: Dict, delta: int) -> None:
+    """ADD delta to the parent's replyCount for a created (+1) or deleted (-1) reply."""
+    parent_id = comment.get('parentCommentId')
+    if not parent_id:
+        return
+    values: Dict[str, Any] = {':delta': delta}
+    condition = 'attribute_exists(commentId)'
+    if delta < 0:
+        condition += ' AND replyCount >= :one'
+        values[':one'] = 1
+    try:
+        tables['post-comments'].update_item(
+            Key={'commentId': parent_id},
+            UpdateExpression='ADD replyCount :delta',
+            ConditionExpression=condition,
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response['Error'].get('Code') != 'ConditionalCheckFailedException':
+            raise
+        log.info("Skipped reply count update", commentId=parent_id)
+
+# =================== COMMENTS ===================
+
+COMMENTS_PAGE_SIZE = 20
+POST_COMMENTS_INDEX = 'PostCommentsByDateIndex'
+COMMENT_REPLIES_INDEX = 'CommentRepliesIndex'
+
+def query_comments(post_id: Optional[str] = None, parent_id: Optional[str] = None, limit: int = COMMENTS_PAGE_SIZE,
+                   cursor: Optional[str] = None, newest_first: bool = False) -> Dict[str, Any]:
+    """One page of a post's top-level comments, or of a comment's replies, by createdAt.
+
+    Top-level comments are those without a parentCommentId; the post index holds replies
+    too, so they are filtered out and the page is filled up to limit.
+    Returns {'items', 'cursor'}; usernames are left to the caller.
+    """
+    if parent_id:
+        index_name, attribute, value = COMMENT_REPLIES_INDEX, 'parentCommentId', parent_id
+    else:
+        index_name, attribute, value = POST_COMMENTS_INDEX, 'postId', post_id
+    scope = f"{index_name}:{value}:{'desc' if newest_first else 'asc'}"
+    params: Dict[str, Any] = {
+        'IndexName': index_name,
+        'KeyConditionExpression': Key(attribute).eq(value),
+        'ScanIndexForward': not newest_first,
+    }
+    if not parent_id:
+        params['FilterExpression'] = Attr('parentCommentId').not_exists()
+    exclusive_start_key = decode_cursor(cursor, scope)
+    if exclusive_start_key:
+        params['ExclusiveStartKey'] = exclusive_start_key
+    page = read_page(
+        tables['post-comments'].query, params, limit, fill=not parent_id,
+        key_attributes=schema_for(tables['post-comments']).index_key_attributes(index_name)
+    )
+    for comment in page['items']:
+        comment.setdefault('replyCount', 0)
+    result: Dict[str, Any] = {'items': page['items']}
+    next_cursor = encode_cursor(page['last_evaluated_key'], scope)
+    if next_cursor:
+        result['cursor'] = next_cursor
+    return result
+
+def add_comment_usernames(comments: List[Dict], usernames: Dict[str, Optional[str]]) -> None:
+    for comment in comments:
+        if 'userId' in comment:
+            comment['username'] = usernames.get(comment['userId']) or 'Anonymous' # Add username, default to 'Anonymous'
+
+def comments_page_handler(event: Dict, replies: bool) -> Dict:
+    """GET /blog-posts/{postId}/comments and /blog-posts/{postId}/comments/{commentId}/replies.
+
+    Oldest first (?order=newest reverses), paged by ?limit= and ?cursor=. Each comment
+    carries its replyCount; replies are loaded from the replies route only when asked for.
+    Replies are 404 unless commentId is a comment on postId; the parent is read alongside
+    the replies query.
+    """
     try:
-        key_schema = table.key_schema
-        if not key_schema:
-            raise ValueError("Table has no key schema defined")
-        return key_schema[0]['AttributeName']
-    except (IndexError, KeyError, AttributeError) as e:
-        raise ValueError(f"Could not determine table key attribute: {str(e)}")
+        post_id = get_path_parameter(event, 'postId')
+        comment_id = get_path_parameter(event, 'commentId') if replies else None
+        if not post_id or (replies and not comment_id):
+            return build_response(400, {'error': 'postId and commentId are required' if replies else 'postId is required'})
+        limit = get_limit_parameter(event, default=COMMENTS_PAGE_SIZE)
+        parent_future = None
+        if replies:
+            parent_future = fanout_executor.submit(
+                tables['post-comments'].get_item, Key={'commentId': comment_id}, ProjectionExpression='postId'
+            )
+        page = query_comments(
+            post_id, comment_id, limit,
+            get_query_parameter(event, 'cursor'), get_query_parameter(event, 'order') == 'newest'
+        )
+        if parent_future:
+            parent = parent_future.result().get('Item')
+            if not parent or parent.get('postId') != post_id:
+                return build_response(404, {'error': 'Comment not found'})
+        add_comment_usernames(page['items'], get_user_usernames([comment.get('userId') for comment in page['items']]))
+        return build_response(200, dict(page, count=len(page['items'])))
+    except ValueError as e:
+        return build_response(400, {'error': str(e)})
+    except ClientError as e:
+        return build_response(500, {
+            'error': 'Database query failed',
+            'code': e.response['Error'].get('Code', 'UnknownError'),
+            'message': e.response['Error'].get('Message', 'Unknown error')
+        })
+    except Exception as e:
+        return build_response(500, {'error': 'Internal server error', 'details': str(e)})
 
 # =================== HANDLERS ===================
 
 def get_item_handler(table: Any, event: Dict) -> Dict:
-    """Handle GET requests for a single item."""
+    """Handle GET requests for a single item.
+
+    Without ?currentUserId the post body is public: it has no per-viewer flags and is
+    marked cacheable by shared caches. Those flags come from /blog-posts/{postId}/viewer-state.
+    """
     try:
         # Check for both 'id' and 'postId' path parameters
         item_id = (get_path_parameter(event, 'id') or 
                   get_path_parameter(event, 'postId') or 
                   get_query_parameter(event, 'id'))
         
-        print(f"GET /blog-posts/{item_id} requested.") # Debug print
+        log.debug("Item requested", table=table.name, itemId=item_id)
 
         if not item_id:
             return build_response(400, {'error': 'Missing ID parameter'})
         
-        key_attr = get_table_key_attribute(table)
-        
+        item_key = get_item_key(table, event, item_id)
+
+        current_user_id = get_query_parameter(event, 'currentUserId') # Get current user ID from query param
+        has_viewer = bool(current_user_id) and current_user_id != "anonymous" # Ensure a valid user ID is present
+
         try:
-            response = table.get_item(Key={key_attr: item_id})
-            item = response.get('Item')
+            # Everything keyed only by the post ID is fetched concurrently with the post itself
+            post_future = fanout_executor.submit(table.get_item, Key=item_key)
+            # Only the first page of top-level comments; the rest come from /blog-posts/{postId}/comments
+            comments_future = fanout_executor.submit(query_comments, item_id)
+            bookmark_future = None
+            like_future = None
+            if has_viewer:
+                bookmark_future = fanout_executor.submit(
+                    tables['post-bookmarks'].get_item,
+                    Key={'userId': current_user_id, 'postId': item_id}
+                )
+                like_future = fanout_executor.submit(get_viewer_like, item_id, current_user_id)
+
+            item = post_future.result().get('Item')
 
             if item:
-                # Enrich post author with username
-                if 'authorId' in item:
-                    author_username = get_user_username(item['authorId'])
-                    item['authorUsername'] = author_username if author_username else 'Anonymous'
-                
+                without_trending(item)
+                # Follow status depends on the author, so it can only start once the post is known
+                follow_future = None
+                if has_viewer and 'authorId' in item:
+                    follow_future = fanout_executor.submit(
+                        tables['user-follows'].get_item,
+                        Key={'followerId': current_user_id, 'followedId': item['authorId']}
+                    )
+
+                # Counters are stored on the post; only legacy posts without them need the child rows
+                like_counter = reaction_counter_attribute('like')
+                likes_future = None
+                if like_counter not in item:
+                    likes_future = fanout_executor.submit(
+                        count_query, tables['post-reactions'],
+                        IndexName='PostReactionIndex',
+                        KeyConditionExpression=Key('postId').eq(item_id),
+                        FilterExpression='reactionType = :like',
+                        ExpressionAttributeValues={':like': 'like'}
+                    )
+                comment_count_future = None
+                if 'commentCount' not in item:
+                    comment_count_future = fanout_executor.submit(
+                        count_query, tables['post-comments'],
+                        IndexName='PostCommentsIndex', KeyConditionExpression=Key('postId').eq(item_id)
+                    )
+                shares_future = None
+                if 'shareCount' not in item:
+                    shares_future = fanout_executor.submit(
+                        tables['post-shares'].query,
+                        IndexName='PostSharesIndex', # Corrected GSI name
+                        KeyConditionExpression=Key('postId').eq(item_id)
+                    )
+
                 # Ensure createdAt is present for older posts
                 if 'createdAt' not in item:
                     item['createdAt'] = datetime.datetime.now().isoformat()
 
-                # Fetch comments for this post
-                comments_response = tables['post-comments'].query( # Use correct table object
-                    IndexName='PostCommentsIndex', # Corrected GSI name
-                    KeyConditionExpression=boto3.dynamodb.conditions.Key('postId').eq(item_id)
-                )
-                print(f"Comments query response: {comments_response.get('Items', [])}") # Debug print
-                item['comments'] = comments_response.get('Items', [])
-                # Enrich comments with usernames
-                for comment in item['comments']:
-                    if 'userId' in comment:
-                        username = get_user_username(comment['userId'])
-                        comment['username'] = username if username else 'Anonymous' # Add username, default to 'Anonymous'
-
-                # Fetch reactions for this post (e.g., count likes)
-                reactions_response = tables['post-reactions'].query( # Use correct table object
-                    IndexName='PostReactionIndex', # Corrected GSI name
-                    KeyConditionExpression=boto3.dynamodb.conditions.Key('postId').eq(item_id)
-                )
-                print(f"DEBUG: Reactions query response raw: {reactions_response}") # NEW DEBUG PRINT
-                print(f"DEBUG: Reactions query items: {reactions_response.get('Items', [])}") # NEW DEBUG PRINT
-                all_reactions = reactions_response.get('Items', [])
-                item['likes'] = sum(1 for r in all_reactions if r.get('reactionType') == 'like')
-
-                # Determine if the current user has liked this post
-                current_user_id = get_query_parameter(event, 'currentUserId') # Get current user ID from query param
-                item['userLiked'] = False
-                item['userReactionId'] = None # Initialize to None
-                print(f"DEBUG: Checking user likes for current_user_id: {current_user_id}") # MODIFIED DEBUG PRINT
-                if current_user_id and current_user_id != "anonymous": # Ensure a valid user ID is present
-                    normalized_current_user_id = current_user_id.lower() # Normalize to lowercase
-                    print(f"DEBUG: Normalized current_user_id: {normalized_current_user_id}") # NEW DEBUG PRINT
-                    for reaction in all_reactions:
-                        reaction_user_id = reaction.get('userId')
-                        reaction_type = reaction.get('reactionType')
-                        reaction_id = reaction.get('reactionId')
-
-                        print(f"  Processing reaction: {reaction_id}, userId: {reaction_user_id}, type: {reaction_type}")
-                        print(f"  DEBUG: Comparing '{reaction_user_id.lower() if reaction_user_id else 'None'}' with '{normalized_current_user_id}'") # NEW DEBUG PRINT
-
-                        if reaction_user_id and reaction_user_id.lower() == normalized_current_user_id and reaction_type == 'like':
-                            item['userLiked'] = True
-                            if reaction_id: # Ensure reactionId exists before storing
-                                item['userReactionId'] = reaction_id
-                                print(f"  User {current_user_id} found to have liked this post. Reaction ID: {reaction_id}")
-                            else:
-                                print(f"  Warning: Reaction found for user {current_user_id} but reactionId is missing.")
-                            break
-                else:
-                    print("No valid current_user_id provided for like check.")
-
-                # Fetch shares for this post
-                shares_response = tables['post-shares'].query( # Use correct table object
-                    IndexName='PostSharesIndex', # Corrected GSI name
-                    KeyConditionExpression=boto3.dynamodb.conditions.Key('postId').eq(item_id)
+                comments_page = comments_future.result()
+                item['comments'] = comments_page['items']
+                item['commentsCursor'] = comments_page.get('cursor')
+
+                # Resolve the author and every comment author in one batched lookup
+                usernames = get_user_usernames(
+                    [item.get('authorId')] + [comment.get('userId') for comment in item['comments']]
                 )
-                print(f"Shares query response: {shares_response.get('Items', [])}") # Debug print
-                item['shareCount'] = len(shares_response.get('Items', []))
-
-                # Determine if current user is following the author
-                item['isFollowingAuthor'] = False
-                if current_user_id and current_user_id != "anonymous" and 'authorId' in item:
-                    try:
-                        follow_response = tables['user-follows'].get_item(
-                            Key={'followerId': current_user_id, 'followedId': item['authorId']}
-                        )
-                        if 'Item' in follow_response:
-                            item['isFollowingAuthor'] = True
-                    except ClientError as e:
-                        print(f"Error checking follow status: {e}")
-                        # Continue without setting isFollowingAuthor if there's an error
-
-                # Determine if current user has bookmarked this post
-                item['isBookmarked'] = False
-                if current_user_id and current_user_id != "anonymous" and 'postId' in item: # Assuming postId is the primary key for BlogPosts
-                    try:
-                        bookmark_response = tables['post-bookmarks'].get_item(
-                            Key={'userId': current_user_id, 'postId': item['postId']}
-                        )
-                        if 'Item' in bookmark_response:
-                            item['isBookmarked'] = True
-                    except ClientError as e:
-                        print(f"Error checking bookmark status: {e}")
-                        # Continue without setting isBookmarked if there's an error
+                if 'authorId' in item:
+                    item['authorUsername'] = usernames.get(item['authorId']) or 'Anonymous'
+                add_comment_usernames(item['comments'], usernames)
 
-                print(f"Final item before response: {item}") # Debug print
+                if comment_count_future:
+                    item['commentCount'] = comment_count_future.result()
 
-                return build_response(200, item)
+                item['likes'] = item[like_counter] if like_counter in item else likes_future.result()
+                if shares_future:
+                    item['shareCount'] = len(shares_future.result().get('Items', []))
+
+                if not has_viewer:
+                    log.debug("Public post detail assembled", item=lambda: item)
+                    return build_response(200, item, PUBLIC_POST_HEADERS)
+
+                like = like_future.result()
+                item['userLiked'] = like is not None
+                item['userReactionId'] = like.get('reactionId') if like else None
+                item.update(collect_viewer_flags(follow_future, bookmark_future))
+
+                log.debug("Post detail assembled", item=lambda: item)
+
+                return build_response(200, item, PRIVATE_CACHE_HEADERS)
             else:
                 return build_response(404, {'error': 'Item not found'})
         except ClientError as e:
@@ -246,63 +740,333 @@ def get_item_handler(table: Any, event: Dict) -> Dict:
     except Exception as e:
         return build_response(500, {'error': 'Internal server error', 'details': str(e)})
 
-def scan_table_handler(table: Any, event: Dict) -> Dict:
-    """Handle scan operations on tables."""
-    try:
-        # Parse limit parameter
-        limit_param = get_query_parameter(event, 'limit')
-        limit = 20  # Default value
-        if limit_param:
+def collect_viewer_flags(follow_future: Any, bookmark_future: Any) -> Dict[str, bool]:
+    """isFollowingAuthor/isBookmarked from their lookups (either may be None); errors read as False."""
+    flags = {'isFollowingAuthor': False, 'isBookmarked': False}
+    for flag, future in (('isFollowingAuthor', follow_future), ('isBookmarked', bookmark_future)):
+        if future:
             try:
-                limit = int(limit_param)
-                if limit <= 0 or limit > 100:
-                    return build_response(400, {
-                        'error': 'Limit must be between 1 and 100',
-                        'provided': limit_param
-                    })
-            except ValueError:
-                return build_response(400, {
-                    'error': 'Invalid limit parameter',
-                    'provided': limit_param
-                })
+                flags[flag] = 'Item' in future.result()
+            except ClientError as e:
+                log.error("Error checking viewer state", flag=flag, error=str(e))
+    return flags
 
-        # Get pagination token
-        exclusive_start_key = get_query_parameter(event, 'last_evaluated_key')
-        
-        # Get key attribute
-        key_attr = get_table_key_attribute(table)
-        
-        # Build scan parameters
-        scan_params: Dict[str, Any] = {'Limit': limit}
-        if exclusive_start_key:
-            scan_params['ExclusiveStartKey'] = {key_attr: exclusive_start_key}
-        
-        # Add filters based on table type
-        filter_expression_parts = []
-        expression_attribute_values = {}
-        
-        if table.name == 'BlogPosts':
-            if author_id := get_query_parameter(event, 'authorId'):
-                filter_expression_parts.append('authorId = :authorId')
-                expression_attribute_values[':authorId'] = author_id
-            
-            if category_id := get_query_parameter(event, 'categoryId'):
-                filter_expression_parts.append('contains(categories, :categoryId)')
-                expression_attribute_values[':categoryId'] = category_id
+def get_viewer_state_handler(event: Dict) -> Dict:
+    """GET /blog-posts/{postId}/viewer-state?userId=: the per-viewer flags of a post.
 
-        # Special handling for post-related tables
-        if table.name in ['PostComments', 'PostReactions', 'PostShares']:
-            if post_id := get_query_parameter(event, 'postId'):
-                filter_expression_parts.append('postId = :postId')
-                expression_attribute_values[':postId'] = post_id
+    Pairs with the public (cacheable) post body, so only this small lookup is per reader.
+    """
+    try:
+        post_id = get_path_parameter(event, 'postId')
+        user_id = get_query_parameter(event, 'userId') or get_query_parameter(event, 'currentUserId')
+        if not post_id or not user_id or user_id == 'anonymous':
+            return build_response(400, {'error': 'postId and userId are required'})
+
+        post_future = fanout_executor.submit(
+            tables['blog-posts'].get_item, Key={'postId': post_id}, ProjectionExpression='authorId'
+        )
+        bookmark_future = fanout_executor.submit(
+            tables['post-bookmarks'].get_item, Key={'userId': user_id, 'postId': post_id}
+        )
+        like_future = fanout_executor.submit(get_viewer_like, post_id, user_id)
+        post = post_future.result().get('Item')
+        if not post:
+            return build_response(404, {'error': 'Item not found'})
+        follow_future = None
+        if post.get('authorId'):
+            follow_future = fanout_executor.submit(
+                tables['user-follows'].get_item,
+                Key={'followerId': user_id, 'followedId': post['authorId']}
+            )
+
+        like = like_future.result()
+        state = {
+            'postId': post_id,
+            'userId': user_id,
+            'userLiked': like is not None,
+            'userReactionId': like.get('reactionId') if like else None,
+            **collect_viewer_flags(follow_future, bookmark_future)
+        }
+        return build_response(200, state, PRIVATE_CACHE_HEADERS)
+    except ClientError as e:
+        return build_response(500, {
+            'error': 'Database operation failed',
+            'code': e.response['Error'].get('Code', 'UnknownError'),
+            'message': e.response['Error'].get('Message', 'Unknown error occurred')
+        })
+    except Exception as e:
+        return build_response(500, {'error': 'Internal server error', 'details': str(e)})
+
+def record_view_handler(event: Dict) -> Dict:
+    """POST /blog-posts/{postId}/views: count a view towards the post's trending score.
+
+    Sent by the post page after it renders, so views are counted even when the post body
+    itself was served from a shared cache.
+    """
+    try:
+        post_id = get_path_parameter(event, 'postId')
+        if not post_id:
+            return build_response(400, {'error': 'postId is required'})
+        record_engagement(tables['blog-posts'], post_id, TRENDING_WEIGHTS['view'])
+        return build_response(202, {'message': 'View recorded'})
+    except ClientError as e:
+        return build_response(500, {
+            'error': 'Database operation failed',
+            'code': e.response['Error'].get('Code', 'UnknownError'),
+            'message': e.response['Error'].get('Message', 'Unknown error occurred')
+        })
+    except Exception as e:
+        return build_response(500, {'error': 'Internal server error', 'details': str(e)})
+
+def put_reaction_handler(event: Dict) -> Dict:
+    """PUT /blog-posts/{postId}/reactions/{userId} {"reactionType": "like"}: set the user's reaction to the post.
+
+    Idempotent: repeating it changes nothing, and another type replaces the user's reaction.
+    """
+    try:
+        post_id = get_path_parameter(event, 'postId')
+        user_id = get_path_parameter(event, 'userId')
+        body = get_body(event) or {}
+        if not post_id or not user_id or user_id == 'anonymous':
+            return build_response(400, {'error': 'postId and userId are required'})
+        validate_required_fields(body, ['reactionType'])
+        return save_reaction({'postId': post_id, 'userId': user_id, 'reactionType': body['reactionType']})
+    except ValueError as e:
+        return build_response(400, {'error': str(e)})
+    except ClientError as e:
+        error_code = e.response['Error'].get('Code', 'UnknownError')
+        if error_code == 'ConditionalCheckFailedException':
+            return build_response(409, {'error': e.response['Error'].get('Message', 'Conflict')})
+        return build_response(500, {
+            'error': 'Database operation failed',
+            'code': error_code,
+            'message': e.response['Error'].get('Message', 'Unknown error occurred')
+        })
+    except Exception as e:
+        return build_response(500, {'error': 'Internal server error', 'details': str(e)})
+
+def delete_reaction_handler(event: Dict) -> Dict:
+    """DELETE /blog-posts/{postId}/reactions/{userId}?reactionType=like: remove the user's reaction to the post.
+
+    reactionType (default like) is the type the client believes it is removing; if another
+    is stored, that one is removed instead, at the cost of a second write.
+    """
+    try:
+        post_id = get_path_parameter(event, 'postId')
+        user_id = get_path_parameter(event, 'userId')
+        if not post_id or not user_id:
+            return build_response(400, {'error': 'postId and userId are required'})
+        reaction_type = get_query_parameter(event, 'reactionType') or 'like'
+        reaction_counter_attribute(reaction_type)
+        removed = remove_reaction(reaction_key(post_id, user_id), post_id, reaction_type)
+        if not removed:
+            return build_response(404, {'error': 'Reaction not found'})
+        if removed['reactionType'] == 'like':
+            decrement_likes_received(post_id)
+        return build_response(200, {'message': 'Reaction removed', 'id': removed['reactionId'],
+                                    'reactionType': removed['reactionType']})
+    except ValueError as e:
+        return build_response(400, {'error': str(e)})
+    except ClientError as e:
+        error_code = e.response['Error'].get('Code', 'UnknownError')
+        if error_code == 'ConditionalCheckFailedException':
+            return build_response(409, {'error': e.response['Error'].get('Message', 'Conflict')})
+        return build_response(500, {
+            'error': 'Database operation failed',
+            'code': error_code,
+            'message': e.response['Error'].get('Message', 'Unknown error occurred')
+        })
+    except Exception as e:
+        return build_response(500, {'error': 'Internal server error', 'details': str(e)})
+
+MAX_VIEWER_STATE_POSTS = 100
+
+def find_viewer_likes(user_id: str, post_ids: List[str]) -> Dict[str, Dict]:
+    """postId -> the user's like, for the posts in post_ids: one BatchGetItem on the reaction keys."""
+    reactions = batch_get_items(
+        tables['post-reactions'], [{'reactionId': reaction_key(post_id, user_id)} for post_id in post_ids],
+        ['reactionId', 'postId', 'reactionType']
+    )
+    return {reaction['postId']: reaction for reaction in reactions if reaction.get('reactionType') == 'like'}
+
+def get_viewer_states_handler(event: Dict) -> Dict:
+    """GET /users/{userId}/viewer-state?postIds=a,b,c: viewer flags for a page of posts.
+
+    Bookmarks, post authors and the user's likes are read in parallel (three BatchGetItems),
+    then follows of the distinct authors in one more.
+    """
+    try:
+        user_id = get_path_parameter(event, 'userId')
+        post_ids = list(dict.fromkeys(
+            post_id.strip() for post_id in (get_query_parameter(event, 'postIds') or '').split(',') if post_id.strip()
+        ))
+        if not user_id or not post_ids:
+            return build_response(400, {'error': 'userId and postIds are required'})
+        if len(post_ids) > MAX_VIEWER_STATE_POSTS:
+            return build_response(400, {'error': f"At most {MAX_VIEWER_STATE_POSTS} postIds per request"})
+
+        bookmarks_future = fanout_executor.submit(
+            batch_get_items, tables['post-bookmarks'], [{'userId': user_id, 'postId': post_id} for post_id in post_ids], ['postId']
+        )
+        posts_future = fanout_executor.submit(
+            batch_get_items, tables['blog-posts'], [{'postId': post_id} for post_id in post_ids], ['postId', 'authorId']
+        )
+        likes_future = fanout_executor.submit(find_viewer_likes, user_id, post_ids)
+
+        authors = {post['postId']: post.get('authorId') for post in posts_future.result()}
+        followed = {
+            follow['followedId'] for follow in batch_get_items(
+                tables['user-follows'],
+                [{'followerId': user_id, 'followedId': author_id} for author_id in set(authors.values()) if author_id],
+                ['followedId']
+            )
+        }
+        bookmarked = {bookmark['postId'] for bookmark in bookmarks_future.result()}
+        likes = likes_future.result()
+
+        states = {}
+        for post_id in post_ids:
+            if post_id not in authors:
+                continue # Deleted or unknown post
+            like = likes.get(post_id)
+            states[post_id] = {
+                'userLiked': like is not None,
+                'userReactionId': like.get('reactionId') if like else None,
+                'isFollowingAuthor': authors[post_id] in followed,
+                'isBookmarked': post_id in bookmarked,
+            }
+        return build_response(200, {'userId': user_id, 'posts': states}, PRIVATE_CACHE_HEADERS)
+    except ClientError as e:
+        return build_response(500, {
+            'error': 'Database operation failed',
+            'code': e.response['Error'].get('Code', 'UnknownError'),
+            'message': e.response['Error'].get('Message', 'Unknown error occurred')
+        })
+    except Exception as e:
+        return build_response(500, {'error': 'Internal server error', 'details': str(e)})
 
-        if filter_expression_parts:
-            scan_params['FilterExpression'] = ' AND '.join(filter_expression_parts)
-            scan_params['ExpressionAttributeValues'] = expression_attribute_values
+# Equality filters scan_table_handler accepts per table, in the order they are tried as index keys
+LISTING_FILTERS = {
+    'BlogPosts': ('authorId', 'categoryId'),
+    'PostComments': ('postId',),
+    'PostReactions': ('postId',),
+    'PostShares': ('postId',),
+}
+
+# PostCategories index (categoryId, createdAt) used to list a category's posts
+CATEGORY_POSTS_INDEX = 'CategoryPostsIndex'
+
+def plan_table_read(table: Any, event: Dict) -> Dict[str, Any]:
+    """Choose the access path for scan_table_handler's equality filters.
+
+    Returns a plan with the table to read, the operation ('query' or 'scan'), its
+    parameters (without Limit/ExclusiveStartKey), the filters it answers and any
+    post-processing: 'hydrate'
+    when a mapping table is queried for post IDs, 'categoryId' when an author query
+    must still be narrowed to one category.
+    """
+    filters: Dict[str, str] = {}
+    for name in LISTING_FILTERS.get(table.name, ()):
+        if value := get_query_parameter(event, name):
+            filters[name] = value
+    all_filters = dict(filters)
+
+    schema = schema_for(table)
+    for name in list(filters):
+        index = schema.index_for(name)
+        if index:
+            params: Dict[str, Any] = schema.query_params(name, filters.pop(name))
+            if index.sort_key == 'createdAt':
+                params['ScanIndexForward'] = False # Newest first
+            return {
+                'operation': 'query', 'table': table, 'index': index.name, 'params': params,
+                'filters': all_filters, 'categoryId': filters.get('categoryId')
+            }
+
+    if table.name == 'BlogPosts' and 'categoryId' in filters:
+        return {
+            'operation': 'query', 'table': tables['post-categories'], 'index': CATEGORY_POSTS_INDEX,
+            'params': {
+                'IndexName': CATEGORY_POSTS_INDEX,
+                'KeyConditionExpression': Key('categoryId').eq(filters['categoryId']),
+                'ScanIndexForward': False,
+                'ProjectionExpression': 'postId'
+            },
+            'filters': all_filters, 'hydrate': table
+        }
 
-        # Execute scan
+    # No index fits: fall back to a filtered scan
+    params = {}
+    if filters:
+        params['FilterExpression'] = ' AND '.join(f'#{name} = :{name}' for name in filters)
+        params['ExpressionAttributeNames'] = {f'#{name}': name for name in filters}
+        params['ExpressionAttributeValues'] = {f':{name}': value for name, value in filters.items()}
+    return {'operation': 'scan', 'table': table, 'index': None, 'params': params, 'filters': all_filters}
+
+def hydrate_posts(post_ids: List[str]) -> List[Dict]:
+    """Fetch full posts for an ordered list of postIds, keeping that order and skipping deleted posts."""
+    posts = {post['postId']: post for post in batch_get_items(tables['blog-posts'], [{'postId': post_id} for post_id in post_ids])}
+    return [without_trending(posts[post_id]) for post_id in post_ids if post_id in posts]
+
+def filter_posts_by_category(posts: List[Dict], category_id: str) -> List[Dict]:
+    """Keep the posts linked to category_id in the PostCategories mapping."""
+    links = batch_get_items(
+        tables['post-categories'],
+        [{'postId': post['postId'], 'categoryId': category_id} for post in posts],
+        ['postId']
+    )
+    linked = {link['postId'] for link in links}
+    return [post for post in posts if post['postId'] in linked]
+
+def scan_table_handler(table: Any, event: Dict) -> Dict:
+    """Handle list operations on tables, querying an index when a filter allows it.
+
+    Pages are resumed with the signed ?cursor= from the previous response. With ?fill=true
+    the handler keeps reading until ?limit= items are found or the read budget runs out.
+    /blog-posts?sort=trending returns the top ?limit= posts by trending score, unpaged.
+    """
+    try:
+        limit = get_limit_parameter(event)
+
+        sort = get_query_parameter(event, 'sort')
+        if table.name == 'BlogPosts' and sort:
+            if sort != 'trending':
+                return build_response(400, {'error': 'Unsupported sort', 'provided': sort, 'supported': ['trending']})
+            return build_response(200, trending_posts(limit))
+
+        plan = plan_table_read(table, event)
+        read_table = plan['table']
+        # Cursors only resume the listing (table, index and filters) they were issued for
+        cursor_scope = json.dumps([table.name, plan['index'], plan['filters']], sort_keys=True)
+        fill = (get_query_parameter(event, 'fill') or '').lower() in ('1', 'true')
+
+        # Get pagination token: the signed cursor, or the legacy single key value for scans
+        read_params: Dict[str, Any] = dict(plan['params'])
+        exclusive_start_key = decode_cursor(get_query_parameter(event, 'cursor'), cursor_scope)
+        legacy_start_key = get_query_parameter(event, 'last_evaluated_key')
+        schema = schema_for(table)
+        key_attr = schema.hash_key
+        if exclusive_start_key:
+            read_params['ExclusiveStartKey'] = exclusive_start_key
+        elif legacy_start_key and plan['operation'] == 'scan' and not schema.sort_key:
+            read_params['ExclusiveStartKey'] = {key_attr: legacy_start_key}
+
+        def transform(items: List[Dict]) -> List[Dict]:
+            if plan.get('hydrate'):
+                items = hydrate_posts([link['postId'] for link in items])
+            if plan.get('categoryId') and items:
+                items = filter_posts_by_category(items, plan['categoryId'])
+            return items
+
+        # Execute the planned read
         try:
-            response = table.scan(**scan_params)
+            read = read_table.query if plan['operation'] == 'query' else read_table.scan
+            key_attributes = schema_for(read_table).index_key_attributes(plan['index']) if fill else None
+            needs_transform = plan.get('hydrate') or plan.get('categoryId')
+            page = read_page(
+                read, read_params, limit, fill=fill,
+                transform=transform if needs_transform else None, key_attributes=key_attributes
+            )
         except ClientError as e:
             return build_response(500, {
                 'error': 'Database scan failed',
@@ -311,14 +1075,24 @@ def scan_table_handler(table: Any, event: Dict) -> Dict:
             })
 
         # Build response
+        for item in page['items']:
+            without_trending(item)
+        access_path = {'operation': plan['operation'], 'table': read_table.name}
+        if plan['index']:
+            access_path['index'] = plan['index']
+        if fill:
+            access_path['reads'] = page['reads']
         result = {
-            'items': response.get('Items', []),
-            'count': response.get('Count', 0),
-            'scanned_count': response.get('ScannedCount', 0),
+            'items': page['items'],
+            'count': len(page['items']),
+            'scanned_count': page['scanned_count'],
+            'access_path': access_path,
         }
-        
-        if 'LastEvaluatedKey' in response:
-            result['last_evaluated_key'] = response['LastEvaluatedKey'].get(key_attr)
+
+        if page['last_evaluated_key']:
+            result['cursor'] = encode_cursor(page['last_evaluated_key'], cursor_scope)
+            if plan['operation'] == 'scan' and not schema.sort_key:
+                result['last_evaluated_key'] = page['last_evaluated_key'].get(key_attr)
 
         return build_response(200, result)
         
@@ -335,22 +1109,11 @@ def create_item_handler(table: Any, event: Dict) -> Dict:
         if body is None:
             return build_response(400, {'error': 'Request body is required'})
         
-        key_attr = get_table_key_attribute(table)
+        schema = schema_for(table)
+        key_attr = schema.hash_key
 
         # Table-specific validation
-        required_fields_map = {
-            'Users': ['username', 'email'],
-            'BlogPosts': ['title', 'content', 'authorId'],
-            'PostComments': ['postId', 'userId', 'content'],
-            'PostReactions': ['postId', 'userId', 'reactionType'],
-            'PostShares': ['postId', 'userId', 'shareType'],
-            'Categories': ['name', 'slug'],
-            'Tags': ['name', 'slug'],
-            'PostCategories': ['postId', 'categoryId'],
-        }
-
-        required_fields = required_fields_map.get(table.name, [])
-        validate_required_fields(body, required_fields)
+        validate_required_fields(body, list(schema.required))
 
         # For post-related items, check if postId is in path parameters
         if table.name in ['PostComments', 'PostReactions', 'PostShares']:
@@ -362,6 +1125,27 @@ def create_item_handler(table: Any, event: Dict) -> Dict:
                     })
                 body['postId'] = path_post_id
 
+        # Counters start at zero (or are absent) and are only changed by the writes they count
+        for attribute in [name for name in body if schema.is_counter(name)]:
+            body.pop(attribute)
+
+        if table.name == 'PostReactions':
+            return save_reaction(body) # Keyed by (postId, userId), not a fresh ID
+
+        if table.name == 'PostComments':
+            if body.get('parentCommentId'):
+                # A reply must answer a comment on the same post
+                parent = table.get_item(Key={'commentId': body['parentCommentId']}, ProjectionExpression='postId').get('Item')
+                if not parent or parent.get('postId') != body['postId']:
+                    return build_response(400, {'error': 'parentCommentId must be a comment on the same post'})
+            else:
+                body.pop('parentCommentId', None) # An empty value can't be stored in an index key
+
+        # New posts start with zeroed engagement counters and a fresh trending score
+        if table.name == 'BlogPosts':
+            body.update(initial_post_counters())
+            body.update(initial_trending())
+
         # Generate ID if not provided
         if key_attr not in body:
             body[key_attr] = str(uuid.uuid4())
@@ -383,7 +1167,21 @@ def create_item_handler(table: Any, event: Dict) -> Dict:
                     ExpressionAttributeNames={'#postsCount': 'postsCount'},
                     ExpressionAttributeValues={':inc': 1, ':start': 0}
                 )
-            
+
+            if table.name == 'BlogPosts':
+                refresh_search_index(body[key_attr], body)
+
+            # The item is written: a failed counter update is logged rather than answered with
+            # a 500, which the client would retry into a duplicate
+            try:
+                update_post_counters(table.name, body, 1)
+                if table.name == 'PostComments':
+                    update_reply_count(body, 1)
+            except ClientError as e:
+                log.warning("Counter update failed", table=table.name, id=body[key_attr], error=str(e))
+            if table.name in POST_COUNTER_ATTRIBUTES and body.get('postId'):
+                record_trending(body['postId'], TRENDING_WEIGHTS[table.name])
+
             return build_response(201, {
                 'message': 'Item created successfully',
                 'id': body[key_attr],
@@ -421,8 +1219,12 @@ def update_item_handler(table: Any, event: Dict) -> Dict:
         if not body:
             return build_response(400, {'error': 'Request body is required'})
         
-        key_attr = get_table_key_attribute(table)
-        body.pop(key_attr, None)  # Prevent ID modification
+        schema = schema_for(table)
+        item_key = get_item_key(table, event, item_id)
+        for key_attr in schema.key_attributes:
+            body.pop(key_attr, None)  # Prevent ID modification
+        for attribute in [name for name in body if schema.is_counter(name)]:
+            body.pop(attribute) # Counters are only changed by child writes
 
         if not body:
             return build_response(400, {'error': 'No fields to update'})
@@ -432,17 +1234,24 @@ def update_item_handler(table: Any, event: Dict) -> Dict:
         expr_attr_names = {f"#{k}": k for k in body}
         expr_attr_values = {f":{k}": v for k, v in body.items()}
 
+        # A post whose searchable text or status changes is re-indexed from its new version
+        reindex = table.name == 'BlogPosts' and any(field in body for field in (*SEARCH_FIELDS, 'status'))
+
         try:
             response = table.update_item(
-                Key={key_attr: item_id},
+                Key=item_key,
                 UpdateExpression=update_expr,
                 ExpressionAttributeNames=expr_attr_names,
                 ExpressionAttributeValues=expr_attr_values,
-                ReturnValues="UPDATED_NEW"
+                ReturnValues="ALL_NEW" if reindex else "UPDATED_NEW"
             )
+            attributes = response.get('Attributes', {})
+            if reindex:
+                refresh_search_index(item_id, attributes)
+                attributes = {name: value for name, value in attributes.items() if name in body}
             return build_response(200, {
                 'message': 'Item updated successfully',
-                'updated_attributes': response.get('Attributes', {})
+                'updated_attributes': attributes
             })
         except ClientError as e:
             error_code = e.response['Error'].get('Code', 'UnknownError')
@@ -464,7 +1273,7 @@ def update_item_handler(table: Any, event: Dict) -> Dict:
 def delete_item_handler(table: Any, event: Dict) -> Dict:
     """Handle item deletion."""
     try:
-        key_attr = get_table_key_attribute(table) # Get key_attr first
+        key_attr = schema_for(table).hash_key # Get key_attr first
 
         # Use the table's primary key attribute name to get the ID from path parameters
         item_id = get_path_parameter(event, key_attr)
@@ -472,23 +1281,14 @@ def delete_item_handler(table: Any, event: Dict) -> Dict:
         if not item_id:
             return build_response(400, {'error': f'Missing {key_attr} parameter'})
 
+        item_key = get_item_key(table, event, item_id)
+
         try:
             # Check existence
-            existing = table.get_item(Key={key_attr: item_id})
+            existing = table.get_item(Key=item_key)
             if 'Item' not in existing:
                 return build_response(404, {'error': 'Item not found'})
             
-            # If a blog post is deleted, decrement postsCount for the author
-            if table.name == 'BlogPosts' and 'authorId' in existing['Item']:
-                author_id = existing['Item']['authorId']
-                tables['user-profiles'].update_item(
-                    Key={'userId': author_id},
-                    UpdateExpression="SET #postsCount = if_not_exists(#postsCount, :start) - :dec",
-                    ExpressionAttributeNames={'#postsCount': 'postsCount'},
-                    ExpressionAttributeValues={':dec': 1, ':start': 1},
-                    ConditionExpression="attribute_exists(userId) AND #postsCount >= :dec"
-                )
-
             # If a blog post is deleted, decrement postsCount for the author
             if table.name == 'BlogPosts' and 'authorId' in existing['Item']:
                 author_id = existing['Item']['authorId']
@@ -500,30 +1300,26 @@ def delete_item_handler(table: Any, event: Dict) -> Dict:
                     ConditionExpression="attribute_exists(userId) AND #postsCount >= :dec"
                 )
             
-            # If a post reaction (like) is deleted, decrement totalLikesReceived for the post's author
+            # A reaction and its post's counters are deleted together; a like also comes off the author's totalLikesReceived
             if table.name == 'PostReactions':
-                # Need to get the reaction item first to know its postId and reactionType
-                reaction_item_response = table.get_item(Key={key_attr: item_id})
-                reaction_item = reaction_item_response.get('Item')
-
-                if reaction_item and reaction_item.get('reactionType') == 'like':
-                    post_id = reaction_item.get('postId')
-                    if post_id:
-                        # Fetch the post to get its authorId
-                        post_response = tables['blog-posts'].get_item(Key={'postId': post_id})
-                        post = post_response.get('Item')
-                        if post and 'authorId' in post:
-                            author_id = post['authorId']
-                            tables['user-profiles'].update_item(
-                                Key={'userId': author_id},
-                                UpdateExpression="SET #totalLikesReceived = if_not_exists(#totalLikesReceived, :start) - :dec",
-                                ExpressionAttributeNames={'#totalLikesReceived': 'totalLikesReceived'},
-                                ExpressionAttributeValues={':dec': 1, ':start': 1},
-                                ConditionExpression="attribute_exists(userId) AND #totalLikesReceived >= :dec"
-                            )
+                reaction_item = existing['Item']
+                removed = remove_reaction(item_id, reaction_item.get('postId'), reaction_item.get('reactionType'))
+                if not removed:
+                    return build_response(404, {'error': 'Item not found'})
+                if removed.get('reactionType') == 'like' and removed.get('postId'):
+                    decrement_likes_received(removed['postId'])
+                return build_response(200, {
+                    'message': 'Item deleted successfully',
+                    'id': item_id
+                })
 
             # Delete item
-            table.delete_item(Key={key_attr: item_id})
+            table.delete_item(Key=item_key)
+            update_post_counters(table.name, existing['Item'], -1)
+            if table.name == 'PostComments':
+                update_reply_count(existing['Item'], -1)
+            if table.name == 'BlogPosts':
+                refresh_search_index(item_id)
             return build_response(200, {
                 'message': 'Item deleted successfully',
                 'id': item_id
@@ -567,7 +1363,7 @@ def create_follow_handler(event: Dict) -> Dict:
             if 'Item' in response:
                 return build_response(409, {'error': 'Already following this user'})
         except ClientError as e:
-            print(f"Error checking existing follow: {e}")
+            log.error("Error checking existing follow", error=str(e))
             return build_response(500, {'error': 'Database error during check'})
 
         item = {
@@ -749,7 +1545,7 @@ def create_bookmark_handler(event: Dict) -> Dict:
             if 'Item' in response:
                 return build_response(409, {'error': 'Post already bookmarked by this user'})
         except ClientError as e:
-            print(f"Error checking existing bookmark: {e}")
+            log.error("Error checking existing bookmark", error=str(e))
             return build_response(500, {'error': 'Database error during check'})
 
         item = {
@@ -806,50 +1602,132 @@ def delete_bookmark_handler(event: Dict) -> Dict:
     except Exception as e:
         return build_response(500, {'error': 'Internal server error', 'details': str(e)})
 
+def count_query(table: Any, **query_params: Any) -> int:
+    """Count the items matching a query without transferring them (Select=COUNT, all pages)."""
+    total = 0
+    while True:
+        response = table.query(Select='COUNT', **query_params)
+        total += response.get('Count', 0)
+        if 'LastEvaluatedKey' not in response:
+            return total
+        query_params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def get_post_engagement_counts(post_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    """Comment, like and share counts for many posts, with every count query issued concurrently."""
+    futures = {}
+    for post_id in post_ids:
+        futures[post_id] = {
+            'commentCount': fanout_executor.submit(
+                count_query, tables['post-comments'],
+                IndexName='PostCommentsIndex',
+                KeyConditionExpression=Key('postId').eq(post_id)
+            ),
+            'likes': fanout_executor.submit(
+                count_query, tables['post-reactions'],
+                IndexName='PostReactionIndex',
+                KeyConditionExpression=Key('postId').eq(post_id),
+                FilterExpression='reactionType = :like',
+                ExpressionAttributeValues={':like': 'like'}
+            ),
+            'shareCount': fanout_executor.submit(
+                count_query, tables['post-shares'],
+                IndexName='PostSharesIndex',
+                KeyConditionExpression=Key('postId').eq(post_id)
+            )
+        }
+    return {
+        post_id: {name: future.result() for name, future in post_futures.items()}
+        for post_id, post_futures in futures.items()
+    }
+
 def get_user_posts_handler(event: Dict) -> Dict:
-    """Handle GET requests to retrieve posts by a specific user (authorId)."""
+    """Handle GET requests to retrieve posts by a specific user (authorId).
+
+    With ?aggregate=counts, ?limit= or ?cursor= the author's posts are paged newest first
+    and returned as {'items', 'count', 'cursor'}; ?aggregate=counts replaces the inlined
+    comments with commentCount/likes/shareCount.
+    """
     try:
         user_id = get_path_parameter(event, 'userId')
         if not user_id:
             return build_response(400, {'error': 'userId path parameter is required'})
 
+        counts_only = get_query_parameter(event, 'aggregate') == 'counts'
+        cursor = get_query_parameter(event, 'cursor')
+        paginated = counts_only or cursor is not None or get_query_parameter(event, 'limit') is not None
+
+        query_params: Dict[str, Any] = {
+            'IndexName': 'AuthorIndex', # Corrected index name based on user feedback
+            'KeyConditionExpression': Key('authorId').eq(user_id),
+            'ScanIndexForward': False # AuthorIndex sorts by createdAt: newest first
+        }
+        if paginated:
+            query_params['Limit'] = get_limit_parameter(event)
+            exclusive_start_key = decode_cursor(cursor, f"user-posts:{user_id}")
+            if exclusive_start_key:
+                query_params['ExclusiveStartKey'] = exclusive_start_key
+
         try:
             # Query the BlogPosts table using the AuthorIndex
-            response = tables['blog-posts'].query(
-                IndexName='AuthorIndex', # Corrected index name based on user feedback
-                KeyConditionExpression=Key('authorId').eq(user_id)
-            )
-            posts = response.get('Items', [])
+            response = tables['blog-posts'].query(**query_params)
+            posts = [without_trending(post) for post in response.get('Items', [])]
+
+            # Every post has the same author, so the username is resolved once
+            author_username = get_user_username(user_id) if posts else None
+
+            like_counter = reaction_counter_attribute('like')
+            if counts_only:
+                # Posts carrying stored counters need no queries; legacy posts are counted
+                for post in posts:
+                    if all(counter in post for counter in ('commentCount', like_counter, 'shareCount')):
+                        post['likes'] = post[like_counter]
+                legacy_posts = [post for post in posts if 'likes' not in post]
+                counts = get_post_engagement_counts([post['postId'] for post in legacy_posts])
+                for post in legacy_posts:
+                    post.update(counts[post['postId']])
+            else:
+                # Fetch comments (full items, the frontend uses their length), reactions and shares concurrently
+                child_futures = {}
+                for post in posts:
+                    child_futures[post['postId']] = [
+                        fanout_executor.submit(
+                            tables['post-comments'].query,
+                            IndexName='PostCommentsIndex',
+                            KeyConditionExpression=Key('postId').eq(post['postId'])
+                        ),
+                        None if like_counter in post else fanout_executor.submit(
+                            tables['post-reactions'].query,
+                            IndexName='PostReactionIndex',
+                            KeyConditionExpression=Key('postId').eq(post['postId'])
+                        ),
+                        None if 'shareCount' in post else fanout_executor.submit(
+                            tables['post-shares'].query,
+                            IndexName='PostSharesIndex',
+                            KeyConditionExpression=Key('postId').eq(post['postId'])
+                        )
+                    ]
+                for post in posts:
+                    comments_future, reactions_future, shares_future = child_futures[post['postId']]
+                    post['comments'] = comments_future.result().get('Items', [])
+                    if reactions_future:
+                        all_reactions = reactions_future.result().get('Items', [])
+                        post['likes'] = sum(1 for r in all_reactions if r.get('reactionType') == 'like')
+                    else:
+                        post['likes'] = post[like_counter]
+                    if shares_future:
+                        post['shareCount'] = len(shares_future.result().get('Items', []))
 
-            # Enrich posts with author username and counts (likes, comments, shares)
             for post in posts:
-                if 'authorId' in post:
-                    author_username = get_user_username(post['authorId'])
-                    post['authorUsername'] = author_username if author_username else 'Anonymous'
-                
-                # Fetch comments count for this post
-                comments_response = tables['post-comments'].query(
-                    IndexName='PostCommentsIndex',
-                    KeyConditionExpression=Key('postId').eq(post['postId'])
-                )
-                post['comments'] = comments_response.get('Items', []) # Store full comments for length calculation
+                post['authorUsername'] = author_username if author_username else 'Anonymous'
 
-                # Fetch reactions (likes) count for this post
-                reactions_response = tables['post-reactions'].query(
-                    IndexName='PostReactionIndex',
-                    KeyConditionExpression=Key('postId').eq(post['postId'])
-                )
-                all_reactions = reactions_response.get('Items', [])
-                post['likes'] = sum(1 for r in all_reactions if r.get('reactionType') == 'like')
+            if not paginated:
+                return build_response(200, posts)
 
-                # Fetch shares count for this post
-                shares_response = tables['post-shares'].query(
-                    IndexName='PostSharesIndex',
-                    KeyConditionExpression=Key('postId').eq(post['postId'])
-                )
-                post['shareCount'] = len(shares_response.get('Items', []))
-            
-            return build_response(200, posts)
+            result: Dict[str, Any] = {'items': posts, 'count': len(posts)}
+            next_cursor = encode_cursor(response.get('LastEvaluatedKey'), f"user-posts:{user_id}")
+            if next_cursor:
+                result['cursor'] = next_cursor
+            return build_response(200, result)
         except ClientError as e:
             error_code = e.response['Error'].get('Code', 'UnknownError')
             return build_response(500, {
@@ -862,6 +1740,106 @@ def get_user_posts_handler(event: Dict) -> Dict:
     except Exception as e:
         return build_response(500, {'error': 'Internal server error', 'details': str(e)})
 
+# =================== HOME FEED ===================
+
+# Smallest number of posts read per author query. A page spreads its size over the authors
+# (following 2 authors reads 10 each for a page of 20), and the merge pulls further chunks
+# only from authors it reaches, so a page costs about one query per followed author.
+FEED_AUTHOR_CHUNK = int(os.environ.get('FEED_AUTHOR_CHUNK', '5'))
+# Most recently followed authors a feed covers
+FEED_MAX_AUTHORS = int(os.environ.get('FEED_MAX_AUTHORS', '500'))
+
+def feed_order(post: Dict) -> Tuple[str, str]:
+    return (post.get('createdAt', ''), post['postId'])
+
+def get_followed_ids(user_id: str) -> List[str]:
+    """Authors user_id follows, most recently followed first, capped at FEED_MAX_AUTHORS."""
+    params: Dict[str, Any] = {
+        'IndexName': 'FollowerUsersIndex',
+        'KeyConditionExpression': Key('followerId').eq(user_id),
+        'ProjectionExpression': 'followedId, createdAt'
+    }
+    follows: List[Dict] = []
+    while True:
+        response = tables['user-follows'].query(**params)
+        follows.extend(response.get('Items', []))
+        if not response.get('LastEvaluatedKey'):
+            break
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    follows.sort(key=lambda follow: follow.get('createdAt', ''), reverse=True)
+    return [follow['followedId'] for follow in follows[:FEED_MAX_AUTHORS]]
+
+def author_posts_before(author_id: str, before: Optional[Tuple[str, str]], chunk: int) -> Dict[str, Any]:
+    """AuthorIndex query params for author_id's posts older than the before (createdAt, postId) mark."""
+    condition = Key('authorId').eq(author_id)
+    if before:
+        condition = condition & Key('createdAt').lte(before[0]) # Ties on createdAt are dropped by postId below
+    return {'IndexName': 'AuthorIndex', 'KeyConditionExpression': condition,
+            'ScanIndexForward': False, 'Limit': chunk}
+
+def author_stream(first_page: Any, params: Dict[str, Any], before: Optional[Tuple[str, str]]) -> Iterator[Dict]:
+    """One author's posts, newest first, starting from an already submitted first query."""
+    response = first_page.result()
+    while True:
+        for post in response.get('Items', []):
+            if before is None or feed_order(post) < before:
+                yield post
+        if not response.get('LastEvaluatedKey'):
+            return
+        params = dict(params, ExclusiveStartKey=response['LastEvaluatedKey'])
+        response = tables['blog-posts'].query(**params)
+
+def get_feed_handler(event: Dict) -> Dict:
+    """GET /users/{userId}/feed: posts of followed authors, newest first, paged by ?limit=/?cursor=.
+
+    Every followed author's newest posts below the cursor are queried in parallel and
+    k-way merged with a heap. The cursor is the (createdAt, postId) of the last post
+    returned, so it stays small however many authors are followed.
+    """
+    try:
+        user_id = get_path_parameter(event, 'userId')
+        if not user_id:
+            return build_response(400, {'error': 'userId path parameter is required'})
+        limit = get_limit_parameter(event)
+        scope = f"feed:{user_id}"
+        mark = decode_cursor(get_query_parameter(event, 'cursor'), scope)
+        before = (mark['createdAt'], mark['postId']) if mark else None
+
+        try:
+            author_ids = get_followed_ids(user_id)
+            chunk = max(FEED_AUTHOR_CHUNK, -(-(limit + 1) // max(len(author_ids), 1)))
+            streams = []
+            for author_id in author_ids:
+                params = author_posts_before(author_id, before, min(chunk, limit + 1))
+                streams.append(author_stream(fanout_executor.submit(tables['blog-posts'].query, **params), params, before))
+            merged = heapq.merge(*streams, key=feed_order, reverse=True)
+            posts = list(itertools.islice(merged, limit + 1)) # One extra to know whether there's a next page
+        except ClientError as e:
+            error_code = e.response['Error'].get('Code', 'UnknownError')
+            return build_response(500, {
+                'error': 'Database query failed',
+                'code': error_code,
+                'message': e.response['Error'].get('Message', 'Unknown error')
+            })
+
+        has_more = len(posts) > limit
+        posts = [without_trending(post) for post in posts[:limit]]
+        usernames = get_user_usernames([post.get('authorId') for post in posts])
+        like_counter = reaction_counter_attribute('like')
+        for post in posts:
+            post['authorUsername'] = usernames.get(post.get('authorId')) or 'Anonymous'
+            post['likes'] = post.get(like_counter, 0)
+
+        result: Dict[str, Any] = {'items': posts, 'count': len(posts), 'authors': len(author_ids)}
+        if has_more:
+            last = posts[-1]
+            result['cursor'] = encode_cursor({'createdAt': last['createdAt'], 'postId': last['postId']}, scope)
+        return build_response(200, result, PRIVATE_CACHE_HEADERS)
+    except ValueError as e:
+        return build_response(400, {'error': str(e)})
+    except Exception as e:
+        return build_response(500, {'error': 'Internal server error', 'details': str(e)})
+
 def get_bookmarks_handler(event: Dict) -> Dict:
     """Handle GET requests to retrieve bookmarked posts for a specific user, enriching with post details."""
     try:
@@ -884,6 +1862,7 @@ def get_bookmarks_handler(event: Dict) -> Dict:
                     post_response = tables['blog-posts'].get_item(Key={'postId': post_id})
                     post = post_response.get('Item')
                     if post:
+                        without_trending(post)
                         # Enrich post with author username
                         if 'authorId' in post:
                             author_username = get_user_username(post['authorId'])
@@ -905,15 +1884,12 @@ def get_bookmarks_handler(event: Dict) -> Dict:
 
 # =================== MEDIA UPLOAD HANDLER ===================
 
-import base64
-import mimetypes
-import os
-
-s3 = boto3.client('s3')
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'blogsphere-20') # Use the bucket name provided by the user
 
 def upload_media_handler(event: Dict) -> Dict:
     """Handle POST requests to upload media (images/videos) to S3."""
+    import mimetypes # Only this route needs it; keeps it off the cold-start path
+
     try:
         body = event.get('body')
         if body is None:
@@ -962,7 +1938,7 @@ def upload_media_handler(event: Dict) -> Dict:
         s3_key = f"{s3_folder}{uuid.uuid4()}{file_extension}"
 
         try:
-            s3.put_object(
+            clients.s3().put_object(
                 Bucket=S3_BUCKET_NAME,
                 Key=s3_key,
                 Body=file_content,
@@ -986,119 +1962,236 @@ def upload_media_handler(event: Dict) -> Dict:
     except Exception as e:
         return build_response(500, {'error': 'Internal server error', 'details': str(e)})
 
+# =================== CATEGORY AND TAG PAGES ===================
+
+# Link attribute -> the mapping table and its (link, createdAt) index listing linked posts
+POST_LINK_INDEXES = {
+    'categoryId': ('post-categories', CATEGORY_POSTS_INDEX),
+    'tagId': ('post-tags', 'TagPostsIndex'),
+}
+
+EXCERPT_LENGTH = 150
+MARKUP_PATTERN = re.compile(r'<[^>]*>')
+MEDIA_SOURCE_PATTERNS = [re.compile(rf'<{tag}\b[^>]*?\bsrc=["\']([^"\']+)', re.IGNORECASE) for tag in ('img', 'video')]
+
+def post_summary(post: Dict) -> Dict:
+    """A post for a listing card: content replaced by its first image or video and a text excerpt."""
+    summary = {name: value for name, value in post.items() if name != 'content'}
+    content = post.get('content') if isinstance(post.get('content'), str) else ''
+    summary['mediaUrl'] = ''
+    for pattern in MEDIA_SOURCE_PATTERNS:
+        match = pattern.search(content)
+        if match:
+            summary['mediaUrl'] = html.unescape(match.group(1))
+            break
+    summary['excerpt'] = html.unescape(MARKUP_PATTERN.sub('', content))[:EXCERPT_LENGTH]
+    return summary
+
+def get_linked_posts_handler(event: Dict, link_attribute: str) -> Dict:
+    """GET /categories/{categoryId}/posts and /tags/{tagId}/posts: post summaries, newest first.
+
+    One query on the mapping table's index for a page of postIds, then one BatchGetItem for
+    the posts, so a page costs the same however many posts the category holds. Paged by
+    ?limit= and ?cursor=.
+    """
+    try:
+        link_id = get_path_parameter(event, link_attribute)
+        if not link_id:
+            return build_response(400, {'error': f"{link_attribute} path parameter is required"})
+        resource, index_name = POST_LINK_INDEXES[link_attribute]
+        scope = f"{index_name}:{link_id}"
+
+        query_params: Dict[str, Any] = {
+            'IndexName': index_name,
+            'KeyConditionExpression': Key(link_attribute).eq(link_id),
+            'ScanIndexForward': False, # Newest first
+            'ProjectionExpression': 'postId',
+            'Limit': get_limit_parameter(event),
+        }
+        exclusive_start_key = decode_cursor(get_query_parameter(event, 'cursor'), scope)
+        if exclusive_start_key:
+            query_params['ExclusiveStartKey'] = exclusive_start_key
+
+        try:
+            response = tables[resource].query(**query_params)
+            posts = hydrate_posts([link['postId'] for link in response.get('Items', [])])
+        except ClientError as e:
+            return build_response(500, {
+                'error': 'Database query failed',
+                'code': e.response['Error'].get('Code', 'UnknownError'),
+                'message': e.response['Error'].get('Message', 'Unknown error')
+            })
+
+        usernames = get_user_usernames([post.get('authorId') for post in posts])
+        items = []
+        for post in posts:
+            summary = post_summary(post)
+            summary['authorUsername'] = usernames.get(post.get('authorId')) or 'Anonymous'
+            items.append(summary)
+
+        result: Dict[str, Any] = {'items': items, 'count': len(items)}
+        next_cursor = encode_cursor(response.get('LastEvaluatedKey'), scope)
+        if next_cursor:
+            result['cursor'] = next_cursor
+        return build_response(200, result)
+    except ValueError as e:
+        return build_response(400, {'error': str(e)})
+    except Exception as e:
+        return build_response(500, {'error': 'Internal server error', 'details': str(e)})
+
+# =================== SEARCH ===================
+
+post_search = SearchIndex(clients.s3, S3_BUCKET_NAME)
+
+SEARCH_MAX_RESULTS = 50
+
+def refresh_search_index(post_id: str, post: Optional[Dict] = None) -> None:
+    """Publish a post write (or, without post, a deletion) to the search index.
+
+    A failure here only delays the post's search results until the next index build, so
+    it is logged rather than failing the write.
+    """
+    try:
+        if post is None:
+            post_search.record_delete(post_id)
+        else:
+            post_search.record(dict(post, postId=post_id))
+    except Exception as e:
+        log.warning("Search index update failed", postId=post_id, error=str(e))
+
+def search_handler(event: Dict) -> Dict:
+    """GET /search?q=: postIds ranked by BM25 over post titles, tags and content.
+
+    With ?hydrate=true the posts themselves come back too, in rank order.
+    """
+    try:
+        query = (get_query_parameter(event, 'q') or '').strip()
+        if not query:
+            return build_response(400, {'error': 'q is required'})
+        limit = get_limit_parameter(event, maximum=SEARCH_MAX_RESULTS)
+        results = post_search.search(query, limit)
+        body: Dict[str, Any] = {
+            'query': query,
+            'results': [{'postId': post_id, 'score': round(score, 4)} for post_id, score in results],
+            'count': len(results),
+        }
+        if (get_query_parameter(event, 'hydrate') or '').lower() in ('1', 'true'):
+            body['items'] = hydrate_posts([post_id for post_id, _ in results])
+        return build_response(200, body)
+    except ValueError as e:
+        return build_response(400, {'error': str(e)})
+    except ClientError as e:
+        return build_response(500, {
+            'error': 'Search failed',
+            'code': e.response['Error'].get('Code', 'UnknownError'),
+            'message': e.response['Error'].get('Message', 'Unknown error occurred')
+        })
+    except Exception as e:
+        return build_response(500, {'error': 'Internal server error', 'details': str(e)})
+
+# =================== ROUTES ===================
+# Resource -> path parameter naming one item, for the generic table CRUD handlers
+CRUD_RESOURCES = {
+    'blog-posts': '{postId}',
+    'categories': '{categoryId}',
+    'post-categories': '{postId}/{categoryId}',
+    'post-comments': '{commentId}',
+    'post-reactions': '{reactionId}',
+    'post-shares': '{shareId}',
+    'tags': '{tagId}',
+    'post-tags': '{postId}/{tagId}',
+}
+
+def request_errors(event: Dict, params: Dict, call_next: Any) -> Dict:
+    """Middleware for the table routes: report unexpected failures with the resource and method."""
+    try:
+        return call_next(event, params)
+    except Exception as e:
+        resource = (event.get('resource') or '').strip('/').split('/')[0]
+        log.exception("Request processing failed", resource=resource, method=event.get('httpMethod'))
+        return build_response(500, {
+            'error': 'Request processing failed',
+            'details': str(e),
+            'resource': resource,
+            'method': event.get('httpMethod')
+        })
+
+def table_route(handler: Any, resource: str) -> Any:
+    table = tables[resource]
+    return lambda event, params: handler(table, event)
+
+def event_route(handler: Any) -> Any:
+    return lambda event, params: handler(event)
+
+router = Router()
+# Resources whose GETs carry an ETag and answer If-None-Match
+CONDITIONAL_RESOURCES = {'blog-posts', 'categories'}
+
+for resource, item in CRUD_RESOURCES.items():
+    collection = f"/{resource}"
+    get_middleware = [request_errors, conditional_get] if resource in CONDITIONAL_RESOURCES else [request_errors]
+    router.add('GET', collection, table_route(scan_table_handler, resource), get_middleware)
+    router.add('POST', collection, table_route(create_item_handler, resource), [request_errors])
+    router.add('GET', f"{collection}/{item}", table_route(get_item_handler, resource), get_middleware)
+    router.add('DELETE', f"{collection}/{item}", table_route(delete_item_handler, resource), [request_errors])
+    if resource not in ('post-categories', 'post-tags'): # Links are created and deleted, never edited
+        router.add('PUT', f"{collection}/{item}", table_route(update_item_handler, resource), [request_errors])
+router.add('POST', '/user-follows', event_route(create_follow_handler))
+router.add('DELETE', '/user-follows/{followerId}/{followedId}', event_route(delete_follow_handler))
+router.add('POST', '/post-bookmarks', event_route(create_bookmark_handler))
+router.add('DELETE', '/post-bookmarks/{userId}/{postId}', event_route(delete_bookmark_handler))
+router.add('POST', '/upload-media', event_route(upload_media_handler))
+router.add('GET', '/blog-posts/{postId}/viewer-state', event_route(get_viewer_state_handler))
+router.add('POST', '/blog-posts/{postId}/views', event_route(record_view_handler))
+router.add('PUT', '/blog-posts/{postId}/reactions/{userId}', event_route(put_reaction_handler))
+router.add('DELETE', '/blog-posts/{postId}/reactions/{userId}', event_route(delete_reaction_handler))
+router.add('GET', '/blog-posts/{postId}/comments', lambda event, params: comments_page_handler(event, replies=False))
+router.add('GET', '/blog-posts/{postId}/comments/{commentId}/replies',
+           lambda event, params: comments_page_handler(event, replies=True))
+router.add('GET', '/users/{userId}/following', event_route(get_following_handler))
+router.add('GET', '/users/{userId}/followers', event_route(get_followers_handler))
+router.add('GET', '/users/{userId}/bookmarks', event_route(get_bookmarks_handler))
+router.add('GET', '/users/{userId}/posts', event_route(get_user_posts_handler))
+router.add('GET', '/users/{userId}/viewer-state', event_route(get_viewer_states_handler))
+router.add('GET', '/users/{userId}/feed', event_route(get_feed_handler))
+router.add('GET', '/search', event_route(search_handler))
+router.add('GET', '/categories/{categoryId}/posts', lambda event, params: get_linked_posts_handler(event, 'categoryId'),
+           [conditional_get])
+router.add('GET', '/tags/{tagId}/posts', lambda event, params: get_linked_posts_handler(event, 'tagId'), [conditional_get])
+
 # =================== MAIN LAMBDA ===================
+@trace_request('posts')
+@compress_responses
 def lambda_handler(event: Dict, context: Any) -> Dict:
     """Main Lambda function handler - updated for new API structure."""
+    log.start_request(
+        f"{event.get('httpMethod', '')} {event.get('resource', '')}",
+        getattr(context, 'aws_request_id', None)
+    )
+    log.debug("Received event", event=lambda: {k: v for k, v in event.items() if k != 'body'})
     try:
         # Handle CORS preflight
         if event.get('httpMethod') == 'OPTIONS':
             return handle_options_request()
 
-        # Extract resource path and method
-        path_parts = [p for p in event.get('resource', '').split('/') if p]
-        method = event.get('httpMethod', '').upper()
-
-        # Determine the table based on the resource path
-        # Note: 'users' is included here to handle nested paths like /users/{userId}/following
-        resource_map = {
-            'blog-posts': 'blog-posts',
-            'categories': 'categories',
-            'post-categories': 'post-categories',
-            'post-comments': 'post-comments',
-            'post-reactions': 'post-reactions',
-            'post-shares': 'post-shares',
-            'tags': 'tags',
-            'user-follows': 'user-follows', # NEW
-            'post-bookmarks': 'post-bookmarks', # NEW
-            'users': 'users' # Included to handle nested user paths like /users/{userId}/following
-        }
-
-        # Handle root path
-        if not path_parts:
-            return build_response(404, {'error': 'Resource not found'})
-
-        # Get the base resource (first part of path)
-        base_resource = path_parts[0]
-        
-        # Special routing for user-related nested paths
-        if base_resource == 'users' and len(path_parts) > 2:
-            user_id = path_parts[1]
-            sub_resource = path_parts[2]
-            if sub_resource == 'following' and method == 'GET':
-                return get_following_handler(event)
-            elif sub_resource == 'followers' and method == 'GET':
-                return get_followers_handler(event)
-            elif sub_resource == 'bookmarks' and method == 'GET':
-                return get_bookmarks_handler(event)
-            elif sub_resource == 'posts' and method == 'GET': # NEW: Route for user's posts
-                return get_user_posts_handler(event)
-            # If it's /users/{userId} without a sub-resource, let it fall through to the general handler if needed
-            # Or explicitly return 404 if only nested paths are allowed here
-            return build_response(404, {'error': f'Sub-resource {sub_resource} not found for user'})
-
-        # Route for user-follows and post-bookmarks directly
-        if base_resource == 'user-follows':
-            if method == 'POST':
-                return create_follow_handler(event)
-            elif method == 'DELETE' and len(path_parts) == 3: # /user-follows/{followerId}/{followedId}
-                return delete_follow_handler(event)
-            return build_response(405, {'error': 'Method not allowed for /user-follows'})
-        
-        if base_resource == 'post-bookmarks':
-            if method == 'POST':
-                return create_bookmark_handler(event)
-            elif method == 'DELETE' and len(path_parts) == 3: # /post-bookmarks/{userId}/{postId}
-                return delete_bookmark_handler(event)
-            return build_response(405, {'error': 'Method not allowed for /post-bookmarks'})
-        
-        # Route for media uploads
-        if base_resource == 'upload-media': # NEW
-            if method == 'POST':
-                return upload_media_handler(event)
-            return build_response(405, {'error': 'Method not allowed for /upload-media'})
-
-        # For other resources, determine the table and route
-        if base_resource not in resource_map:
+        try:
+            return router.dispatch(event)
+        except RouteNotFound:
             return build_response(404, {
                 'error': 'Resource not found',
-                'requested': base_resource,
-                'available': list(resource_map.keys())
+                'requested': event.get('resource') or event.get('path'),
+                'available': router.resources
             })
-
-        table = tables[resource_map[base_resource]]
-
-        # Route to appropriate handler based on method for standard CRUD
-        try:
-            if method == 'GET':
-                if len(path_parts) > 1 and path_parts[1] in {'{postId}', '{commentId}', '{reactionId}', '{shareId}', '{tagId}', '{categoryId}'}:
-                    return get_item_handler(table, event)
-                return scan_table_handler(table, event)
-            elif method == 'POST':
-                return create_item_handler(table, event)
-            elif method == 'PUT':
-                if len(path_parts) < 2:
-                    return build_response(400, {'error': 'Missing ID parameter'})
-                return update_item_handler(table, event)
-            elif method == 'DELETE':
-                if len(path_parts) < 2:
-                    return build_response(400, {'error': 'Missing ID parameter'})
-                return delete_item_handler(table, event)
-            else:
-                return build_response(405, {
-                    'error': 'Method not allowed',
-                    'requested': method,
-                    'allowed': ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
-                })
-        except Exception as e:
-            return build_response(500, {
-                'error': 'Request processing failed',
-                'details': str(e),
-                'resource': base_resource,
-                'method': method
+        except MethodNotAllowed as e:
+            return build_response(405, {
+                'error': 'Method not allowed',
+                'requested': event.get('httpMethod'),
+                'allowed': e.allowed + ['OPTIONS']
             })
-            
+
     except Exception as e:
         # Top-level error handler
+        log.exception("Unexpected server error")
         return build_response(500, {
             'error': 'Unexpected server error',
             'details': str(e),
@@ -0,0 +1,105 @@
+"""Cold-start profile of a Lambda module: import cost and time to first response.
+
+Each run starts a fresh interpreter (like a new container), imports the handler module
+under -X importtime, then invokes lambda_handler once with an event and reports:
+
+    python profile_startup.py post                         # OPTIONS /blog-posts
+    python profile_startup.py lambda --event event.json    # any API Gateway event
+    python profile_startup.py post --runs 5 --budget-ms 400
+
+The JSON report holds the median import and first-response times over the runs and the
+slowest imports by cumulative time. With --budget-ms the exit status is 1 when the
+median time to first response exceeds the budget, so a release check can fail on it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+AUTH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_EVENTS = {
+    'post': {'httpMethod': 'OPTIONS', 'resource': '/blog-posts', 'path': '/blog-posts'},
+    'lambda': {'httpMethod': 'OPTIONS', 'path': '/login', 'requestContext': {'resourcePath': '/login'}},
+}
+
+# Runs in the child interpreter; prints one JSON line with its timings
+_CHILD = """
+import importlib, json, sys, time
+started = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+response = module.lambda_handler(json.loads(sys.argv[2]), None)
+responded = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (responded - started) * 1000,
+    'status': response.get('statusCode')
+}))
+"""
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse -X importtime lines into [{module, depth, self_us, cumulative_us}]."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        imports.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+        })
+    return imports
+
+def profile_once(module: str, event: Dict) -> Dict[str, Any]:
+    env = dict(os.environ, TRACING_ENABLED='false', LOG_LEVEL='ERROR')
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD, module, json.dumps(event)],
+        cwd=AUTH_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(completed.stderr)
+    return result
+
+def profile(module: str, event: Dict, runs: int = 3, top: int = 15) -> Dict[str, Any]:
+    results = [profile_once(module, event) for _ in range(runs)]
+    slowest = sorted(results[-1]['imports'], key=lambda entry: entry['cumulative_us'], reverse=True)
+    return {
+        'module': module,
+        'event': f"{event.get('httpMethod')} {event.get('resource') or event.get('path')}",
+        'runs': runs,
+        'status': results[-1]['status'],
+        'import_ms': round(statistics.median(r['import_ms'] for r in results), 1),
+        'first_response_ms': round(statistics.median(r['first_response_ms'] for r in results), 1),
+        'slowest_imports': [
+            {'module': entry['module'], 'depth': entry['depth'], 'cumulative_ms': round(entry['cumulative_us'] / 1000, 1)}
+            for entry in slowest[:top]
+        ],
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Profile a Lambda module cold start.')
+    parser.add_argument('module', choices=sorted(DEFAULT_EVENTS), help='handler module in auth/')
+    parser.add_argument('--event', help='JSON file with the API Gateway event to invoke')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports to list')
+    parser.add_argument('--budget-ms', type=float, help='fail when median time to first response exceeds this')
+    args = parser.parse_args()
+
+    if args.event:
+        with open(args.event) as f:
+            event = json.load(f)
+    else:
+        event = DEFAULT_EVENTS[args.module]
+    report = profile(args.module, event, args.runs, args.top)
+    if args.budget_ms is not None:
+        report['budget_ms'] = args.budget_ms
+        report['within_budget'] = report['first_response_ms'] <= args.budget_ms
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report.get('within_budget', True) else 1)
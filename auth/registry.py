@@ -0,0 +1,144 @@
+"""Static key schemas for the DynamoDB tables, shared by both Lambdas.
+
+Reading table.key_schema on a boto3 Table makes a DescribeTable call the first time each
+table is touched in a container and only reports the base table's keys. This registry
+describes every table once, in code, so key extraction, query planning and validation
+need no network calls. Keep it in step with apigateway.yaml and the deployed tables.
+"""
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+from boto3.dynamodb.conditions import Key
+
+# Reaction types name a per-type counter on BlogPosts, e.g. 'like' -> 'likeCount'
+REACTION_TYPE_PATTERN = re.compile(r'[A-Za-z][A-Za-z0-9_]{0,31}')
+REACTION_COUNTER_PATTERN = re.compile(REACTION_TYPE_PATTERN.pattern + 'Count')
+
+class IndexSchema(NamedTuple):
+    name: str
+    hash_key: str
+    sort_key: Optional[str] = None
+    projection: str = 'ALL' # ALL, KEYS_ONLY or INCLUDE
+    attributes: Tuple[str, ...] = () # Non-key attributes an INCLUDE index projects
+
+class TableSchema(NamedTuple):
+    name: str
+    hash_key: str
+    sort_key: Optional[str] = None
+    indexes: Tuple[IndexSchema, ...] = ()
+    counters: Tuple[str, ...] = () # Maintained by the server; never written from request bodies
+    counter_pattern: Optional[Pattern] = None # Further counters, named by data (e.g. one per reaction type)
+    required: Tuple[str, ...] = () # Fields a create request must supply
+    version_attribute: Optional[str] = None # Set to a fresh token on every write; backs ETags (see caching.py)
+
+    @property
+    def key_attributes(self) -> List[str]:
+        return [self.hash_key] + ([self.sort_key] if self.sort_key else [])
+
+    def index(self, index_name: str) -> IndexSchema:
+        for index in self.indexes:
+            if index.name == index_name:
+                return index
+        raise KeyError(f"{self.name} has no index {index_name}")
+
+    def index_key_attributes(self, index_name: Optional[str] = None) -> List[str]:
+        """Key attributes of the table, plus those of index_name when reading a GSI.
+
+        These are the attributes a LastEvaluatedKey holds.
+        """
+        names = self.key_attributes
+        if index_name:
+            index = self.index(index_name)
+            names += [name for name in (index.hash_key, index.sort_key) if name and name not in names]
+        return names
+
+    def is_counter(self, attribute: str) -> bool:
+        """Whether attribute is server-maintained, so request bodies may not set it."""
+        return attribute in self.counters or bool(self.counter_pattern and self.counter_pattern.fullmatch(attribute))
+
+    def projected_attributes(self, index_name: str) -> Optional[List[str]]:
+        """Attributes a read of index_name returns, or None when it projects every attribute."""
+        index = self.index(index_name)
+        if index.projection == 'ALL':
+            return None
+        names = self.index_key_attributes(index_name)
+        if index.projection == 'INCLUDE':
+            names += [name for name in index.attributes if name not in names]
+        return names
+
+    def index_covers(self, index_name: str, attributes: List[str]) -> bool:
+        """Whether index_name alone answers a read of attributes, without a base-table fetch."""
+        projected = self.projected_attributes(index_name)
+        return projected is None or set(attributes) <= set(projected)
+
+    def index_for(self, attribute: str) -> Optional[IndexSchema]:
+        """The first GSI partitioned on attribute, if any."""
+        for index in self.indexes:
+            if index.hash_key == attribute:
+                return index
+        return None
+
+    def key_from(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Primary key taken from values (an item, body or path parameters); ValueError if incomplete."""
+        missing = [name for name in self.key_attributes if not values.get(name)]
+        if missing:
+            raise ValueError(f"Missing key attributes for {self.name}: {', '.join(missing)}")
+        return {name: values[name] for name in self.key_attributes}
+
+    def query_params(self, attribute: str, value: Any) -> Dict[str, Any]:
+        """Query parameters for items whose attribute equals value, on the base table or a GSI."""
+        if attribute == self.hash_key:
+            return {'KeyConditionExpression': Key(attribute).eq(value)}
+        index = self.index_for(attribute)
+        if index is None:
+            raise ValueError(f"{self.name} cannot be queried by {attribute}")
+        return {'IndexName': index.name, 'KeyConditionExpression': Key(attribute).eq(value)}
+
+_SCHEMAS = [
+    TableSchema('Users', 'userId', indexes=(
+        IndexSchema('EmailIndex', 'email'),
+        IndexSchema('UsernameIndex', 'username'),
+    ), required=('username', 'email')),
+    TableSchema('UserProfiles', 'userId', counters=('followers', 'following', 'postsCount', 'totalLikesReceived'),
+                version_attribute='version'),
+    TableSchema('BlogPosts', 'postId', indexes=(
+        IndexSchema('AuthorIndex', 'authorId', 'createdAt'),
+        IndexSchema('StatusIndex', 'status'),
+        IndexSchema('TrendingIndex', 'trendingBucket', 'trendingScore'),
+    ), counters=('commentCount', 'reactionCount', 'shareCount', 'likeCount', 'trendingBucket', 'trendingScore'),
+        counter_pattern=REACTION_COUNTER_PATTERN, required=('title', 'content', 'authorId')),
+    TableSchema('Categories', 'categoryId', required=('name', 'slug')),
+    TableSchema('PostCategories', 'postId', 'categoryId', indexes=(
+        IndexSchema('CategoryPostsIndex', 'categoryId', 'createdAt', 'KEYS_ONLY'),
+    ), required=('postId', 'categoryId')),
+    TableSchema('PostComments', 'commentId', indexes=(
+        IndexSchema('PostCommentsIndex', 'postId'),
+        IndexSchema('PostCommentsByDateIndex', 'postId', 'createdAt'),
+        IndexSchema('CommentRepliesIndex', 'parentCommentId', 'createdAt'), # Sparse: replies only
+    ), counters=('replyCount',), required=('postId', 'userId', 'content')),
+    TableSchema('PostReactions', 'reactionId', indexes=(
+        IndexSchema('PostReactionIndex', 'postId'),
+    ), required=('postId', 'userId', 'reactionType')),
+    TableSchema('PostShares', 'shareId', indexes=(
+        IndexSchema('PostSharesIndex', 'postId'),
+    ), required=('postId', 'userId', 'shareType')),
+    TableSchema('Tags', 'tagId', required=('name', 'slug')),
+    TableSchema('PostTags', 'postId', 'tagId', indexes=(
+        IndexSchema('TagPostsIndex', 'tagId', 'createdAt', 'KEYS_ONLY'),
+    ), required=('postId', 'tagId')),
+    TableSchema('UserFollows', 'followerId', 'followedId', indexes=(
+        IndexSchema('FollowerUsersIndex', 'followerId'),
+        IndexSchema('FollowedUsersIndex', 'followedId'),
+    )),
+    TableSchema('PostBookmarks', 'userId', 'postId'),
+]
+
+TABLE_SCHEMAS: Dict[str, TableSchema] = {schema.name: schema for schema in _SCHEMAS}
+
+def schema_for(table: Any) -> TableSchema:
+    """Schema of a table object or table name."""
+    name = table if isinstance(table, str) else table.name
+    try:
+        return TABLE_SCHEMAS[name]
+    except KeyError:
+        raise ValueError(f"No key schema registered for table {name}")
@@ -0,0 +1,152 @@
+"""Route table shared by both Lambdas, compiled once at import time.
+
+Routes are registered against API Gateway resource templates such as
+'/blog-posts/{postId}'. API Gateway passes that template in every proxy event, so dispatch
+is normally a single dict lookup; when it is missing (local invocations, {proxy+}
+integrations) the concrete path is matched against a segment trie instead, preferring
+literal segments over parameters.
+
+Handlers are called as handler(event, params), where params are the typed path
+parameters ('{page:int}' converts to int; plain '{name}' stays a string). Middleware are
+called as middleware(event, params, call_next); they can add entries to params for the
+handler, or short-circuit by returning a response without calling call_next. Each route's chain (router-wide middleware first, then
+the route's own) is composed when the route is added, not per request.
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+Handler = Callable[[Dict, Dict[str, Any]], Dict]
+Middleware = Callable[[Dict, Dict[str, Any], Handler], Dict]
+
+CONVERTERS: Dict[str, Callable[[str], Any]] = {'str': str, 'int': int}
+
+class RouteNotFound(LookupError):
+    """No route matches the path."""
+
+class MethodNotAllowed(LookupError):
+    """The path matches, but not for this method."""
+
+    def __init__(self, allowed: List[str]):
+        super().__init__(f"Method not allowed; allowed: {', '.join(allowed)}")
+        self.allowed = allowed
+
+class Route(NamedTuple):
+    method: str
+    template: str
+    params: Tuple[Tuple[str, Callable[[str], Any]], ...] # (name, converter) in path order
+    call: Handler # Handler wrapped in its middleware chain
+
+class RouteMatch(NamedTuple):
+    route: Route
+    params: Dict[str, Any]
+
+class _Node:
+    __slots__ = ('literals', 'param', 'routes')
+
+    def __init__(self) -> None:
+        self.literals: Dict[str, '_Node'] = {}
+        self.param: Optional['_Node'] = None
+        self.routes: Dict[str, Route] = {}
+
+def _segments(path: str) -> List[str]:
+    return [segment for segment in path.strip().split('/') if segment]
+
+def _parse_param(segment: str) -> Optional[Tuple[str, Callable[[str], Any]]]:
+    if not (segment.startswith('{') and segment.endswith('}')):
+        return None
+    name, _, kind = segment[1:-1].partition(':')
+    return name, CONVERTERS[kind or 'str']
+
+def _chain(handler: Handler, middleware: Sequence[Middleware]) -> Handler:
+    call = handler
+    for layer in reversed(middleware):
+        call = (lambda layer, call_next: lambda event, params: layer(event, params, call_next))(layer, call)
+    return call
+
+class Router:
+    def __init__(self, middleware: Sequence[Middleware] = ()):
+        self.middleware = list(middleware)
+        self._root = _Node()
+        self._by_template: Dict[str, Dict[str, Route]] = {}
+
+    def add(self, method: str, template: str, handler: Handler, middleware: Sequence[Middleware] = ()) -> None:
+        node = self._root
+        params = []
+        plain = [] # API Gateway sends templates without the converter suffix
+        for segment in _segments(template):
+            param = _parse_param(segment)
+            if param:
+                params.append(param)
+                plain.append('{' + param[0] + '}')
+                node.param = node.param or _Node()
+                node = node.param
+            else:
+                plain.append(segment)
+                node = node.literals.setdefault(segment, _Node())
+        method = method.upper()
+        route = Route(method, template, tuple(params), _chain(handler, self.middleware + list(middleware)))
+        node.routes[method] = route
+        self._by_template.setdefault('/' + '/'.join(plain), {})[method] = route
+
+    @property
+    def resources(self) -> List[str]:
+        """Top-level path segments with at least one route beneath them."""
+        return sorted(self._root.literals)
+
+    def route(self, method: str, template: str, middleware: Sequence[Middleware] = ()) -> Callable[[Handler], Handler]:
+        """Decorator form of add()."""
+        def register(handler: Handler) -> Handler:
+            self.add(method, template, handler, middleware)
+            return handler
+        return register
+
+    def _walk(self, node: _Node, segments: List[str], values: List[str], method: Optional[str]) -> Optional[_Node]:
+        """Depth-first match, literals before parameters; method=None accepts any routed node."""
+        if not segments:
+            return node if (method in node.routes if method else node.routes) else None
+        head, rest = segments[0], segments[1:]
+        literal = node.literals.get(head)
+        if literal:
+            found = self._walk(literal, rest, values, method)
+            if found:
+                return found
+        if node.param:
+            values.append(head)
+            found = self._walk(node.param, rest, values, method)
+            if found:
+                return found
+            values.pop()
+        return None
+
+    def resolve(self, method: str, path: str, template: Optional[str] = None,
+                path_parameters: Optional[Dict[str, str]] = None) -> RouteMatch:
+        """Find the route for a request; raises RouteNotFound or MethodNotAllowed.
+
+        template is the event's resource template, which skips the trie when known.
+        """
+        method = method.upper()
+        values: List[str] = []
+        routes = self._by_template.get(template) if template else None
+        if routes is None:
+            segments = _segments(path)
+            # /profile/upload-url is POST-only, so GET /profile/upload-url belongs to /profile/{userId}
+            node = self._walk(self._root, segments, values, method) or self._walk(self._root, segments, values, None)
+            if node is None:
+                raise RouteNotFound(path)
+            routes = node.routes
+        route = routes.get(method)
+        if route is None:
+            raise MethodNotAllowed(sorted(routes))
+        raw = dict(zip((name for name, _ in route.params), values)) if values else dict(path_parameters or {})
+        try:
+            params = {name: converter(raw[name]) for name, converter in route.params if name in raw}
+        except ValueError:
+            raise RouteNotFound(path)
+        return RouteMatch(route, params)
+
+    def dispatch(self, event: Dict) -> Dict:
+        """Resolve and call the route for an API Gateway proxy event."""
+        template = (event.get('requestContext') or {}).get('resourcePath') or event.get('resource')
+        match = self.resolve(event.get('httpMethod', ''), event.get('path') or template or '', template, event.get('pathParameters'))
+        if match.params and not event.get('pathParameters'):
+            event['pathParameters'] = {name: str(value) for name, value in match.params.items()}
+        return match.route.call(event, match.params)
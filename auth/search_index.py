@@ -0,0 +1,372 @@
+"""Full-text search over BlogPosts: an inverted index ranked with BM25, kept in S3.
+
+The index lives under SEARCH_INDEX_PREFIX in the media bucket as two kinds of object:
+
+    base.json.gz            the whole index (see InvertedIndex.to_bytes), written by
+                            build_search_index.py; records the last delta it includes
+    deltas/<ns>-<id>.json   one per post write since: the post's terms, or a deletion
+
+Writers only put a delta, so a post write costs one small S3 put and never rewrites the
+index. A warm container loads the base on its first search and then lists and applies
+new deltas at most every SEARCH_REFRESH_SECONDS; it re-fetches the base (conditionally,
+by ETag) every SEARCH_RELOAD_SECONDS to pick up compactions. Delta keys are named from
+the writer's clock before the put lands, so each listing reaches back
+SEARCH_DELTA_OVERLAP_SECONDS behind the last key applied. Configured by:
+
+    SEARCH_INDEX_PREFIX             default "search-index/"
+    SEARCH_REFRESH_SECONDS          default 30
+    SEARCH_RELOAD_SECONDS           default 900
+    SEARCH_DELTA_OVERLAP_SECONDS    default 10; longer than any S3 put takes
+"""
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from logger import get_logger
+from serializer import dumps
+
+log = get_logger('search')
+
+SEARCH_INDEX_PREFIX = os.environ.get('SEARCH_INDEX_PREFIX', 'search-index/')
+SEARCH_REFRESH_SECONDS = float(os.environ.get('SEARCH_REFRESH_SECONDS', '30'))
+SEARCH_RELOAD_SECONDS = float(os.environ.get('SEARCH_RELOAD_SECONDS', '900'))
+SEARCH_DELTA_OVERLAP_SECONDS = float(os.environ.get('SEARCH_DELTA_OVERLAP_SECONDS', '10'))
+FORMAT_VERSION = 1
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Post attributes that are indexed, and how many times a token in each counts
+FIELD_WEIGHTS = {'title': 3, 'tags': 2, 'content': 1}
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+MARKUP_PATTERN = re.compile(r'<[^>]*>')
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have in into is it its of on or that the '
+    'their this to was were will with'.split()
+)
+
+# =================== TEXT ===================
+
+def stem(word: str) -> str:
+    """Light English suffix stripping: plurals, then -ing/-ed/-ly.
+
+    Not a full Porter stemmer; it only has to map the same word forms to the same term at
+    index and query time.
+    """
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('ies') and len(word) > 4:
+        word = word[:-3] + 'y'
+    elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    for suffix in ('ing', 'ed', 'ly'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            if suffix != 'ly' and word[-1] == word[-2] and word[-1] not in 'lsz':
+                word = word[:-1] # running -> runn -> run
+            break
+    return word
+
+def tokenize(text: str) -> List[str]:
+    """Search terms in text: accent-folded, lowercased, stopwords dropped, stemmed."""
+    text = unicodedata.normalize('NFKD', MARKUP_PATTERN.sub(' ', text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return [stem(token) for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+def is_searchable(post: Dict) -> bool:
+    return post.get('status') != 'draft'
+
+def document_terms(post: Dict) -> Counter:
+    """Weighted term frequencies of a post's indexed fields."""
+    terms: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = post.get(field)
+        if isinstance(value, (list, set, tuple)):
+            value = ' '.join(str(v) for v in value)
+        if isinstance(value, str):
+            for term in tokenize(value):
+                terms[term] += weight
+    return terms
+
+# =================== INDEX ===================
+
+class InvertedIndex:
+    """term -> {postId: weighted term frequency}, with the document lengths BM25 needs."""
+
+    def __init__(self, watermark: str = ''):
+        self.watermark = watermark # Key of the last delta applied
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+        self._terms: Dict[str, Tuple[str, ...]] = {} # postId -> its terms, for removal
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, post_id: str, terms: Dict[str, int]) -> None:
+        """Index a post, replacing any earlier version of it."""
+        self.remove(post_id)
+        if not terms:
+            return
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[post_id] = frequency
+        length = sum(terms.values())
+        self.lengths[post_id] = length
+        self.total_length += length
+        self._terms[post_id] = tuple(terms)
+
+    def remove(self, post_id: str) -> None:
+        for term in self._terms.pop(post_id, ()):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(post_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(post_id, 0)
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """The top limit (postId, BM25 score) pairs for query, best first."""
+        count = len(self.lengths)
+        if not count:
+            return []
+        average_length = self.total_length / count
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for post_id, frequency in posting.items():
+                norm = K1 * (1 - B + B * self.lengths[post_id] / average_length)
+                scores[post_id] = scores.get(post_id, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda entry: (entry[1], entry[0]))
+
+    def to_bytes(self) -> bytes:
+        """Gzipped JSON: document IDs once, postings as [doc delta, frequency, ...] by doc number."""
+        doc_ids = sorted(self.lengths)
+        numbers = {post_id: i for i, post_id in enumerate(doc_ids)}
+        terms = {}
+        for term, posting in self.postings.items():
+            flat: List[int] = []
+            previous = 0
+            for number, frequency in sorted((numbers[post_id], frequency) for post_id, frequency in posting.items()):
+                flat += [number - previous, frequency]
+                previous = number
+            terms[term] = flat
+        artifact = {
+            'version': FORMAT_VERSION, 'watermark': self.watermark,
+            'docs': doc_ids, 'lengths': [self.lengths[post_id] for post_id in doc_ids], 'terms': terms,
+        }
+        return gzip.compress(dumps(artifact).encode('utf-8'), mtime=0)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'InvertedIndex':
+        artifact = json.loads(gzip.decompress(data))
+        if artifact.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported search index version: {artifact.get('version')}")
+        index = cls(artifact.get('watermark', ''))
+        doc_ids = artifact['docs']
+        forward: Dict[str, List[str]] = {post_id: [] for post_id in doc_ids}
+        for term, flat in artifact['terms'].items():
+            posting = {}
+            number = 0
+            for i in range(0, len(flat), 2):
+                number += flat[i]
+                posting[doc_ids[number]] = flat[i + 1]
+                forward[doc_ids[number]].append(term)
+            index.postings[term] = posting
+        index.lengths = dict(zip(doc_ids, artifact['lengths']))
+        index.total_length = sum(index.lengths.values())
+        index._terms = {post_id: tuple(terms) for post_id, terms in forward.items()}
+        return index
+
+    def apply(self, delta: Dict) -> None:
+        """Apply one delta object's content (see SearchIndex.record)."""
+        if delta.get('deleted'):
+            self.remove(delta['postId'])
+        else:
+            self.add(delta['postId'], delta.get('terms') or {})
+
+# =================== S3 STORAGE ===================
+
+class SearchIndex:
+    """The S3-backed index as seen from one container: lazily loaded, refreshed from deltas.
+
+    s3 is a callable returning the client, so nothing touches S3 until the first search or write.
+    """
+
+    def __init__(self, s3: Callable[[], Any], bucket: str, prefix: str = SEARCH_INDEX_PREFIX):
+        self._s3 = s3
+        self.bucket = bucket
+        self.base_key = f"{prefix}base.json.gz"
+        self.delta_prefix = f"{prefix}deltas/"
+        self._lock = threading.Lock()
+        self._index: Optional[InvertedIndex] = None
+        self._base_etag: Optional[str] = None
+        self._last_delta = ''
+        self._applied: Dict[str, None] = {} # Delta keys applied within the overlap window
+        self._latest: Dict[str, str] = {} # postId -> newest delta key applied for it, within the window
+        self._refreshed_at = 0.0
+        self._loaded_at = 0.0
+
+    # ---- writes ----
+
+    def _delta_ns(self, key: str) -> int:
+        """The writer's timestamp a delta key was named with."""
+        return int(key[len(self.delta_prefix):].split('-')[0])
+
+    def _overlap_start(self, key: str) -> str:
+        """A listing position SEARCH_DELTA_OVERLAP_SECONDS before key ('' for the start)."""
+        if not key:
+            return ''
+        return f"{self.delta_prefix}{max(0, self._delta_ns(key) - int(SEARCH_DELTA_OVERLAP_SECONDS * 1e9)):020d}"
+
+    def _put_delta(self, delta: Dict) -> None:
+        key = f"{self.delta_prefix}{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.json"
+        self._s3().put_object(Bucket=self.bucket, Key=key, Body=dumps(delta).encode('utf-8'),
+                              ContentType='application/json')
+
+    def record(self, post: Dict) -> None:
+        """Publish a created or updated post's terms (drafts are published as removals)."""
+        if not is_searchable(post):
+            self.record_delete(post['postId'])
+            return
+        self._put_delta({'postId': post['postId'], 'terms': document_terms(post)})
+
+    def record_delete(self, post_id: str) -> None:
+        self._put_delta({'postId': post_id, 'deleted': True})
+
+    # ---- reads ----
+
+    def list_deltas(self, after: str = '') -> List[str]:
+        """Delta keys after the given key, oldest first."""
+        keys: List[str] = []
+        params: Dict[str, Any] = {'Bucket': self.bucket, 'Prefix': self.delta_prefix}
+        if after:
+            params['StartAfter'] = after
+        while True:
+            response = self._s3().list_objects_v2(**params)
+            keys += [entry['Key'] for entry in response.get('Contents', [])]
+            if not response.get('IsTruncated'):
+                return keys
+            params['ContinuationToken'] = response['NextContinuationToken']
+
+    def read_delta(self, key: str) -> Optional[Dict]:
+        try:
+            return json.loads(self._s3().get_object(Bucket=self.bucket, Key=key)['Body'].read())
+        except ClientError as e:
+            if e.response['Error'].get('Code') in ('NoSuchKey', '404'):
+                return None # Compacted away since it was listed
+            raise
+
+    def _fetch_base(self) -> Optional[InvertedIndex]:
+        """The stored base index; None if unchanged since the last fetch."""
+        params: Dict[str, Any] = {'Bucket': self.bucket, 'Key': self.base_key}
+        if self._base_etag:
+            params['IfNoneMatch'] = self._base_etag
+        try:
+            response = self._s3().get_object(**params)
+        except ClientError as e:
+            code = e.response['Error'].get('Code')
+            if code in ('304', 'NotModified'):
+                return None
+            if code in ('NoSuchKey', '404'):
+                self._base_etag = None
+                return InvertedIndex() # Nothing built yet: every post is in the deltas
+            raise
+        self._base_etag = response.get('ETag')
+        return InvertedIndex.from_bytes(response['Body'].read())
+
+    def _apply_new_deltas(self, index: InvertedIndex, watermark: str) -> str:
+        """Apply the deltas not applied yet; returns the new watermark (newest key seen).
+
+        A writer that named its key first can land its put after a later writer's, behind a
+        watermark a reader has already moved past. So the listing starts an overlap window
+        before the watermark and skips keys already applied; a late delta is dropped if a
+        newer one for the same post has been applied since.
+        """
+        for key in self.list_deltas(self._overlap_start(watermark)):
+            if key in self._applied:
+                continue
+            delta = self.read_delta(key)
+            if delta is not None and self._latest.get(delta['postId'], '') < key:
+                index.apply(delta)
+                self._latest[delta['postId']] = key
+            self._applied[key] = None
+            watermark = max(watermark, key)
+        horizon = self._overlap_start(watermark)
+        self._applied = {key: None for key in self._applied if key > horizon}
+        self._latest = {post_id: key for post_id, key in self._latest.items() if key > horizon}
+        return watermark
+
+    def index(self) -> InvertedIndex:
+        """The in-memory index, loading or refreshing it first when due."""
+        now = time.monotonic()
+        with self._lock:
+            if self._index is None or now - self._loaded_at >= SEARCH_RELOAD_SECONDS:
+                base = self._fetch_base()
+                if base is not None:
+                    self._index = base
+                    self._last_delta = base.watermark
+                    self._applied = {}
+                    self._latest = {}
+                self._loaded_at = now
+                self._refreshed_at = 0.0
+            if now - self._refreshed_at >= SEARCH_REFRESH_SECONDS:
+                self._last_delta = self._apply_new_deltas(self._index, self._last_delta)
+                self._refreshed_at = now
+            return self._index
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        return self.index().search(query, limit)
+
+    def clear(self) -> None:
+        """Forget the loaded index; the next search loads it again."""
+        with self._lock:
+            self._index = None
+            self._base_etag = None
+            self._last_delta = ''
+            self._applied = {}
+            self._latest = {}
+
+    # ---- compaction ----
+
+    def compact(self, posts: Iterable[Dict], keep_seconds: float) -> Tuple[InvertedIndex, int]:
+        """Write a new base from every post and drop the deltas it covers.
+
+        Deltas listed before the read started are marked as included; any written while
+        the posts were being read are re-applied on top by readers, which is harmless
+        since applying a delta is idempotent. Deltas younger than keep_seconds stay, so a
+        container that listed deltas just before the new base appeared doesn't miss any.
+        Returns the new index and the number of deltas deleted.
+        """
+        covered = self.list_deltas()
+        index = InvertedIndex(covered[-1] if covered else '')
+        for post in posts:
+            if is_searchable(post):
+                index.add(post['postId'], document_terms(post))
+        self._s3().put_object(Bucket=self.bucket, Key=self.base_key, Body=index.to_bytes(),
+                              ContentType='application/gzip')
+
+        cutoff = time.time_ns() - int(keep_seconds * 1e9)
+        expired = [key for key in covered if self._delta_ns(key) < cutoff]
+        for start in range(0, len(expired), 1000): # delete_objects takes up to 1000 keys
+            self._s3().delete_objects(Bucket=self.bucket, Delete={
+                'Objects': [{'Key': key} for key in expired[start:start + 1000]], 'Quiet': True
+            })
+        return index, len(expired)
@@ -0,0 +1,56 @@
+"""JSON encoding shared by both Lambdas.
+
+DynamoDB hands back numbers as Decimal and string/number sets as set; both are encoded
+here (Decimal as int when integral, else float; sets as sorted lists) so handlers can
+return items as read. Output is compact and UTF-8 (no \\u escapes) whichever backend runs:
+
+    JSON_BACKEND    auto (default: orjson when installed, else json), orjson or json
+
+orjson calls the Decimal hook from C and is several times faster on large listings; it is
+optional, and anything it refuses (integers beyond 64 bits) falls back to the json module.
+"""
+import json
+import os
+from decimal import Decimal
+from typing import Any, Iterable, Iterator
+
+try:
+    import orjson
+except ImportError: # Optional accelerator; the stdlib encoder is always available
+    orjson = None
+
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto').lower()
+USE_ORJSON = orjson is not None and JSON_BACKEND in ('auto', 'orjson')
+
+def encode_default(value: Any) -> Any:
+    """Fallback for types the JSON backends don't know; only called for those values."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# One encoder for the process: json.dumps(default=...) would build a new one per call
+_encoder = json.JSONEncoder(default=encode_default, separators=(',', ':'), ensure_ascii=False)
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+def _orjson_dumps(value: Any) -> str:
+    return orjson.dumps(value, default=encode_default, option=_ORJSON_OPTIONS).decode('utf-8')
+
+def dumps(value: Any) -> str:
+    """Encode value as a compact JSON string."""
+    if USE_ORJSON:
+        try:
+            return _orjson_dumps(value)
+        except orjson.JSONEncodeError:
+            pass # e.g. an integer too large for orjson; json handles it
+    return _encoder.encode(value)
+
+def iter_json_lines(items: Iterable[Any]) -> Iterator[str]:
+    """Encode items lazily, one JSON document per line.
+
+    For exports of whole tables: each item is encoded as it arrives, so neither the items
+    nor the output are ever held in memory at once.
+    """
+    for item in items:
+        yield dumps(item) + '\n'
@@ -0,0 +1,216 @@
+"""Per-request tracing of DynamoDB and S3 calls.
+
+Wrap tables and clients with traced() and handlers with trace_request(). While a request
+is running, every wrapped call records its latency, items returned and SDK retries; when
+the handler returns, one CloudWatch Embedded Metric Format line is written with the route,
+status, a total/backend/serialization time split and the response size before and after
+compression. Configured by:
+
+    TRACING_ENABLED     "false" turns the summary line off (calls are still counted)
+    TRACING_NAMESPACE   CloudWatch metrics namespace (default BlogSphere)
+
+The trace of the request being served lives in a context variable, so requests running
+concurrently in one process (benchmarks/workload.py replays) each count their own calls.
+Fan-out work must run in the request's context: submit it to a TracedExecutor, or start
+threads with contextvars.copy_context().run.
+
+The most recent finished trace is kept in last_trace, so tests can assert on call counts:
+
+    post.lambda_handler(event, None)
+    assert tracing.last_trace.call_count <= 3
+"""
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'true').lower() != 'false'
+TRACING_NAMESPACE = os.environ.get('TRACING_NAMESPACE', 'BlogSphere')
+
+# Client methods that hit the network; anything else on a wrapped object passes straight through
+TRACED_OPERATIONS = frozenset({
+    'get_item', 'put_item', 'update_item', 'delete_item', 'query', 'scan',
+    'batch_get_item', 'batch_write_item', 'transact_get_items', 'transact_write_items',
+    'get_object', 'put_object', 'delete_object', 'head_object', 'generate_presigned_url',
+})
+
+class RequestTrace:
+    """Backend calls made while serving one request."""
+
+    def __init__(self, service: str, route: str):
+        self.service = service
+        self.route = route
+        self.status: Optional[int] = None
+        self.started = time.perf_counter()
+        self.total_seconds = 0.0
+        self.backend_seconds = 0.0 # Wall time with at least one call in flight
+        self.serialization_seconds = 0.0
+        self.response_bytes: Optional[int] = None # Body size before compression
+        self.sent_bytes: Optional[int] = None # Body size on the wire (before base64)
+        self.call_count = 0
+        self.calls: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._busy_since = 0.0
+
+    def call_started(self) -> None:
+        with self._lock:
+            if self._in_flight == 0:
+                self._busy_since = time.perf_counter()
+            self._in_flight += 1
+
+    def call_finished(self, operation: str, seconds: float, items: int, retries: int) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self.backend_seconds += time.perf_counter() - self._busy_since
+            self.call_count += 1
+            stats = self.calls.setdefault(operation, {'count': 0, 'ms': 0.0, 'maxMs': 0.0, 'items': 0, 'retries': 0})
+            stats['count'] += 1
+            stats['ms'] += seconds * 1000
+            stats['maxMs'] = max(stats['maxMs'], seconds * 1000)
+            stats['items'] += items
+            stats['retries'] += retries
+
+    def finish(self, status: Optional[int]) -> None:
+        self.status = status
+        self.total_seconds = time.perf_counter() - self.started
+
+    def summary(self) -> Dict[str, Any]:
+        """The trace as an EMF record."""
+        metrics = ['TotalTime', 'BackendTime', 'SerializationTime']
+        sizes = {}
+        if self.response_bytes is not None:
+            sizes = {'ResponseBytes': self.response_bytes, 'CompressedBytes': self.sent_bytes}
+        return {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': TRACING_NAMESPACE,
+                    'Dimensions': [['Service', 'Route']],
+                    'Metrics': [{'Name': name, 'Unit': 'Milliseconds'} for name in metrics]
+                    + [{'Name': 'BackendCalls', 'Unit': 'Count'}]
+                    + [{'Name': name, 'Unit': 'Bytes'} for name in sizes]
+                }]
+            },
+            'Service': self.service,
+            'Route': self.route,
+            'Status': self.status,
+            'TotalTime': round(self.total_seconds * 1000, 3),
+            'BackendTime': round(self.backend_seconds * 1000, 3),
+            'SerializationTime': round(self.serialization_seconds * 1000, 3),
+            'BackendCalls': self.call_count,
+            **sizes,
+            'calls': {
+                operation: dict(stats, ms=round(stats['ms'], 3), maxMs=round(stats['maxMs'], 3))
+                for operation, stats in sorted(self.calls.items())
+            }
+        }
+
+# The trace of the request running in this context; worker threads see it through a copied context
+_active: 'contextvars.ContextVar[Optional[RequestTrace]]' = contextvars.ContextVar('request_trace', default=None)
+last_trace: Optional[RequestTrace] = None # With concurrent requests, whichever finished last
+
+class TracedExecutor(ThreadPoolExecutor):
+    """Thread pool whose tasks run in a copy of the submitter's context, so their calls count towards its trace."""
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def _items_returned(response: Any) -> int:
+    if not isinstance(response, dict):
+        return 0
+    if 'Items' in response:
+        return len(response['Items'])
+    if 'Responses' in response:
+        responses = response['Responses']
+        if isinstance(responses, dict): # BatchGetItem
+            return sum(len(items) for items in responses.values())
+        return sum(1 for entry in responses if entry.get('Item')) # TransactGetItems
+    if 'Count' in response:
+        return response['Count']
+    return 1 if response.get('Item') else 0
+
+def _retries(response: Any) -> int:
+    if not isinstance(response, dict):
+        return 0
+    return (response.get('ResponseMetadata') or {}).get('RetryAttempts', 0)
+
+class TracedClient:
+    """Proxy that times the network calls of a boto3 table, resource or client."""
+
+    def __init__(self, target: Any, label: str):
+        self._target = target
+        self._label = label
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if name not in TRACED_OPERATIONS:
+            return attribute
+        operation = f"{self._label}.{name}"
+
+        @functools.wraps(attribute)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            trace = _active.get()
+            if trace is None:
+                return attribute(*args, **kwargs)
+            trace.call_started()
+            started = time.perf_counter()
+            response = None
+            try:
+                response = attribute(*args, **kwargs)
+                return response
+            finally:
+                trace.call_finished(operation, time.perf_counter() - started, _items_returned(response), _retries(response))
+        return call
+
+def traced(target: Any, label: Optional[str] = None) -> TracedClient:
+    """Wrap a table or client; label defaults to the table name."""
+    return TracedClient(target, label or getattr(target, 'name', type(target).__name__))
+
+@contextmanager
+def serialization() -> Iterator[None]:
+    """Count the enclosed block as response serialization time."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace = _active.get()
+        if trace is not None:
+            trace.serialization_seconds += time.perf_counter() - started
+
+def record_response_bytes(uncompressed: int, sent: int) -> None:
+    """Record the response body size before and after compression."""
+    trace = _active.get()
+    if trace is not None:
+        trace.response_bytes = uncompressed
+        trace.sent_bytes = sent
+
+def trace_request(service: str) -> Callable:
+    """Decorate a Lambda handler so each invocation is traced and summarized."""
+    def decorator(handler: Callable) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event: Dict, context: Any) -> Any:
+            global last_trace
+            route = f"{event.get('httpMethod', '')} {(event.get('requestContext') or {}).get('resourcePath') or event.get('resource') or event.get('path', '')}"
+            trace = RequestTrace(service, route)
+            token = _active.set(trace)
+            response = None
+            try:
+                response = handler(event, context)
+                return response
+            finally:
+                _active.reset(token)
+                trace.finish(response.get('statusCode') if isinstance(response, dict) else None)
+                last_trace = trace
+                if TRACING_ENABLED:
+                    sys.stdout.write(json.dumps(trace.summary(), separators=(',', ':')) + '\n')
+                    sys.stdout.flush()
+        return wrapper
+    return decorator
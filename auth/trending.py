@@ -0,0 +1,135 @@
+"""Time-decayed trending scores for BlogPosts, updated in place on every engagement write.
+
+A post's score is the sum of its engagement weights, each decayed by half every
+TRENDING_HALF_LIFE_HOURS. Decaying every stored score as time passes would mean rewriting
+every post, so scores are kept relative to the start of an epoch instead: an event at time
+t adds weight * 2 ** ((t - epoch_start) / half_life), which grows for later events rather
+than shrinking earlier ones. Within one epoch, scores compare correctly and an event is a
+single atomic ADD. A post's first event in a new epoch rescales its old score to the new
+epoch start (conditional on the old value, so concurrent writers don't lose events).
+
+Posts carry trendingBucket (the epoch number) and trendingScore, the key of TrendingIndex,
+so the top posts of an epoch are one query. Configured by:
+
+    TRENDING_HALF_LIFE_HOURS    default 24
+    TRENDING_EPOCH_HOURS        default 168; scores grow to 2 ** (epoch / half-life) within one
+"""
+import os
+import time
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from botocore.exceptions import ClientError
+
+from logger import get_logger
+
+log = get_logger('trending')
+
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '24'))
+TRENDING_EPOCH_HOURS = float(os.environ.get('TRENDING_EPOCH_HOURS', '168'))
+HALF_LIFE_SECONDS = TRENDING_HALF_LIFE_HOURS * 3600
+EPOCH_SECONDS = TRENDING_EPOCH_HOURS * 3600
+
+TRENDING_INDEX = 'TrendingIndex'
+BUCKET_ATTRIBUTE = 'trendingBucket'
+SCORE_ATTRIBUTE = 'trendingScore'
+MAX_ATTEMPTS = 3
+
+# Bookkeeping only: kept out of API responses, so views and engagement don't change a post's body or ETag
+TRENDING_ATTRIBUTES = (BUCKET_ATTRIBUTE, SCORE_ATTRIBUTE)
+
+# Engagement weight per write, by the table written (views have no table)
+WEIGHTS = {
+    'BlogPosts': 1.0, # Publishing, so new posts enter the index
+    'PostReactions': 2.0,
+    'PostComments': 3.0,
+    'PostShares': 5.0,
+    'view': 0.2,
+}
+
+def without_trending(item: Dict[str, Any]) -> Dict[str, Any]:
+    """item with the trending attributes removed (in place), ready to be returned."""
+    for attribute in TRENDING_ATTRIBUTES:
+        item.pop(attribute, None)
+    return item
+
+def epoch_of(timestamp: float) -> int:
+    return int(timestamp // EPOCH_SECONDS)
+
+def bucket_of(epoch: int) -> str:
+    return str(epoch)
+
+def _number(value: float) -> Decimal:
+    return Decimal(repr(round(value, 6)))
+
+def contribution(weight: float, timestamp: float) -> Decimal:
+    """Score an event adds, relative to the start of its epoch."""
+    offset = timestamp - epoch_of(timestamp) * EPOCH_SECONDS
+    return _number(weight * 2 ** (offset / HALF_LIFE_SECONDS))
+
+def rescale(score: Any, from_epoch: int, to_epoch: int) -> float:
+    """A score relative to from_epoch's start, expressed relative to to_epoch's start."""
+    exponent = -(to_epoch - from_epoch) * EPOCH_SECONDS / HALF_LIFE_SECONDS
+    return float(score) * 2 ** exponent if exponent > -1000 else 0.0
+
+def initial_trending(timestamp: Optional[float] = None) -> Dict[str, Any]:
+    """Trending attributes for a post being created, so it needs no second write."""
+    timestamp = time.time() if timestamp is None else timestamp
+    return {
+        BUCKET_ATTRIBUTE: bucket_of(epoch_of(timestamp)),
+        SCORE_ATTRIBUTE: contribution(WEIGHTS['BlogPosts'], timestamp),
+    }
+
+def record_engagement(posts_table: Any, post_id: str, weight: float, timestamp: Optional[float] = None) -> None:
+    """Add an engagement event to a post's score; a missing post is ignored."""
+    timestamp = time.time() if timestamp is None else timestamp
+    epoch = epoch_of(timestamp)
+    increment = contribution(weight, timestamp)
+    names = {'#bucket': BUCKET_ATTRIBUTE, '#score': SCORE_ATTRIBUTE}
+    for _ in range(MAX_ATTEMPTS):
+        try:
+            posts_table.update_item(
+                Key={'postId': post_id},
+                UpdateExpression='ADD #score :increment',
+                ConditionExpression='#bucket = :bucket',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={':increment': increment, ':bucket': bucket_of(epoch)}
+            )
+            return
+        except ClientError as e:
+            if e.response['Error'].get('Code') != 'ConditionalCheckFailedException':
+                raise
+
+        # The post's score belongs to an earlier epoch (or it has none yet): carry it over
+        current = posts_table.get_item(
+            Key={'postId': post_id}, ProjectionExpression='#bucket, #score',
+            ExpressionAttributeNames=names, ConsistentRead=True
+        ).get('Item')
+        if current is None:
+            return
+        values: Dict[str, Any] = {':bucket': bucket_of(epoch)}
+        carried = 0.0
+        if BUCKET_ATTRIBUTE in current:
+            carried = rescale(current.get(SCORE_ATTRIBUTE, 0), int(current[BUCKET_ATTRIBUTE]), epoch)
+            values[':old_bucket'] = current[BUCKET_ATTRIBUTE]
+            if SCORE_ATTRIBUTE in current:
+                condition = '#bucket = :old_bucket AND #score = :old_score'
+                values[':old_score'] = current[SCORE_ATTRIBUTE]
+            else:
+                condition = '#bucket = :old_bucket AND attribute_not_exists(#score)'
+        else:
+            condition = 'attribute_exists(postId) AND attribute_not_exists(#bucket)'
+        values[':score'] = _number(carried + float(increment))
+        try:
+            posts_table.update_item(
+                Key={'postId': post_id},
+                UpdateExpression='SET #bucket = :bucket, #score = :score',
+                ConditionExpression=condition,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+            return
+        except ClientError as e:
+            if e.response['Error'].get('Code') != 'ConditionalCheckFailedException':
+                raise
+    log.warning("Gave up updating trending score", postId=post_id)
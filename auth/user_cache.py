@@ -0,0 +1,86 @@
+"""Per-container cache of userId/email -> username for the posts Lambda.
+
+Usernames are changed by the user Lambda, which runs in other containers and has no way
+to reach these entries, so nothing invalidates them: a rename or a newly registered email
+shows up once the entry expires. That staleness window is the TTL, kept short by default:
+
+    USERNAME_CACHE_TTL_SECONDS             default 60, for found usernames
+    USERNAME_CACHE_NEGATIVE_TTL_SECONDS    default 10, for unknown users (e.g. just registered)
+    USERNAME_CACHE_MAX_ENTRIES             default 10000
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Sentinel distinguishing "not cached" from a cached negative (unknown user) entry
+MISSING = object()
+
+def cache_key(user_id: str) -> Tuple[str, str]:
+    """Build the cache key for a userId, keeping UUID and email lookups in separate entries."""
+    if "@" in user_id:
+        return ('email', user_id.lower())
+    return ('id', user_id)
+
+class UsernameCache:
+    """Bounded LRU cache of userId/email -> username with a TTL, kept across warm invocations."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0, negative_ttl_seconds: float = 10.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[Optional[str], float]]' = OrderedDict()
+        self._lock = threading.Lock() # Lookups run on the fan-out thread pool
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str) -> Any:
+        """Return the cached username (None for a known-unknown user), or MISSING."""
+        key = cache_key(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, user_id: str, username: Optional[str]) -> None:
+        """Cache a lookup result; a None username is cached for the shorter negative TTL."""
+        ttl = self.ttl_seconds if username is not None else self.negative_ttl_seconds
+        key = cache_key(user_id)
+        with self._lock:
+            self._entries[key] = (username, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for logging and tests."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRatio': (self.hits / lookups) if lookups else 0.0
+            }
+
+# Module-level instance so every handler in a warm container shares the same entries
+username_cache = UsernameCache(
+    max_entries=int(os.environ.get('USERNAME_CACHE_MAX_ENTRIES', '10000')),
+    ttl_seconds=float(os.environ.get('USERNAME_CACHE_TTL_SECONDS', '60')),
+    negative_ttl_seconds=float(os.environ.get('USERNAME_CACHE_NEGATIVE_TTL_SECONDS', '10'))
+)
@@ -0,0 +1,175 @@
+"""Micro-benchmarks for both lambda_handlers against in-memory DynamoDB and S3.
+
+    python benchmarks/bench.py                                   # default dataset, all routes
+    python benchmarks/bench.py --comments 10,100,1000,10000 --routes post_detail
+    python benchmarks/bench.py --followers 1,10,100,1000 --output results/followers.json
+    python benchmarks/bench.py --latency-ms 5                    # model network round trips
+
+For every dataset in the sweep (each combination of --comments and --followers) and every
+route, it reports p50/p95/p99 latency, backend calls per request (from tracing), response
+bytes and peak traced memory. Results are written as JSON for benchmarks/compare.py.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from harness import event, last_call_count, load_handlers # First: puts auth/ on sys.path
+from build_search_index import scan_posts
+import dataset
+
+def route_table(post: Any, users: Any, ids: Dict[str, Any]) -> Dict[str, Callable[[int], Dict]]:
+    """Route name -> function(iteration) returning the handler response."""
+    def register(i: int) -> Dict:
+        email = f"bench-{time.time_ns()}-{i}@example.com"
+        body = {'username': email.split('@')[0], 'email': email, 'password': 'secret', 'name': 'Bench'}
+        return users.lambda_handler(event('POST', '/register', body=body), None)
+
+    return {
+        'post_detail': lambda i: post.lambda_handler(event(
+            'GET', '/blog-posts/{postId}', {'postId': ids['hot_post']}, {'currentUserId': ids['viewer']}), None),
+        'listing': lambda i: post.lambda_handler(event('GET', '/blog-posts', query={'limit': '20'}), None),
+        'user_posts': lambda i: post.lambda_handler(event(
+            'GET', '/users/{userId}/posts', {'userId': ids['hot_author']}), None),
+        'bookmarks': lambda i: post.lambda_handler(event(
+            'GET', '/users/{userId}/bookmarks', {'userId': ids['viewer']}), None),
+        'viewer_states': lambda i: post.lambda_handler(event(
+            'GET', '/users/{userId}/viewer-state', {'userId': ids['viewer']},
+            {'postIds': ','.join(f"post-{n:06d}" for n in range(20))}), None),
+        'trending': lambda i: post.lambda_handler(event(
+            'GET', '/blog-posts', query={'sort': 'trending', 'limit': '20'}), None),
+        'category_posts': lambda i: post.lambda_handler(event(
+            'GET', '/categories/{categoryId}/posts', {'categoryId': ids['category']}, {'limit': '20'}), None),
+        'search': lambda i: post.lambda_handler(event(
+            'GET', '/search', query={'q': 'lorem ipsum', 'limit': '20'}), None),
+        'feed': lambda i: post.lambda_handler(event(
+            'GET', '/users/{userId}/feed', {'userId': ids['viewer']}, {'limit': '20'}), None),
+        'followers': lambda i: post.lambda_handler(event(
+            'GET', '/users/{userId}/followers', {'userId': ids['hot_author']}), None),
+        'login': lambda i: users.lambda_handler(event(
+            'POST', '/login', body={'email': 'user1@example.com', 'password': dataset.PASSWORD}), None),
+        'register': register,
+    }
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def measure(call: Callable[[int], Dict], iterations: int, warmup: int, memory_iterations: int,
+            reset: Callable[[], None]) -> Dict[str, Any]:
+    for i in range(warmup):
+        call(i)
+    latencies: List[float] = []
+    calls: List[int] = []
+    sizes: List[int] = []
+    statuses: Dict[int, int] = {}
+    for i in range(iterations):
+        reset()
+        started = time.perf_counter()
+        response = call(warmup + i)
+        latencies.append((time.perf_counter() - started) * 1000)
+        calls.append(last_call_count())
+        sizes.append(len(response.get('body') or ''))
+        statuses[response['statusCode']] = statuses.get(response['statusCode'], 0) + 1
+
+    # Memory is measured separately: tracemalloc slows every allocation down
+    tracemalloc.start()
+    peak = 0
+    for i in range(memory_iterations):
+        reset()
+        tracemalloc.reset_peak()
+        call(warmup + iterations + i)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'calls_per_request': round(sum(calls) / len(calls), 2),
+        'max_calls': max(calls),
+        'response_bytes': round(sum(sizes) / len(sizes)),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def int_list(text: str) -> List[int]:
+    return [int(part) for part in text.split(',') if part.strip()]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the Lambda handlers against in-memory AWS fakes.')
+    parser.add_argument('--routes', help='comma-separated subset of routes (default: all)')
+    parser.add_argument('--comments', type=int_list, default=[10], help='comments on the hot post, e.g. 10,100,1000,10000')
+    parser.add_argument('--followers', type=int_list, default=[10], help='followers of the hot author, e.g. 1,10,100,1000')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--memory-iterations', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated latency per backend call')
+    parser.add_argument('--cold-cache', action='store_true', help='clear the username cache before every request')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    runs = []
+    for comments, followers in itertools.product(args.comments, args.followers):
+        post, users, dynamodb, _ = load_handlers(args.latency_ms / 1000)
+        ids = dataset.seed(dynamodb, users=max(args.users, followers + 2), posts=args.posts,
+                           comments=comments, followers=followers)
+        post.post_search.compact(scan_posts(), keep_seconds=0) # The base index build_search_index.py would write
+        routes = route_table(post, users, ids)
+        selected = args.routes.split(',') if args.routes else list(routes)
+        reset = post.username_cache.clear if args.cold_cache else (lambda: None)
+        results = {}
+        for name in selected:
+            results[name] = measure(routes[name], args.iterations, args.warmup, args.memory_iterations, reset)
+            stats = results[name]
+            print(f"comments={comments:<6} followers={followers:<5} {name:<12} "
+                  f"p50={stats['p50_ms']:>8.3f}ms p95={stats['p95_ms']:>8.3f}ms p99={stats['p99_ms']:>8.3f}ms "
+                  f"calls={stats['calls_per_request']:<6} bytes={stats['response_bytes']:<8} "
+                  f"peak={stats['peak_memory_kb']}KB", file=sys.stderr)
+        runs.append({
+            'dataset': {'comments': comments, 'followers': followers, 'users': ids['users'], 'posts': args.posts},
+            'routes': results,
+        })
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'latency_ms': args.latency_ms,
+            'iterations': args.iterations,
+            'cold_cache': args.cold_cache,
+        },
+        'runs': runs,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
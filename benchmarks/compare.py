@@ -0,0 +1,56 @@
+"""Compare two bench.py result files and flag regressions.
+
+    python benchmarks/compare.py baseline.json candidate.json --max-ratio 1.25
+
+A route regresses when its p95 grows by more than --max-ratio (and by more than
+--min-delta-ms, so sub-millisecond noise is ignored) or when it makes more backend calls
+per request. Exits 1 if anything regressed.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Tuple
+
+def index_runs(report: Dict) -> Dict[Tuple, Dict[str, Any]]:
+    """(dataset key, route) -> stats."""
+    indexed = {}
+    for run in report['runs']:
+        dataset_key = tuple(sorted(run['dataset'].items()))
+        for route, stats in run['routes'].items():
+            indexed[(dataset_key, route)] = stats
+    return indexed
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--max-ratio', type=float, default=1.25, help='allowed p95 growth factor')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help='ignore p95 changes smaller than this')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    before = index_runs(baseline)
+    after = index_runs(candidate)
+
+    regressions = 0
+    print(f"{baseline['meta']['commit']} -> {candidate['meta']['commit']}")
+    for key in sorted(set(before) & set(after)):
+        dataset_key, route = key
+        old, new = before[key], after[key]
+        ratio = new['p95_ms'] / old['p95_ms'] if old['p95_ms'] else 1.0
+        slower = ratio > args.max_ratio and new['p95_ms'] - old['p95_ms'] > args.min_delta_ms
+        more_calls = new['calls_per_request'] > old['calls_per_request']
+        flag = 'REGRESSION' if slower or more_calls else ''
+        regressions += bool(flag)
+        label = ' '.join(f"{name}={value}" for name, value in dataset_key)
+        print(f"{label:<45} {route:<12} p95 {old['p95_ms']:>9.3f} -> {new['p95_ms']:>9.3f}ms ({ratio:5.2f}x)  "
+              f"calls {old['calls_per_request']:>6} -> {new['calls_per_request']:<6} {flag}")
+    for key in sorted(set(before) ^ set(after)):
+        print(f"only in {'baseline' if key in before else 'candidate'}: {key[1]} {dict(key[0])}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Synthetic BlogSphere data for benchmarks.
+
+One "hot" post by one "hot" author carries the swept dimensions (comments on the post,
+followers of the author); the rest of the data is background so listings and scans have
+realistic neighbours.
+"""
+import datetime
+import random
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from fake_aws import FakeDynamoDB
+from trending import SCORE_ATTRIBUTE, WEIGHTS, initial_trending
+
+PASSWORD = 'benchmark-password'
+REACTION_TYPES = ['like', 'love', 'laugh']
+
+def user_id(i: int) -> str:
+    return f"user-{i:06d}"
+
+def timestamp(minutes_ago: int) -> str:
+    base = datetime.datetime(2024, 1, 1)
+    return (base - datetime.timedelta(minutes=minutes_ago)).isoformat()
+
+def seed(
+    dynamodb: FakeDynamoDB,
+    users: int = 200,
+    posts: int = 200,
+    comments: int = 10,
+    followers: int = 10,
+    reactions: int = 50,
+    bookmarks: int = 20,
+    seed_value: int = 7
+) -> Dict[str, Any]:
+    """Fill dynamodb and return the IDs the benchmark routes address.
+
+    comments: comments on the hot post; followers: followers of the hot author and reactions:
+    reactions to the hot post, one per user (both capped at users - 1).
+    """
+    rng = random.Random(seed_value)
+    users = max(users, 2)
+    hot_author = user_id(0)
+    viewer = user_id(1)
+
+    dynamodb.Table('Users').load(
+        {'userId': user_id(i), 'username': f"user{i}", 'email': f"user{i}@example.com",
+         'password': PASSWORD, 'name': f"User {i}", 'createdAt': timestamp(100000 + i)}
+        for i in range(users)
+    )
+    follower_ids = [user_id(i) for i in range(1, min(followers, users - 1) + 1)]
+    dynamodb.Table('UserProfiles').load(
+        {'userId': user_id(i), 'username': f"user{i}", 'email': f"user{i}@example.com", 'name': f"User {i}",
+         'bio': '', 'followers': len(follower_ids) if i == 0 else 0, 'following': 1 if 1 <= i <= len(follower_ids) else 0,
+         'postsCount': 0, 'totalLikesReceived': 0}
+        for i in range(users)
+    )
+    dynamodb.Table('UserFollows').load(
+        {'followerId': follower, 'followedId': hot_author, 'createdAt': timestamp(i)}
+        for i, follower in enumerate(follower_ids)
+    )
+
+    post_ids: List[str] = [f"post-{i:06d}" for i in range(posts)]
+    hot_post = post_ids[0]
+    reaction_rows = [
+        {'reactionId': f"{hot_post}#{user_id(1 + i)}", 'postId': hot_post, 'userId': user_id(1 + i), # post.reaction_key
+         'reactionType': REACTION_TYPES[i % len(REACTION_TYPES)], 'createdAt': timestamp(i)}
+        for i in range(min(reactions, users - 1))
+    ]
+    rows = []
+    for i, post_id in enumerate(post_ids):
+        author = hot_author if i % 10 == 0 else user_id(rng.randrange(users))
+        is_hot = post_id == hot_post
+        counters = {
+            'commentCount': comments if is_hot else 0,
+            'reactionCount': len(reaction_rows) if is_hot else 0,
+            'shareCount': 0,
+        }
+        for reaction_type in REACTION_TYPES:
+            counters[f"{reaction_type}Count"] = sum(
+                1 for row in reaction_rows if row['reactionType'] == reaction_type
+            ) if is_hot else 0
+        # Scored as if all of the post's engagement happened now
+        trending = initial_trending()
+        engagement = 1 + counters['commentCount'] * WEIGHTS['PostComments'] + counters['reactionCount'] * WEIGHTS['PostReactions']
+        trending[SCORE_ATTRIBUTE] *= Decimal(repr(engagement + rng.random()))
+        rows.append(dict(
+            counters, **trending, postId=post_id, authorId=author, title=f"Post {i}",
+            content='Lorem ipsum dolor sit amet. ' * rng.randint(5, 60), status='published',
+            createdAt=timestamp(i * 7)
+        ))
+    dynamodb.Table('BlogPosts').load(rows)
+    dynamodb.Table('PostReactions').load(reaction_rows)
+    dynamodb.Table('PostComments').load(
+        {'commentId': f"comment-{i:07d}", 'postId': hot_post, 'userId': user_id(1 + i % (users - 1)),
+         'content': f"Comment {i} " + 'x' * rng.randint(10, 200), 'createdAt': timestamp(i)}
+        for i in range(comments)
+    )
+    dynamodb.Table('PostBookmarks').load(
+        {'userId': viewer, 'postId': post_id, 'createdAt': timestamp(i)}
+        for i, post_id in enumerate(post_ids[:bookmarks])
+    )
+    categories = [f"category-{i}" for i in range(10)]
+    dynamodb.Table('Categories').load({'categoryId': c, 'name': c, 'slug': c} for c in categories)
+    dynamodb.Table('PostCategories').load(
+        {'postId': row['postId'], 'categoryId': categories[i % len(categories)], 'createdAt': row['createdAt']}
+        for i, row in enumerate(rows)
+    )
+    return {
+        'hot_post': hot_post,
+        'hot_author': hot_author,
+        'viewer': viewer,
+        'category': categories[0],
+        'users': users,
+    }
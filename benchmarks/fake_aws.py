@@ -0,0 +1,674 @@
+"""In-memory stand-ins for the DynamoDB resource and S3 client used by the Lambdas.
+
+Tables are laid out from auth/registry.py: items are partitioned by hash key for the base
+table and for every GSI, so a query only touches its own partition, as in DynamoDB. It
+covers what the handlers use: get/put/update/delete_item with condition and update
+expressions, query and scan (Limit, ExclusiveStartKey, FilterExpression,
+ProjectionExpression, Select=COUNT, Segment/TotalSegments, the 1 MB page cap),
+batch_get_item, transact_write_items (on resource.meta.client) and an approximate
+ReturnConsumedCapacity. Errors are raised as botocore
+ClientErrors with DynamoDB's error codes. Every access is counted per partition key in
+FakeDynamoDB.partition_hits, to show hot partitions.
+
+Plug it in with clients.use_backends(lambda: resource, lambda: s3).
+"""
+import contextlib
+import copy
+import math
+import re
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+from registry import TABLE_SCHEMAS, TableSchema
+
+PAGE_MAX_BYTES = 1024 * 1024 # DynamoDB stops a query/scan page at 1 MB
+READ_UNIT_BYTES = 4096
+BATCH_GET_MAX_KEYS = 100
+TRANSACT_MAX_ITEMS = 100
+
+def client_error(code: str, message: str = '', operation: str = 'DynamoDB') -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+def to_dynamo(value: Any) -> Any:
+    """Copy value the way boto3 would store it: ints as Decimal, floats rejected."""
+    if isinstance(value, bool) or value is None or isinstance(value, (str, bytes, Decimal)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, dict):
+        return {k: to_dynamo(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamo(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return {to_dynamo(v) for v in value}
+    return value
+
+def item_size(item: Dict) -> int:
+    """Rough DynamoDB item size: attribute names plus value lengths."""
+    return sum(len(name) + len(str(value)) for name, value in item.items())
+
+def _sortable(value: Any) -> Tuple[int, Any]:
+    if isinstance(value, Decimal):
+        return (0, value)
+    if isinstance(value, (bytes, bytearray)):
+        return (2, bytes(value))
+    return (1, '' if value is None else str(value))
+
+# ---------------------------------------------------------------- expressions
+
+_TOKEN = re.compile(r"\s*(<>|<=|>=|=|<|>|\(|\)|,|\+|-|[#:]?[A-Za-z_][\w.#:\[\]-]*)")
+_FUNCTIONS = ('attribute_exists', 'attribute_not_exists', 'contains', 'begins_with', 'attribute_type')
+
+class _Expression:
+    """Recursive-descent evaluator for condition, key-condition and update expression operands."""
+
+    def __init__(self, text: str, names: Optional[Dict], values: Optional[Dict]):
+        self.tokens = [t for t in _TOKEN.findall(text) if t.strip()]
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def path(self, token: str) -> str:
+        return '.'.join(self.names.get(part, part) for part in token.split('.'))
+
+    def operand(self, item: Dict) -> Any:
+        token = self.take()
+        if token.startswith(':'):
+            return self.values[token]
+        if token == 'if_not_exists':
+            self.take()
+            current = get_path(item, self.path(self.take()))
+            self.take()
+            default = self.operand(item)
+            self.take()
+            return default if current is None else current
+        if token == 'list_append':
+            self.take()
+            first = self.operand(item)
+            self.take()
+            second = self.operand(item)
+            self.take()
+            return list(first or []) + list(second or [])
+        if token == 'size':
+            self.take()
+            value = get_path(item, self.path(self.take()))
+            self.take()
+            return Decimal(len(value)) if value is not None else None
+        return get_path(item, self.path(token))
+
+    def value(self, item: Dict) -> Any:
+        """operand, optionally followed by + or - operands (SET right-hand sides)."""
+        result = self.operand(item)
+        while self.peek() in ('+', '-'):
+            operator = self.take()
+            right = self.operand(item)
+            result = result + right if operator == '+' else result - right
+        return result
+
+    def condition(self, item: Dict) -> bool:
+        result = self.conjunction(item)
+        while self.peek() and self.peek().upper() == 'OR':
+            self.take()
+            right = self.conjunction(item)
+            result = result or right
+        return result
+
+    def conjunction(self, item: Dict) -> bool:
+        result = self.unary(item)
+        while self.peek() and self.peek().upper() == 'AND':
+            self.take()
+            right = self.unary(item)
+            result = result and right
+        return result
+
+    def unary(self, item: Dict) -> bool:
+        token = self.peek()
+        if token.upper() == 'NOT':
+            self.take()
+            return not self.unary(item)
+        if token == '(':
+            self.take()
+            result = self.condition(item)
+            self.take()
+            return result
+        if token in _FUNCTIONS:
+            self.take()
+            self.take()
+            path = self.path(self.take())
+            argument = None
+            if self.peek() == ',':
+                self.take()
+                argument = self.operand(item)
+            self.take()
+            return _function(token, item, path, argument)
+        left = self.operand(item)
+        operator = self.take()
+        if operator.upper() == 'IN':
+            self.take()
+            options = [self.operand(item)]
+            while self.peek() == ',':
+                self.take()
+                options.append(self.operand(item))
+            self.take()
+            return left in options
+        if operator.upper() == 'BETWEEN':
+            low = self.operand(item)
+            self.take()
+            high = self.operand(item)
+            return _compare('BETWEEN', left, (low, high))
+        return _compare(operator, left, self.operand(item))
+
+def get_path(item: Dict, path: str) -> Any:
+    value: Any = item
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def _function(name: str, item: Dict, path: str, argument: Any) -> bool:
+    value = get_path(item, path)
+    if name == 'attribute_exists':
+        return value is not None or path in item
+    if name == 'attribute_not_exists':
+        return value is None and path not in item
+    if name == 'contains':
+        return value is not None and argument in value
+    if name == 'begins_with':
+        return isinstance(value, str) and value.startswith(argument)
+    return True # attribute_type: not modelled
+
+def _compare(operator: str, left: Any, right: Any) -> bool:
+    if operator == '=':
+        return left == right
+    if operator == '<>':
+        return left != right
+    if left is None:
+        return False
+    try:
+        if operator == 'BETWEEN':
+            return right[0] <= left <= right[1]
+        return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[operator]
+    except TypeError:
+        return False
+
+def evaluate(condition: Any, item: Dict, names: Optional[Dict] = None, values: Optional[Dict] = None) -> bool:
+    """Evaluate a string expression or a boto3 Key/Attr condition against item."""
+    if condition is None:
+        return True
+    if isinstance(condition, str):
+        return _Expression(condition, names, values).condition(item)
+    expression = condition.get_expression()
+    operator = expression['operator']
+    operands = expression['values']
+    if operator == 'AND':
+        return all(evaluate(operand, item) for operand in operands)
+    if operator == 'OR':
+        return any(evaluate(operand, item) for operand in operands)
+    if operator == 'NOT':
+        return not evaluate(operands[0], item)
+    target = operands[0]
+    if hasattr(target, 'get_expression'): # size(attr)
+        value = get_path(item, target.get_expression()['values'][0].name)
+        value = Decimal(len(value)) if value is not None else None
+        path = None
+    else:
+        path = target.name
+        value = get_path(item, path)
+    arguments = [to_dynamo(argument) for argument in operands[1:]]
+    if operator in _FUNCTIONS:
+        return _function(operator, item, path, arguments[0] if arguments else None)
+    if operator == 'IN':
+        return value in arguments[0]
+    if operator == 'BETWEEN':
+        return _compare('BETWEEN', value, arguments)
+    return _compare(operator, value, arguments[0])
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, current = [], 0, ''
+    for character in text:
+        depth += {'(': 1, ')': -1}.get(character, 0)
+        if character == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+        else:
+            current += character
+    if current.strip():
+        parts.append(current)
+    return parts
+
+def apply_update(item: Dict, text: str, names: Optional[Dict], values: Dict) -> None:
+    """Apply a SET/ADD/REMOVE/DELETE update expression to item in place."""
+    names = names or {}
+    clause = None
+    for part in re.split(r'\b(SET|ADD|REMOVE|DELETE)\b', text):
+        if part in ('SET', 'ADD', 'REMOVE', 'DELETE'):
+            clause = part
+            continue
+        for action in _split_top_level(part):
+            action = action.strip()
+            if not action:
+                continue
+            if clause == 'SET':
+                left, right = action.split('=', 1)
+                item[names.get(left.strip(), left.strip())] = _Expression(right, names, values).value(item)
+            elif clause == 'REMOVE':
+                item.pop(names.get(action, action), None)
+            else:
+                path, placeholder = action.split()
+                path = names.get(path, path)
+                delta = values[placeholder]
+                if clause == 'DELETE':
+                    item[path] = set(item.get(path, set())) - delta
+                elif isinstance(delta, set):
+                    item[path] = set(item.get(path, set())) | delta
+                else:
+                    item[path] = item.get(path, Decimal(0)) + delta
+
+def _project(item: Dict, projection: Optional[str], names: Optional[Dict]) -> Dict:
+    if not projection:
+        return copy.deepcopy(item)
+    fields = [(names or {}).get(field.strip(), field.strip()) for field in projection.split(',')]
+    return {field: copy.deepcopy(item[field]) for field in fields if field in item}
+
+# ---------------------------------------------------------------- tables
+
+class FakeTable:
+    """One table with hash-partitioned storage for the base key and each GSI."""
+
+    def __init__(self, schema: TableSchema, resource: 'FakeDynamoDB'):
+        self.schema = schema
+        self.name = schema.name
+        self._resource = resource
+        self._lock = threading.RLock()
+        self.items: Dict[Tuple, Dict] = {}
+        # index name (None for the base table) -> hash value -> keys, in insertion order
+        self._partitions: Dict[Optional[str], Dict[Any, Dict[Tuple, None]]] = {None: {}}
+        for index in schema.indexes:
+            self._partitions[index.name] = {}
+
+    def _key(self, values: Dict) -> Tuple:
+        return tuple(values.get(name) for name in self.schema.key_attributes)
+
+    def _index_keys(self, index_name: Optional[str]) -> Tuple[str, Optional[str]]:
+        if index_name is None:
+            return self.schema.hash_key, self.schema.sort_key
+        try:
+            index = self.schema.index(index_name)
+        except KeyError:
+            raise client_error('ValidationException', f"The table does not have the specified index: {index_name}")
+        return index.hash_key, index.sort_key
+
+    def _link(self, key: Tuple, item: Dict, add: bool) -> None:
+        for index_name, partitions in self._partitions.items():
+            hash_key, sort_key = self._index_keys(index_name)
+            if item.get(hash_key) is None or (sort_key and item.get(sort_key) is None):
+                continue # Sparse index: item not projected
+            partition = partitions.setdefault(item[hash_key], {})
+            if add:
+                partition[key] = None
+            else:
+                partition.pop(key, None)
+                if not partition:
+                    del partitions[item[hash_key]]
+
+    def _store(self, item: Dict) -> None:
+        key = self._key(item)
+        if key in self.items:
+            self._link(key, self.items[key], add=False)
+        self.items[key] = item
+        self._link(key, item, add=True)
+
+    def _validate_key(self, key: Dict) -> Tuple:
+        if set(key) != set(self.schema.key_attributes) or any(key[name] is None for name in key):
+            raise client_error('ValidationException', 'The provided key element does not match the schema')
+        return self._key(key)
+
+    def _check(self, condition: Any, current: Dict, names: Optional[Dict], values: Dict) -> None:
+        if condition is not None and not evaluate(condition, current, names, values):
+            raise client_error('ConditionalCheckFailedException', 'The conditional request failed')
+
+    def load(self, items: Iterable[Dict]) -> None:
+        """Bulk insert without per-call latency, for seeding datasets."""
+        with self._lock:
+            for item in items:
+                self._store(to_dynamo(item))
+
+    # -- item operations
+
+    def get_item(self, Key: Dict, ProjectionExpression: Optional[str] = None,
+                 ExpressionAttributeNames: Optional[Dict] = None, **_: Any) -> Dict:
+        self._resource.wait()
+        key = self._validate_key(to_dynamo(Key))
+        self._resource.hit(self.name, None, key[0])
+        item = self.items.get(key)
+        return {'Item': _project(item, ProjectionExpression, ExpressionAttributeNames)} if item else {}
+
+    def put_item(self, Item: Dict, ConditionExpression: Any = None, ExpressionAttributeNames: Optional[Dict] = None,
+                 ExpressionAttributeValues: Optional[Dict] = None, ReturnValues: Optional[str] = None, **_: Any) -> Dict:
+        self._resource.wait()
+        item = to_dynamo(Item)
+        key = self._validate_key({name: item.get(name) for name in self.schema.key_attributes})
+        self._resource.hit(self.name, None, key[0])
+        with self._lock:
+            old = self.items.get(key)
+            self._check(ConditionExpression, old or {}, ExpressionAttributeNames, to_dynamo(ExpressionAttributeValues or {}))
+            self._store(item)
+        return {'Attributes': copy.deepcopy(old)} if old and ReturnValues == 'ALL_OLD' else {}
+
+    def update_item(self, Key: Dict, UpdateExpression: str, ConditionExpression: Any = None,
+                    ExpressionAttributeNames: Optional[Dict] = None, ExpressionAttributeValues: Optional[Dict] = None,
+                    ReturnValues: Optional[str] = None, **_: Any) -> Dict:
+        self._resource.wait()
+        key_values = to_dynamo(Key)
+        key = self._validate_key(key_values)
+        self._resource.hit(self.name, None, key[0])
+        values = to_dynamo(ExpressionAttributeValues or {})
+        with self._lock:
+            old = self.items.get(key)
+            self._check(ConditionExpression, old or {}, ExpressionAttributeNames, values)
+            item = copy.deepcopy(old) if old else dict(key_values)
+            apply_update(item, UpdateExpression, ExpressionAttributeNames, values)
+            if self._key(item) != key:
+                raise client_error('ValidationException', 'Cannot update attribute; this attribute is part of the key')
+            self._store(item)
+        if ReturnValues in ('ALL_NEW', 'UPDATED_NEW'):
+            if ReturnValues == 'ALL_NEW':
+                return {'Attributes': copy.deepcopy(item)}
+            changed = {name: value for name, value in item.items() if (old or {}).get(name) != value}
+            return {'Attributes': copy.deepcopy(changed)}
+        if ReturnValues in ('ALL_OLD', 'UPDATED_OLD') and old:
+            return {'Attributes': copy.deepcopy(old)}
+        return {}
+
+    def delete_item(self, Key: Dict, ConditionExpression: Any = None, ExpressionAttributeNames: Optional[Dict] = None,
+                    ExpressionAttributeValues: Optional[Dict] = None, ReturnValues: Optional[str] = None, **_: Any) -> Dict:
+        self._resource.wait()
+        key = self._validate_key(to_dynamo(Key))
+        self._resource.hit(self.name, None, key[0])
+        with self._lock:
+            old = self.items.get(key)
+            self._check(ConditionExpression, old or {}, ExpressionAttributeNames, to_dynamo(ExpressionAttributeValues or {}))
+            if old:
+                self._link(key, old, add=False)
+                del self.items[key]
+        return {'Attributes': copy.deepcopy(old)} if old and ReturnValues == 'ALL_OLD' else {}
+
+    # -- reads
+
+    def _page(self, rows: List[Dict], params: Dict, index_name: Optional[str]) -> Dict:
+        names = params.get('ExpressionAttributeNames')
+        values = to_dynamo(params.get('ExpressionAttributeValues') or {})
+        limit = params.get('Limit')
+        items: List[Dict] = []
+        scanned = 0
+        size = 0
+        last = None
+        projected = self.schema.projected_attributes(index_name) if index_name else None
+        for row in rows:
+            if (limit and scanned >= limit) or size >= PAGE_MAX_BYTES:
+                break
+            if projected is not None: # KEYS_ONLY and INCLUDE indexes hold only some attributes
+                row = {name: row[name] for name in projected if name in row}
+            scanned += 1
+            size += item_size(row)
+            last = row
+            if evaluate(params.get('FilterExpression'), row, names, values):
+                items.append(row)
+        response: Dict[str, Any] = {'Count': len(items), 'ScannedCount': scanned}
+        if params.get('Select') != 'COUNT':
+            response['Items'] = [_project(item, params.get('ProjectionExpression'), names) for item in items]
+        if last is not None and scanned < len(rows):
+            key_names = self.schema.index_key_attributes(index_name)
+            response['LastEvaluatedKey'] = {name: last[name] for name in key_names if name in last}
+        if params.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            units = max(1, math.ceil(size / READ_UNIT_BYTES)) * 0.5 # Eventually consistent reads
+            response['ConsumedCapacity'] = {'TableName': self.name, 'CapacityUnits': units}
+        return response
+
+    def _resume(self, rows: List[Dict], start: Optional[Dict]) -> List[Dict]:
+        if not start:
+            return rows
+        start_key = self._key(to_dynamo(start))
+        for position, row in enumerate(rows):
+            if self._key(row) == start_key:
+                return rows[position + 1:]
+        return []
+
+    def query(self, KeyConditionExpression: Any, IndexName: Optional[str] = None, **params: Any) -> Dict:
+        self._resource.wait()
+        hash_key, sort_key = self._index_keys(IndexName)
+        names = params.get('ExpressionAttributeNames')
+        values = to_dynamo(params.get('ExpressionAttributeValues') or {})
+        hash_value = _hash_value(KeyConditionExpression, hash_key, names, values)
+        self._resource.hit(self.name, IndexName, hash_value)
+        with self._lock:
+            keys = list(self._partitions[IndexName].get(hash_value, {}))
+            rows = [self.items[key] for key in keys]
+        rows = [row for row in rows if evaluate(KeyConditionExpression, row, names, values)]
+        rows.sort(key=lambda row: (_sortable(row.get(sort_key)) if sort_key else (0, 0), tuple(map(_sortable, self._key(row)))))
+        if params.get('ScanIndexForward') is False:
+            rows.reverse()
+        return self._page(self._resume(rows, params.get('ExclusiveStartKey')), params, IndexName)
+
+    def scan(self, IndexName: Optional[str] = None, Segment: Optional[int] = None,
+             TotalSegments: Optional[int] = None, **params: Any) -> Dict:
+        self._resource.wait()
+        self._index_keys(IndexName)
+        self._resource.hit(self.name, IndexName, '(scan)')
+        with self._lock:
+            rows = list(self.items.values())
+        if TotalSegments:
+            rows = [row for row in rows if hash(self._key(row)) % TotalSegments == Segment]
+        return self._page(self._resume(rows, params.get('ExclusiveStartKey')), params, IndexName)
+
+def _hash_value(condition: Any, hash_key: str, names: Optional[Dict], values: Dict) -> Any:
+    """The partition key value a key condition selects."""
+    if isinstance(condition, str):
+        match = re.search(r"([#\w]+)\s*=\s*(:\w+)", condition)
+        if match and (names or {}).get(match.group(1), match.group(1)) == hash_key:
+            return values[match.group(2)]
+        raise client_error('ValidationException', 'Query condition missed key schema element')
+    expression = condition.get_expression()
+    if expression['operator'] == 'AND':
+        for operand in expression['values']:
+            try:
+                return _hash_value(operand, hash_key, names, values)
+            except ClientError:
+                continue
+    elif expression['operator'] == '=' and expression['values'][0].name == hash_key:
+        return to_dynamo(expression['values'][1])
+    raise client_error('ValidationException', 'Query condition missed key schema element')
+
+# ---------------------------------------------------------------- services
+
+class FakeDynamoDB:
+    """Stand-in for boto3.resource('dynamodb'), with optional per-call latency."""
+
+    def __init__(self, latency_seconds: float = 0.0, schemas: Optional[Dict[str, TableSchema]] = None):
+        self.latency_seconds = latency_seconds
+        self.partition_hits: Counter = Counter() # (table, index or None, hash key value) -> accesses
+        self._hits_lock = threading.Lock()
+        self.tables = {name: FakeTable(schema, self) for name, schema in (schemas or TABLE_SCHEMAS).items()}
+        self.meta = SimpleNamespace(client=FakeDynamoDBClient(self))
+
+    def wait(self) -> None:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def hit(self, table: str, index: Optional[str], hash_value: Any) -> None:
+        with self._hits_lock:
+            self.partition_hits[(table, index, str(hash_value))] += 1
+
+    def Table(self, name: str) -> FakeTable:
+        if name not in self.tables:
+            raise client_error('ResourceNotFoundException', f"Requested resource not found: Table: {name} not found")
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems: Dict[str, Dict], **_: Any) -> Dict:
+        self.wait()
+        if sum(len(request['Keys']) for request in RequestItems.values()) > BATCH_GET_MAX_KEYS:
+            raise client_error('ValidationException', 'Too many items requested for the BatchGetItem call')
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            found = []
+            for key in request['Keys']:
+                key = table._validate_key(to_dynamo(key))
+                self.hit(name, None, key[0])
+                item = table.items.get(key)
+                if item:
+                    found.append(_project(item, request.get('ProjectionExpression'), request.get('ExpressionAttributeNames')))
+            responses[name] = found
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+_deserializer = TypeDeserializer()
+_serializer = TypeSerializer()
+
+def _from_wire(values: Dict) -> Dict:
+    return {name: _deserializer.deserialize(value) for name, value in values.items()}
+
+def _to_wire(values: Dict) -> Dict:
+    return {name: _serializer.serialize(value) for name, value in values.items()}
+
+class FakeDynamoDBClient:
+    """Stand-in for the low-level client behind FakeDynamoDB, with only transact_write_items.
+
+    Attribute values are in the typed wire format. Every condition is checked before
+    anything is written; one failure cancels the whole transaction with per-item
+    CancellationReasons, as DynamoDB does.
+    """
+
+    def __init__(self, resource: FakeDynamoDB):
+        self._resource = resource
+
+    def transact_write_items(self, TransactItems: List[Dict], **_: Any) -> Dict:
+        self._resource.wait()
+        if len(TransactItems) > TRANSACT_MAX_ITEMS:
+            raise client_error('ValidationException', 'Too many items in the TransactWriteItems call', 'TransactWriteItems')
+        actions = []
+        for entry in TransactItems:
+            (operation, request), = entry.items()
+            table = self._resource.Table(request['TableName'])
+            key_values = _from_wire(request['Item'] if operation == 'Put' else request['Key'])
+            key = table._validate_key({name: key_values.get(name) for name in table.schema.key_attributes})
+            actions.append((operation, request, table, key, key_values))
+
+        with contextlib.ExitStack() as stack:
+            for name in sorted({table.name for _, _, table, _, _ in actions}): # Fixed order, so no deadlocks
+                stack.enter_context(self._resource.tables[name]._lock)
+            reasons = []
+            for operation, request, table, key, _ in actions:
+                self._resource.hit(table.name, None, key[0])
+                current = table.items.get(key)
+                condition = request.get('ConditionExpression')
+                values = _from_wire(request.get('ExpressionAttributeValues') or {})
+                if condition is None or evaluate(condition, current or {}, request.get('ExpressionAttributeNames'), values):
+                    reasons.append({'Code': 'None'})
+                    continue
+                reason = {'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'}
+                if current and request.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD':
+                    reason['Item'] = _to_wire(current)
+                reasons.append(reason)
+            if any(reason['Code'] != 'None' for reason in reasons):
+                error = client_error('TransactionCanceledException', 'Transaction cancelled, please refer cancellation reasons '
+                                     f"for specific reasons [{', '.join(reason['Code'] for reason in reasons)}]",
+                                     'TransactWriteItems')
+                error.response['CancellationReasons'] = reasons
+                raise error
+
+            for operation, request, table, key, key_values in actions:
+                current = table.items.get(key)
+                if operation == 'Put':
+                    table._store(key_values)
+                elif operation == 'Delete' and current:
+                    table._link(key, current, add=False)
+                    del table.items[key]
+                elif operation == 'Update':
+                    item = copy.deepcopy(current) if current else dict(key_values)
+                    apply_update(item, request['UpdateExpression'], request.get('ExpressionAttributeNames'),
+                                 _from_wire(request.get('ExpressionAttributeValues') or {}))
+                    table._store(item)
+        return {}
+
+class _Body:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self) -> bytes:
+        return self._data
+
+class FakeS3:
+    """Stand-in for boto3.client('s3'): objects kept in memory per bucket."""
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.objects: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def _object(self, Bucket: str, Key: str, operation: str) -> Dict[str, Any]:
+        if (Bucket, Key) not in self.objects:
+            raise client_error('NoSuchKey', 'The specified key does not exist.', operation)
+        return self.objects[(Bucket, Key)]
+
+    def put_object(self, Bucket: str, Key: str, Body: Any = b'', ContentType: str = 'binary/octet-stream', **_: Any) -> Dict:
+        time.sleep(self.latency_seconds)
+        data = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+        etag = f'"{hash(data) & 0xffffffff:08x}"'
+        self.objects[(Bucket, Key)] = {'Body': data, 'ContentType': ContentType, 'ETag': etag}
+        return {'ETag': etag}
+
+    def get_object(self, Bucket: str, Key: str, IfNoneMatch: Optional[str] = None, **_: Any) -> Dict:
+        time.sleep(self.latency_seconds)
+        stored = self._object(Bucket, Key, 'GetObject')
+        if IfNoneMatch and IfNoneMatch == stored['ETag']:
+            raise client_error('304', 'Not Modified', 'GetObject')
+        return {'Body': _Body(stored['Body']), 'ContentType': stored['ContentType'],
+                'ContentLength': len(stored['Body']), 'ETag': stored['ETag']}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = '', StartAfter: str = '', MaxKeys: int = 1000,
+                        ContinuationToken: Optional[str] = None, **_: Any) -> Dict:
+        time.sleep(self.latency_seconds)
+        after = ContinuationToken or StartAfter
+        keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix) and key > after)
+        page = keys[:MaxKeys]
+        response: Dict[str, Any] = {'Contents': [{'Key': key, 'Size': len(self.objects[(Bucket, key)]['Body'])} for key in page],
+                                    'KeyCount': len(page), 'IsTruncated': len(keys) > MaxKeys}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
+
+    def delete_objects(self, Bucket: str, Delete: Dict, **_: Any) -> Dict:
+        time.sleep(self.latency_seconds)
+        for entry in Delete['Objects']:
+            self.objects.pop((Bucket, entry['Key']), None)
+        return {}
+
+    def head_object(self, Bucket: str, Key: str, **_: Any) -> Dict:
+        time.sleep(self.latency_seconds)
+        stored = self._object(Bucket, Key, 'HeadObject')
+        return {'ContentType': stored['ContentType'], 'ContentLength': len(stored['Body'])}
+
+    def delete_object(self, Bucket: str, Key: str, **_: Any) -> Dict:
+        time.sleep(self.latency_seconds)
+        self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: Dict, ExpiresIn: int = 3600, **_: Any) -> str:
+        return f"https://{Params['Bucket']}.s3.amazonaws.com/{Params['Key']}?X-Amz-Expires={ExpiresIn}&X-Amz-Signature=fake"
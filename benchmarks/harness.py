@@ -0,0 +1,63 @@
+"""Load the Lambda modules against the in-memory backends and build API Gateway events."""
+import importlib
+import json
+import os
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+AUTH_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), 'auth')
+
+# The handlers read these at import time: keep stdout for results, not per-request log lines
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+os.environ.setdefault('TRACING_ENABLED', 'false')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('CURSOR_SECRET_EPHEMERAL', 'true')
+if AUTH_DIR not in sys.path:
+    sys.path.insert(0, AUTH_DIR)
+
+import clients # noqa: E402 (needs AUTH_DIR on sys.path)
+import tracing # noqa: E402
+from fake_aws import FakeDynamoDB, FakeS3 # noqa: E402
+
+def load_handlers(latency_seconds: float = 0.0) -> Tuple[Any, Any, FakeDynamoDB, FakeS3]:
+    """Import post.py and lambda.py wired to fresh in-memory backends.
+
+    Returns (post module, lambda module, DynamoDB fake, S3 fake).
+    """
+    dynamodb = FakeDynamoDB(latency_seconds)
+    s3 = FakeS3(latency_seconds)
+    clients.use_backends(lambda: dynamodb, lambda: s3)
+    post = importlib.import_module('post')
+    users = importlib.import_module('lambda')
+    post.username_cache.clear() # Modules are imported once; don't carry cache state across datasets
+    post.post_search.clear()
+    return post, users, dynamodb, s3
+
+def event(
+    method: str,
+    resource: str,
+    path_parameters: Optional[Dict[str, str]] = None,
+    query: Optional[Dict[str, str]] = None,
+    body: Optional[Dict] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Dict:
+    """API Gateway proxy event for resource (e.g. '/blog-posts/{postId}') with its parameters filled in."""
+    path = resource
+    for name, value in (path_parameters or {}).items():
+        path = path.replace('{' + name + '}', value)
+    return {
+        'resource': resource,
+        'path': path,
+        'httpMethod': method,
+        'headers': headers or {},
+        'queryStringParameters': query or None,
+        'pathParameters': path_parameters or None,
+        'requestContext': {'resourcePath': resource, 'httpMethod': method},
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False,
+    }
+
+def last_call_count() -> int:
+    """Backend calls made by the most recent handler invocation."""
+    return tracing.last_trace.call_count if tracing.last_trace else 0
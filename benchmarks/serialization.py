@@ -0,0 +1,121 @@
+"""Benchmark response encoding on DynamoDB-shaped payloads.
+
+    python benchmarks/serialization.py                       # 20, 100 and 1000 posts
+    python benchmarks/serialization.py --items 5000 --output results/serialization.json
+
+Each encoder serializes a listing of BlogPosts items whose numbers are Decimal, as boto3
+returns them. "legacy-*" are the encoders the Lambdas used before auth/serializer.py;
+"json" and "orjson" are its two backends and "dumps" is whichever one it picked here.
+Results use bench.py's report format (encoders in place of routes), so compare.py can diff
+them.
+"""
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+import harness # noqa: F401 (first: puts auth/ on sys.path)
+from bench import git_commit, int_list, percentile
+import serializer
+
+class LegacyDecimalEncoder(json.JSONEncoder):
+    """lambda.py's encoder: Decimal -> float, per-call encoder construction."""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return json.JSONEncoder.default(self, obj)
+
+def legacy_json_default(value: Any) -> Any:
+    """post.py's json.dumps hook."""
+    if isinstance(value, Decimal):
+        return int(value) if value % 1 == 0 else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encoders() -> Dict[str, Callable[[Any], str]]:
+    stdlib = json.JSONEncoder(default=serializer.encode_default, separators=(',', ':'), ensure_ascii=False)
+    found = {
+        'legacy-float': lambda body: json.dumps(body, cls=LegacyDecimalEncoder),
+        'legacy-default': lambda body: json.dumps(body, default=legacy_json_default),
+        'json': stdlib.encode,
+        'dumps': serializer.dumps,
+    }
+    if serializer.orjson is not None:
+        found['orjson'] = lambda body: serializer.orjson.dumps(
+            body, default=serializer.encode_default, option=serializer.orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return found
+
+def listing(items: int) -> Dict[str, Any]:
+    """A /blog-posts page: the shape scan_table_handler returns."""
+    posts = [
+        {
+            'postId': f"post-{i:06d}", 'authorId': f"user-{i % 97:06d}", 'authorUsername': f"user{i % 97}",
+            'title': f"Post {i} — naïve café", 'content': 'Lorem ipsum dolor sit amet. ' * 20,
+            'status': 'published', 'createdAt': f"2024-01-01T00:{i % 60:02d}:00",
+            'commentCount': Decimal(i % 50), 'reactionCount': Decimal(i % 200), 'shareCount': Decimal(i % 7),
+            'likeCount': Decimal(i % 120), 'score': Decimal(f"{i % 1000}.25"),
+        }
+        for i in range(items)
+    ]
+    return {'items': posts, 'count': items, 'nextCursor': None}
+
+def measure(encode: Callable[[Any], str], body: Any, iterations: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        encode(body)
+    latencies: List[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        encoded = encode(body)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'calls_per_request': 0,
+        'response_bytes': len(encoded.encode('utf-8')),
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark JSON encoders on DynamoDB-shaped payloads.')
+    parser.add_argument('--items', type=int_list, default=[20, 100, 1000], help='posts per payload, e.g. 20,100,1000')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    runs = []
+    for items in args.items:
+        body = listing(items)
+        results = {}
+        for name, encode in encoders().items():
+            results[name] = stats = measure(encode, body, args.iterations, args.warmup)
+            print(f"items={items:<6} {name:<14} p50={stats['p50_ms']:>8.3f}ms p95={stats['p95_ms']:>8.3f}ms "
+                  f"bytes={stats['response_bytes']}", file=sys.stderr)
+        runs.append({'dataset': {'items': items}, 'routes': results})
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': 'orjson' if serializer.USE_ORJSON else 'json',
+            'iterations': args.iterations,
+        },
+        'runs': runs,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
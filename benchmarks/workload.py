@@ -0,0 +1,356 @@
+"""Workload capture, synthetic traffic generation and concurrent trace replay.
+
+    # Sanitize captured API Gateway events (raw events, or log records with an "event" field)
+    python benchmarks/workload.py capture events.log --output captured.jsonl
+
+    # Generate skewed synthetic traffic
+    python benchmarks/workload.py generate --requests 20000 --rate 500 --output synthetic.jsonl
+
+    # Replay either against both lambda_handlers on the in-memory backend
+    python benchmarks/workload.py replay synthetic.jsonl --concurrency 16 --output replay.json
+
+Traces are JSON lines of {"t": seconds from start, "event": API Gateway proxy event};
+generated traces start with a {"shape": ...} line describing the dataset they address.
+Synthetic traffic uses Zipfian post and author popularity, a few celebrity authors with
+very large follower counts, a configurable read/write mix and bursty "like storms" on a
+single post. Replay seeds the fake backend with the matching dataset and reports
+throughput, a latency histogram, per-route percentiles and the hottest partition keys.
+
+Captured credentials are masked, so replayed logins return 401 after the same lookups.
+Handlers are invoked concurrently in one process, so per-request call counts from
+tracing are not meaningful here; use bench.py for those.
+"""
+import argparse
+import bisect
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from harness import event, load_handlers # First: puts auth/ on sys.path
+import dataset
+from bench import percentile
+
+# Routes served by lambda.py; everything else (including /users/{userId}/<sub-resource>) goes to post.py
+USER_ROUTES = {'/login', '/register', '/forgot-password', '/reset-password', '/profile/upload-url', '/users', '/users/{userId}'}
+USER_ROUTE_PREFIXES = ('/profile/', '/posts/user/', '/bookmarks/user/')
+
+SENSITIVE_FIELDS = {'password', 'newPassword', 'token', 'resetToken', 'fileData'}
+KEPT_HEADERS = {'accept', 'accept-encoding', 'content-type', 'if-none-match', 'if-modified-since'}
+
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+# Default request mix: route -> share of non-storm traffic
+DEFAULT_MIX = {
+    'post_detail': 0.50,
+    'listing': 0.08,
+    'author_posts': 0.08,
+    'user_posts': 0.06,
+    'followers': 0.04,
+    'bookmarks': 0.04,
+    'login': 0.03,
+    'comment': 0.08,
+    'reaction': 0.07,
+    'follow': 0.02,
+}
+
+# ---------------------------------------------------------------- capture
+
+def sanitize_event(raw: Dict) -> Dict:
+    """Keep only what routing and handlers read; mask credentials and drop caller identity."""
+    headers = {name: value for name, value in (raw.get('headers') or {}).items() if name.lower() in KEPT_HEADERS}
+    body = raw.get('body')
+    if body and not raw.get('isBase64Encoded'):
+        try:
+            parsed = json.loads(body)
+            if isinstance(parsed, dict):
+                body = json.dumps({k: '***' if k in SENSITIVE_FIELDS else v for k, v in parsed.items()})
+        except json.JSONDecodeError:
+            pass
+    elif raw.get('isBase64Encoded'):
+        body = None # Uploads: never keep file contents
+    context = raw.get('requestContext') or {}
+    return {
+        'resource': raw.get('resource') or context.get('resourcePath'),
+        'path': raw.get('path'),
+        'httpMethod': raw.get('httpMethod'),
+        'headers': headers,
+        'queryStringParameters': raw.get('queryStringParameters'),
+        'pathParameters': raw.get('pathParameters'),
+        'requestContext': {'resourcePath': context.get('resourcePath') or raw.get('resource'),
+                           'httpMethod': raw.get('httpMethod')},
+        'body': body,
+        'isBase64Encoded': False,
+    }
+
+def capture(lines: Iterable[str]) -> Iterator[Dict]:
+    """Turn raw event lines (or structured log records carrying an 'event') into trace entries."""
+    started: Optional[float] = None
+    for line in lines:
+        line = line.strip()
+        if not line.startswith('{'):
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        raw = record.get('event', record)
+        if not isinstance(raw, dict) or 'httpMethod' not in raw:
+            continue
+        epoch = ((raw.get('requestContext') or {}).get('requestTimeEpoch') or 0) / 1000
+        started = epoch if started is None else started
+        yield {'t': round(max(0.0, epoch - started), 3), 'event': sanitize_event(raw)}
+
+# ---------------------------------------------------------------- generate
+
+class Zipf:
+    """Sample ranks 0..n-1 with probability proportional to 1 / (rank + 1) ** exponent."""
+
+    def __init__(self, n: int, exponent: float, rng: random.Random):
+        self.rng = rng
+        self.cumulative = list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(n)))
+
+    def sample(self) -> int:
+        return bisect.bisect_left(self.cumulative, self.rng.random() * self.cumulative[-1])
+
+def workload_shape(args: argparse.Namespace) -> Dict[str, Any]:
+    """Dataset parameters a trace was generated for; stored in its first line so replay can rebuild it."""
+    return {
+        'users': args.users, 'posts': args.posts, 'celebrities': args.celebrities,
+        'celebrity_followers': args.celebrity_followers, 'seed': args.seed,
+    }
+
+def generate(args: argparse.Namespace) -> Iterator[Dict]:
+    rng = random.Random(args.seed)
+    post_rank = Zipf(args.posts, args.zipf, rng)
+    author_rank = Zipf(args.users, args.zipf, rng)
+    routes, weights = zip(*DEFAULT_MIX.items())
+    if args.write_ratio is not None:
+        writes = {'comment', 'reaction', 'follow'}
+        read_total = sum(w for r, w in DEFAULT_MIX.items() if r not in writes)
+        write_total = sum(w for r, w in DEFAULT_MIX.items() if r in writes)
+        weights = tuple(
+            w / write_total * args.write_ratio if r in writes else w / read_total * (1 - args.write_ratio)
+            for r, w in DEFAULT_MIX.items()
+        )
+
+    def post_id() -> str:
+        return f"post-{post_rank.sample():06d}"
+
+    def viewer() -> str:
+        return dataset.user_id(rng.randrange(args.users))
+
+    def request(route: str, sequence: int) -> Dict:
+        if route == 'post_detail':
+            return event('GET', '/blog-posts/{postId}', {'postId': post_id()}, {'currentUserId': viewer()})
+        if route == 'listing':
+            return event('GET', '/blog-posts', query={'limit': '20'})
+        if route == 'author_posts':
+            return event('GET', '/blog-posts', query={'authorId': dataset.user_id(author_rank.sample()), 'limit': '20'})
+        if route == 'user_posts':
+            return event('GET', '/users/{userId}/posts', {'userId': dataset.user_id(author_rank.sample())})
+        if route == 'followers':
+            return event('GET', '/users/{userId}/followers', {'userId': dataset.user_id(author_rank.sample())})
+        if route == 'bookmarks':
+            return event('GET', '/users/{userId}/bookmarks', {'userId': viewer()})
+        if route == 'login':
+            i = rng.randrange(args.users)
+            return event('POST', '/login', body={'email': f"user{i}@example.com", 'password': dataset.PASSWORD})
+        if route == 'comment':
+            return event('POST', '/post-comments', body={'postId': post_id(), 'userId': viewer(), 'content': f"comment {sequence}"})
+        if route == 'reaction':
+            return event('POST', '/post-reactions', body={'postId': post_id(), 'userId': viewer(), 'reactionType': 'like'})
+        follower, followed = viewer(), dataset.user_id(author_rank.sample())
+        return event('POST', '/user-follows', body={'followerId': follower, 'followedId': followed})
+
+    yield {'shape': workload_shape(args)}
+    clock = 0.0
+    storm_every = args.requests // args.storms if args.storms else 0
+    for sequence in range(args.requests):
+        clock += rng.expovariate(args.rate)
+        yield {'t': round(clock, 4), 'event': request(rng.choices(routes, weights)[0], sequence)}
+        if storm_every and sequence % storm_every == storm_every // 2:
+            # Like storm: one popular post gets storm_size reactions within storm_seconds
+            target = f"post-{rng.randrange(min(10, args.posts)):06d}"
+            for offset in sorted(rng.uniform(0, args.storm_seconds) for _ in range(args.storm_size)):
+                body = {'postId': target, 'userId': viewer(), 'reactionType': 'like'}
+                yield {'t': round(clock + offset, 4), 'event': event('POST', '/post-reactions', body=body)}
+
+def seed_shape(dynamodb: Any, shape: Dict[str, Any]) -> None:
+    """Seed the fake backend for a generated trace: base data plus celebrity follower graphs."""
+    dataset.seed(dynamodb, users=shape['users'], posts=shape['posts'], comments=10, followers=0, seed_value=shape['seed'])
+    rng = random.Random(shape['seed'])
+    follows = []
+    for celebrity in range(shape['celebrities']):
+        followers = rng.sample(range(shape['users']), min(shape['celebrity_followers'], shape['users'] - 1))
+        follows.extend(
+            {'followerId': dataset.user_id(f), 'followedId': dataset.user_id(celebrity), 'createdAt': dataset.timestamp(f)}
+            for f in followers if f != celebrity
+        )
+    dynamodb.Table('UserFollows').load(follows)
+
+# ---------------------------------------------------------------- replay
+
+def route_name(entry_event: Dict) -> str:
+    return f"{entry_event['httpMethod']} {entry_event.get('resource') or entry_event.get('path')}"
+
+def is_user_route(resource: str) -> bool:
+    return resource in USER_ROUTES or resource.startswith(USER_ROUTE_PREFIXES)
+
+def histogram(latencies: List[float]) -> Dict[str, int]:
+    counts = Counter(bisect.bisect_left(LATENCY_BUCKETS_MS, latency) for latency in latencies)
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    return {labels[i]: counts.get(i, 0) for i in range(len(labels))}
+
+def replay(entries: List[Dict], shape: Optional[Dict], concurrency: int, speed: float, latency_ms: float, top: int) -> Dict[str, Any]:
+    post, users, dynamodb, _ = load_handlers(latency_ms / 1000)
+    if shape:
+        seed_shape(dynamodb, shape)
+    else:
+        dataset.seed(dynamodb)
+    dynamodb.partition_hits.clear() # Count replay traffic only, not seeding
+
+    results: List[Tuple[str, float, int]] = []
+    results_lock = threading.Lock()
+
+    def invoke(entry: Dict) -> None:
+        entry_event = entry['event']
+        handler = users.lambda_handler if is_user_route(entry_event.get('resource') or '') else post.lambda_handler
+        started = time.perf_counter()
+        try:
+            status = handler(entry_event, None).get('statusCode', 0)
+        except Exception: # A crashing handler is a result, not a reason to stop the replay
+            status = -1
+        elapsed = (time.perf_counter() - started) * 1000
+        with results_lock:
+            results.append((route_name(entry_event), elapsed, status))
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for entry in entries:
+            if speed > 0:
+                delay = entry['t'] / speed - (time.perf_counter() - wall_started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(invoke, entry)
+    wall = time.perf_counter() - wall_started
+
+    latencies = sorted(latency for _, latency, _ in results)
+    by_route: Dict[str, List[float]] = {}
+    statuses: Counter = Counter()
+    for route, latency, status in results:
+        by_route.setdefault(route, []).append(latency)
+        statuses[str(status)] += 1
+    total_hits = sum(dynamodb.partition_hits.values()) or 1
+    per_table: Counter = Counter()
+    for (table, _, _), count in dynamodb.partition_hits.items():
+        per_table[table] += count
+    return {
+        'requests': len(results),
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(len(results) / wall, 1) if wall else 0.0,
+        'concurrency': concurrency,
+        'statuses': dict(statuses),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'max': round(latencies[-1], 3) if latencies else 0.0,
+        },
+        'histogram': histogram(latencies),
+        'routes': {
+            route: {
+                'requests': len(values),
+                'p50_ms': round(percentile(sorted(values), 0.50), 3),
+                'p95_ms': round(percentile(sorted(values), 0.95), 3),
+                'p99_ms': round(percentile(sorted(values), 0.99), 3),
+            }
+            for route, values in sorted(by_route.items())
+        },
+        'hot_partitions': [
+            {'table': table, 'index': index, 'key': key, 'accesses': count,
+             'share_of_table': round(count / per_table[table], 3), 'share_of_all': round(count / total_hits, 3)}
+            for (table, index, key), count in dynamodb.partition_hits.most_common(top)
+        ],
+    }
+
+def read_trace(path: str) -> Tuple[Optional[Dict], List[Dict]]:
+    shape = None
+    entries = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'shape' in record:
+                shape = record['shape']
+            else:
+                entries.append(record)
+    entries.sort(key=lambda entry: entry['t'])
+    return shape, entries
+
+def write_lines(records: Iterable[Dict], path: Optional[str]) -> None:
+    out = open(path, 'w') if path else sys.stdout
+    try:
+        for record in records:
+            out.write(json.dumps(record, separators=(',', ':')) + '\n')
+    finally:
+        if path:
+            out.close()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Capture, generate and replay API Gateway workloads.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    capture_parser = commands.add_parser('capture', help='sanitize captured events into a trace')
+    capture_parser.add_argument('input', help="file of JSON events or log records with an 'event' field ('-' for stdin)")
+    capture_parser.add_argument('--output', help='trace file (default: stdout)')
+
+    generate_parser = commands.add_parser('generate', help='generate synthetic skewed traffic')
+    generate_parser.add_argument('--requests', type=int, default=10000)
+    generate_parser.add_argument('--rate', type=float, default=200.0, help='mean requests per second')
+    generate_parser.add_argument('--users', type=int, default=2000)
+    generate_parser.add_argument('--posts', type=int, default=2000)
+    generate_parser.add_argument('--zipf', type=float, default=1.1, help='popularity skew exponent')
+    generate_parser.add_argument('--celebrities', type=int, default=3, help='authors with huge follower counts')
+    generate_parser.add_argument('--celebrity-followers', type=int, default=1500)
+    generate_parser.add_argument('--write-ratio', type=float, help='share of writes (default: the built-in mix)')
+    generate_parser.add_argument('--storms', type=int, default=3, help='number of like storms')
+    generate_parser.add_argument('--storm-size', type=int, default=300)
+    generate_parser.add_argument('--storm-seconds', type=float, default=2.0)
+    generate_parser.add_argument('--seed', type=int, default=7)
+    generate_parser.add_argument('--output', help='trace file (default: stdout)')
+
+    replay_parser = commands.add_parser('replay', help='replay a trace against the handlers')
+    replay_parser.add_argument('trace')
+    replay_parser.add_argument('--concurrency', type=int, default=8)
+    replay_parser.add_argument('--speed', type=float, default=0.0, help='time scale for trace timestamps; 0 replays as fast as possible')
+    replay_parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated latency per backend call')
+    replay_parser.add_argument('--top', type=int, default=10, help='hot partitions to list')
+    replay_parser.add_argument('--output', help='write the JSON report here (default: stdout)')
+
+    args = parser.parse_args()
+    if args.command == 'capture':
+        source = sys.stdin if args.input == '-' else open(args.input)
+        with source:
+            write_lines(capture(source), args.output)
+    elif args.command == 'generate':
+        write_lines(generate(args), args.output)
+    else:
+        shape, entries = read_trace(args.trace)
+        report = replay(entries, shape, args.concurrency, args.speed, args.latency_ms, args.top)
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(text)
+        else:
+            print(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
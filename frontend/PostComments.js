@@ -1,29 +1,44 @@
+// One comment; replies are loaded on demand into its .comment-replies container
+export function Comment(comment, currentUserId) {
+  const isCurrentUserComment = comment.userId === currentUserId; // Check if current user made this comment
+  const commentItemClass = isCurrentUserComment
+    ? "comment-item current-user-comment"
+    : "comment-item"; // Add class if it's current user's comment
+  const replyCount = comment.replyCount || 0;
+
+  return `
+      <div class="${commentItemClass}" data-comment-id="${comment.commentId}">
+        <p class="comment-author"><strong>${
+          comment.username || "Anonymous"
+        }:</strong></p>
+        <p class="comment-text">${comment.content || "No comment content."}</p>
+        ${
+          replyCount > 0
+            ? `<button class="view-replies-btn" data-comment-id="${comment.commentId}">View ${replyCount} ${
+                replyCount === 1 ? "reply" : "replies"
+              }</button>`
+            : ""
+        }
+        <div class="comment-replies"></div>
+      </div>
+    `;
+}
+
+// "Load more" button for the next page of a comment list, if there is one
+export function MoreCommentsButton(cursor, label = "Load more comments") {
+  return cursor
+    ? `<button class="load-more-comments-btn" data-cursor="${cursor}">${label}</button>`
+    : "";
+}
+
 function PostComments(postData, currentUserId) {
+  // The post carries the first page of top-level comments and the total count
   const comments = postData.comments || [];
-  console.log("PostComments received comments:", comments); // Add this line
-  const commentCount = comments.length;
+  const commentCount = postData.commentCount ?? comments.length;
 
   const commentHtml =
     comments.length > 0
-      ? comments
-          .map((comment) => {
-            const isCurrentUserComment = comment.userId === currentUserId; // Check if current user made this comment
-            const commentItemClass = isCurrentUserComment
-              ? "comment-item current-user-comment"
-              : "comment-item"; // Add class if it's current user's comment
-
-            return `
-                <div class="${commentItemClass}">
-                  <p class="comment-author"><strong>${
-                    comment.username || "Anonymous"
-                  }:</strong></p>
-                  <p class="comment-text">${
-                    comment.content || "No comment content."
-                  }</p>
-                </div>
-              `;
-          })
-          .join("")
+      ? comments.map((comment) => Comment(comment, currentUserId)).join("")
       : "<p>No comments yet. Be the first to comment!</p>";
 
   return `
@@ -31,6 +46,7 @@ function PostComments(postData, currentUserId) {
       <h3>Comments (${commentCount})</h3>
       <div class="comment-list">
         ${commentHtml}
+        ${MoreCommentsButton(postData.commentsCursor)}
       </div>
       <div class="comment-form">
         <input type="text" id="commentInput" placeholder="Add a comment..." />
@@ -3,7 +3,7 @@ import PostHeader from "/frontend/PostHeader.js";
 import PostContent from "/frontend/PostContent.js";
 import PostReactions from "/frontend/PostReactions.js";
 import PostShare from "/frontend/PostShare.js";
-import PostComments from "/frontend/PostComments.js";
+import PostComments, { Comment, MoreCommentsButton } from "/frontend/PostComments.js";
 
 document.addEventListener("DOMContentLoaded", async () => {
   const postContainer = document.getElementById("post-container");
@@ -26,39 +26,49 @@ document.addEventListener("DOMContentLoaded", async () => {
 
   const currentUserId = localStorage.getItem("userId") || "anonymous"; // Get current user ID (should be userId, not username)
 
-  const postUrl = `${baseUrl}/blog-posts/${postId}${
-    currentUserId !== "anonymous" ? `?currentUserId=${currentUserId}` : ""
-  }`; // Fetch from API Gateway, append currentUserId if logged in
-
-  try {
-    const response = await fetch(postUrl);
+  // The post body is the same for every reader (and cacheable); likes, follows and
+  // bookmarks of the current user come from the small viewer-state lookup alongside it
+  const postUrl = `${baseUrl}/blog-posts/${postId}`;
+  const viewerStateUrl = `${baseUrl}/blog-posts/${postId}/viewer-state?userId=${currentUserId}`;
+
+  // Fetch the public post and the viewer's state together and merge them. After the
+  // viewer's own writes, revalidate the post rather than reuse the browser's copy.
+  async function fetchPostData(revalidate = false) {
+    const [response, viewerResponse] = await Promise.all([
+      fetch(postUrl, revalidate ? { cache: "no-cache" } : undefined),
+      currentUserId !== "anonymous" ? fetch(viewerStateUrl) : null,
+    ]);
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
     const postData = await response.json();
-    console.log("Fetched Post Data:", postData);
+    // Assuming postData is an array and we need the first item, or it's a single object
+    const post = postData.length > 0 ? postData[0] : postData;
+    if (viewerResponse && viewerResponse.ok) {
+      const { userLiked, userReactionId, isFollowingAuthor, isBookmarked } = await viewerResponse.json();
+      Object.assign(post, { userLiked, userReactionId, isFollowingAuthor, isBookmarked });
+    }
+    return post;
+  }
 
+  try {
     // Render the post with fetched data
-    // Assuming postData is an array and we need the first item, or it's a single object
-    const currentPostData = postData.length > 0 ? postData[0] : postData;
+    const currentPostData = await fetchPostData();
+    console.log("Fetched Post Data:", currentPostData);
     postContainer.innerHTML = Post(currentPostData, currentUserId); // Pass currentUserId
 
+    // Count the view towards trending; the post body itself may have come from a cache
+    fetch(`${baseUrl}/blog-posts/${postId}/views`, { method: "POST", keepalive: true }).catch(
+      () => {}
+    );
+
     // --- Comment Submission Logic ---
     // Function to re-fetch and re-render the post
     async function refreshPostData() {
-      const refreshPostUrl = `${baseUrl}/blog-posts/${postId}${
-        currentUserId !== "anonymous" ? `?currentUserId=${currentUserId}` : ""
-      }`; // Ensure currentUserId is used for refresh
       try {
-        const updatedPostResponse = await fetch(refreshPostUrl);
-        if (!updatedPostResponse.ok) {
-          throw new Error(`HTTP error! status: ${updatedPostResponse.status}`);
-        }
-        const updatedPostData = await updatedPostResponse.json();
-        postContainer.innerHTML = Post(
-          updatedPostData.length > 0 ? updatedPostData[0] : updatedPostData,
-          currentUserId // Pass currentUserId
-        );
+        const updatedPostData = await fetchPostData(true);
+        Object.assign(currentPostData, updatedPostData); // Keep the viewer flags the handlers read current
+        postContainer.innerHTML = Post(currentPostData, currentUserId); // Pass currentUserId
         attachEventListeners(); // Re-attach event listeners after re-rendering
       } catch (error) {
         console.error("Error refreshing post data:", error);
@@ -245,50 +255,27 @@ document.addEventListener("DOMContentLoaded", async () => {
 
         likeBtn.onclick = async () => {
           const isLiked = likeBtn.classList.contains("liked");
-          let method = "";
-          let url = `${baseUrl}/post-reactions`;
+          // A user's reaction to a post lives at one URL: PUT sets it, DELETE removes it
+          const reactionUrl = `${baseUrl}/blog-posts/${encodeURIComponent(
+            postId
+          )}/reactions/${encodeURIComponent(userId)}`;
+          const method = isLiked ? "DELETE" : "PUT";
 
           console.log("Like button clicked. isLiked:", isLiked);
-          console.log("Current Post Data:", currentPostData);
-
-          if (isLiked) {
-            // If already liked, unlike it (DELETE request)
-            method = "DELETE";
-            const userReactionId = currentPostData.userReactionId; // Get the reactionId from the fetched post data
-            console.log(
-              "Attempting to unlike. userReactionId:",
-              userReactionId
-            );
-            if (!userReactionId) {
-              alert(
-                "Error: Cannot unlike. Reaction ID not found in post data."
-              );
-              console.error("Error: userReactionId is null or undefined.");
-              return;
-            }
-            url = `${baseUrl}/post-reactions/${userReactionId}`; // Use reactionId for DELETE
-          } else {
-            // If not liked, like it (POST request)
-            method = "POST";
-            console.log("Attempting to like.");
-          }
-
-          const reactionData = {
-            postId: postId,
-            userId: userId,
-            reactionType: "like",
-            createdAt: new Date().toISOString(),
-          };
 
           try {
-            const response = await fetch(url, {
-              method: method,
-              headers: {
-                "Content-Type": "application/json",
-              },
-              body:
-                method === "POST" ? JSON.stringify(reactionData) : undefined, // Only send body for POST
-            });
+            const response = await fetch(
+              isLiked ? `${reactionUrl}?reactionType=like` : reactionUrl,
+              {
+                method: method,
+                headers: {
+                  "Content-Type": "application/json",
+                },
+                body: isLiked
+                  ? undefined
+                  : JSON.stringify({ reactionType: "like" }), // Only send body for PUT
+              }
+            );
 
             if (!response.ok) {
               throw new Error(`HTTP error! status: ${response.status}`);
@@ -397,6 +384,48 @@ document.addEventListener("DOMContentLoaded", async () => {
         followBtn.onclick = toggleFollow;
       }
 
+      // Later pages of comments and each thread's replies are fetched when asked for
+      const commentList = document.querySelector(".comment-list");
+      if (commentList) {
+        commentList.onclick = async (event) => {
+          const button = event.target.closest(
+            ".view-replies-btn, .load-more-comments-btn"
+          );
+          if (!button) return;
+          button.disabled = true;
+
+          // A "load more" button inside a thread pages its replies; outside, the top-level list
+          const thread = button.closest(".comment-item");
+          const commentId = thread ? thread.dataset.commentId : null;
+          const commentsUrl = commentId
+            ? `${baseUrl}/blog-posts/${postId}/comments/${commentId}/replies`
+            : `${baseUrl}/blog-posts/${postId}/comments`;
+          const cursor = button.dataset.cursor;
+
+          try {
+            const response = await fetch(
+              cursor ? `${commentsUrl}?cursor=${encodeURIComponent(cursor)}` : commentsUrl
+            );
+            if (!response.ok) {
+              throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const page = await response.json();
+            const pageHtml =
+              page.items.map((comment) => Comment(comment, currentUserId)).join("") +
+              MoreCommentsButton(page.cursor, commentId ? "More replies" : undefined);
+            if (commentId) {
+              thread.querySelector(".comment-replies").insertAdjacentHTML("beforeend", pageHtml);
+            } else {
+              button.insertAdjacentHTML("beforebegin", pageHtml);
+            }
+            button.remove();
+          } catch (error) {
+            console.error("Error loading comments:", error);
+            button.disabled = false;
+          }
+        };
+      }
+
       if (bookmarkBtn) {
         bookmarkBtn.onclick = toggleBookmark;
       }
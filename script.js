@@ -140,6 +140,33 @@ async function fetchAllCategories() {
   }
 }
 
+// Posts filed under a category or tag (resource "categories" or "tags"), newest first.
+// They come back as summaries: excerpt, mediaUrl and authorUsername instead of content.
+async function fetchLinkedPosts(resource, id, limit = 50) {
+  const response = await fetch(
+    `${API_POSTS_BASE_URL}/${resource}/${encodeURIComponent(id)}/posts?limit=${limit}`
+  );
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  const data = await response.json();
+  return data.items || [];
+}
+
+async function fetchAllTags() {
+  try {
+    const response = await fetch(`${API_POSTS_BASE_URL}/tags`);
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data = await response.json();
+    return data.items || [];
+  } catch (error) {
+    console.error("Error fetching tags:", error);
+    return [];
+  }
+}
+
 async function fetchPostCategories() {
   try {
     const response = await fetch(`${API_POSTS_BASE_URL}/post-categories`);
@@ -341,29 +368,16 @@ async function fetchPostsByCategory() {
 
   try {
     const allCategories = await fetchAllCategories();
-    const postCategories = await fetchPostCategories();
-    const postsResponse = await fetch(`${API_POSTS_BASE_URL}/blog-posts`);
-
-    if (!postsResponse.ok) {
-      throw new Error(`HTTP error! status: ${postsResponse.status}`);
-    }
-    const postsData = await postsResponse.json();
-    let posts = postsData.items || [];
-
     const targetCategory = allCategories.find(
       (cat) =>
         cat.name.toLowerCase() ===
         decodeURIComponent(categoryName).toLowerCase()
     );
 
-    if (targetCategory) {
-      const postIdsInCategory = postCategories
-        .filter((pc) => pc.categoryId === targetCategory.categoryId)
-        .map((pc) => pc.postId);
-      posts = posts.filter((post) => postIdsInCategory.includes(post.postId));
-    } else {
-      posts = []; // No posts for this category
-    }
+    // No posts for an unknown category
+    const posts = targetCategory
+      ? await fetchLinkedPosts("categories", targetCategory.categoryId)
+      : [];
 
     if (!Array.isArray(posts)) {
       throw new Error(
@@ -379,23 +393,10 @@ async function fetchPostsByCategory() {
       return;
     }
 
-    let usernames = [];
-    try {
-      const authorPromises = posts.map((post) => fetchUsername(post.authorId));
-      usernames = await Promise.all(authorPromises);
-    } catch (authorError) {
-      console.error(
-        "Error fetching one or more author usernames:",
-        authorError
-      );
-      usernames = posts.map(() => "Unknown Author");
-    }
-
     categoryPostsGrid.innerHTML = ""; // Clear existing content
 
-    posts.forEach((post, index) => {
-      const { mediaUrl, excerpt } = extractMediaAndExcerpt(post.content);
-      const authorUsername = usernames[index];
+    posts.forEach((post) => {
+      const { mediaUrl, excerpt, authorUsername } = post;
       const formattedDate = formatDate(post.createdAt);
 
       const postElement = document.createElement("div");
@@ -651,31 +652,22 @@ async function fetchPostsByTag() {
   loadingSpinner.style.display = "block"; // Show spinner
 
   try {
-    // For now, fetching all posts. If a specific "tag" endpoint exists, use it here.
-    // Example: `${API_POSTS_BASE_URL}/blog-posts?tag=${encodeURIComponent(tagName)}`
-    const postsResponse = await fetch(`${API_POSTS_BASE_URL}/blog-posts`);
-    if (!postsResponse.ok) {
-      throw new Error(`HTTP error! status: ${postsResponse.status}`);
-    }
-    const postsData = await postsResponse.json();
-    let posts = postsData.items || [];
-
-    // Filter posts by tag if the API doesn't do it
-    if (tagName) {
+    // A tag name is looked up among tags first, then among categories (tag links
+    // used to be category links)
+    let posts = [];
+    const allTags = await fetchAllTags();
+    const targetTag = allTags.find(
+      (tag) => tag.name.toLowerCase() === tagName.toLowerCase()
+    );
+    if (targetTag) {
+      posts = await fetchLinkedPosts("tags", targetTag.tagId);
+    } else {
       const allCategories = await fetchAllCategories();
-      const postCategories = await fetchPostCategories();
-
       const targetCategory = allCategories.find(
         (cat) => cat.name.toLowerCase() === tagName.toLowerCase()
       );
-
       if (targetCategory) {
-        const postIdsInTag = postCategories
-          .filter((pc) => pc.categoryId === targetCategory.categoryId)
-          .map((pc) => pc.postId);
-        posts = posts.filter((post) => postIdsInTag.includes(post.postId));
-      } else {
-        posts = []; // No posts for this tag
+        posts = await fetchLinkedPosts("categories", targetCategory.categoryId);
       }
     }
 
@@ -691,26 +683,10 @@ async function fetchPostsByTag() {
       return;
     }
 
-    const allCategories = await fetchAllCategories(); // Re-fetch if not already in scope
-    const postCategories = await fetchPostCategories(); // Re-fetch if not already in scope
-
-    let usernames = [];
-    try {
-      const authorPromises = posts.map((post) => fetchUsername(post.authorId));
-      usernames = await Promise.all(authorPromises);
-    } catch (authorError) {
-      console.error(
-        "Error fetching one or more author usernames:",
-        authorError
-      );
-      usernames = posts.map(() => "Unknown Author");
-    }
-
     tagPostsGrid.innerHTML = ""; // Clear existing content
 
-    posts.forEach((post, index) => {
-      const { mediaUrl, excerpt } = extractMediaAndExcerpt(post.content);
-      const authorUsername = usernames[index];
+    posts.forEach((post) => {
+      const { mediaUrl, excerpt, authorUsername } = post;
       const formattedDate = formatDate(post.createdAt);
 
       const postElement = document.createElement("div");